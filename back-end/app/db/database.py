@@ -1,8 +1,11 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 import os
+from app.db.telemetria import AsyncAdaptedQueuePoolMonitorado, QueuePoolMonitorado
 
 dotenv_path = os.path.join(os.path.dirname(__file__), "../../.env")
 
@@ -18,10 +21,83 @@ if DATABASE_URL is None:
         "A variável DATABASE_URL não foi encontrada. Verifique o arquivo .env!"
     )
 
-engine = create_engine(DATABASE_URL)
+def _url_async(url: str):
+    for prefixo in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefixo):
+            return "postgresql+asyncpg://" + url[len(prefixo) :]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://") :]
+    return None
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _url_async(DATABASE_URL)
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", str(DB_POOL_SIZE // 2)))
+DB_ASYNC_MAX_OVERFLOW = int(
+    os.getenv("DB_ASYNC_MAX_OVERFLOW", str(DB_MAX_OVERFLOW // 2))
+)
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_AVULSO_TIMEOUT = int(os.getenv("DB_AVULSO_TIMEOUT", "5"))
+
+if ASYNC_DATABASE_URL:
+    DB_SYNC_POOL_SIZE = max(DB_POOL_SIZE - DB_ASYNC_POOL_SIZE, 1)
+    DB_SYNC_MAX_OVERFLOW = max(DB_MAX_OVERFLOW - DB_ASYNC_MAX_OVERFLOW, 0)
+else:
+    DB_SYNC_POOL_SIZE = DB_POOL_SIZE
+    DB_SYNC_MAX_OVERFLOW = DB_MAX_OVERFLOW
+
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(DATABASE_URL)
+    engine_avulso = create_engine(DATABASE_URL, poolclass=NullPool)
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=QueuePoolMonitorado,
+        pool_size=DB_SYNC_POOL_SIZE,
+        max_overflow=DB_SYNC_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    engine_avulso = create_engine(
+        DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={
+            "connect_timeout": DB_AVULSO_TIMEOUT,
+            "options": f"-c statement_timeout={DB_AVULSO_TIMEOUT * 1000}",
+        },
+    )
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionAvulsa = sessionmaker(autocommit=False, autoflush=False, bind=engine_avulso)
 Base = declarative_base()
 
+if ASYNC_DATABASE_URL and not ASYNC_DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePoolMonitorado,
+        pool_size=max(DB_ASYNC_POOL_SIZE, 1),
+        max_overflow=DB_ASYNC_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+elif ASYNC_DATABASE_URL:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+else:
+    async_engine = None
+
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 
 def get_db():
     db = SessionLocal()
@@ -29,3 +105,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    if async_engine is None:
+        raise RuntimeError(
+            "Nenhum driver assíncrono configurado. Defina ASYNC_DATABASE_URL."
+        )
+    async with AsyncSessionLocal() as db:
+        yield db
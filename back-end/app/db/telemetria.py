@@ -0,0 +1,93 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+LIMITES_ESPERA = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class HistogramaEspera:
+    def __init__(self, limites=LIMITES_ESPERA):
+        self.limites = limites
+        self._lock = Lock()
+        self.contagens = [0] * (len(limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+        self.timeouts = 0
+
+    def registrar(self, segundos: float):
+        with self._lock:
+            self.contagens[bisect_left(self.limites, segundos)] += 1
+            self.total += 1
+            self.soma += segundos
+            self.maximo = max(self.maximo, segundos)
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def resumo(self):
+        with self._lock:
+            buckets = {}
+            acumulado = 0
+            for limite, contagem in zip(self.limites, self.contagens):
+                acumulado += contagem
+                buckets[f"le_{limite}"] = acumulado
+            buckets["le_inf"] = self.total
+            return {
+                "total": self.total,
+                "media_segundos": self.soma / self.total if self.total else 0.0,
+                "maximo_segundos": self.maximo,
+                "timeouts": self.timeouts,
+                "buckets": buckets,
+            }
+
+
+class MonitoramentoPool:
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.max_overflow = max_overflow
+        self.espera = HistogramaEspera()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.espera = self.espera
+        return pool
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            self.espera.registrar_timeout()
+            raise
+        self.espera.registrar(time.perf_counter() - inicio)
+        return conexao
+
+
+class QueuePoolMonitorado(MonitoramentoPool, QueuePool):
+    pass
+
+
+class AsyncAdaptedQueuePoolMonitorado(MonitoramentoPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def estatisticas_pool(engine):
+    pool = engine.pool
+    estatisticas = {"classe": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, MonitoramentoPool):
+        estatisticas.update(
+            {
+                "tamanho": pool.size(),
+                "em_uso": pool.checkedout(),
+                "disponiveis": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool.max_overflow,
+                "timeout": pool.timeout(),
+                "espera_checkout": pool.espera.resumo(),
+            }
+        )
+    return estatisticas
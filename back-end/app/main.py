@@ -1,8 +1,6 @@
-import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
-from app.db.database import SessionLocal
 from app.routes.user_routes import router as user_router
 from app.routes.auth_routes import router as auth_router
 from app.routes.estabelecimento_routes import router as estabelecimento_router
@@ -15,7 +13,11 @@ from app.routes.configuracao_agenda_routes import router as configuracao_agenda_
 from app.routes.metricas_routes import router as metricas_router
 from app.routes.fidelidade_routes import router as fidelidade_router
 from app.routes.pagamento_routes import router as pagamento_router
-from app.utils.reminder import verificar_e_enviar_notificacoes_agendamentos
+from app.utils.agendador import (
+    AGENDADOR_NA_API,
+    registrar_jobs_locais,
+    registrar_jobs_unicos,
+)
 
 
 app = FastAPI()
@@ -27,21 +29,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Idempotent-Replayed"],
 )
 
 
-def job_lembrete_agendamentos():
-    db = SessionLocal()
-    try:
-        verificar_e_enviar_notificacoes_agendamentos(db)
-    finally:
-        db.close()
-
-
-scheduler.add_job(job_lembrete_agendamentos, 'interval', minutes=1)
-
-if os.environ.get('RUN_MAIN') == True or not os.environ.get('RUN_MAIN'):
-    scheduler.start()
+registrar_jobs_locais(scheduler)
+if AGENDADOR_NA_API:
+    registrar_jobs_unicos(scheduler)
+scheduler.start()
 
 
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
@@ -6,3 +6,16 @@ from .agendamento import Agendamento
 from .agenda_disponivel import AgendaDisponivel
 from .blacklist import BlacklistToken
 from .servico import Servico
+from .email_pendente import EmailPendente
+from .registro_dynamo_pendente import RegistroDynamoPendente
+from .cobranca_pendente import CobrancaPendente
+from .ocupacao_diaria import OcupacaoDiaria
+from .agenda_bitmap import AgendaBitmap
+from .clientes import Cliente
+from .configuracao_agenda import ConfiguracaoAgenda
+from .agendamento_cancelado import AgendamentoCancelado
+from .pontos_fidelidade_cliente import PontosFidelidadeCliente
+from .programa_finalidade import ProgramaFidelidade
+from .resgate_fidelidade import ResgateFidelidade
+from .resposta_idempotente import RespostaIdempotente
+from .estado_job import EstadoJob
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, LargeBinary
+from datetime import datetime
+from app.db.database import Base
+
+
+class AgendaBitmap(Base):
+    __tablename__ = "agenda_bitmap"
+
+    profissional_id = Column(Integer, ForeignKey("funcionarios.id"), primary_key=True)
+    data = Column(Date, primary_key=True)
+    estabelecimento_id = Column(
+        Integer, ForeignKey("estabelecimentos.id"), nullable=False
+    )
+    resolucao = Column(Integer, nullable=False)
+    existentes = Column(LargeBinary, nullable=False)
+    ocupados = Column(LargeBinary, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, DateTime, Boolean, ForeignKey
+from sqlalchemy import (
+    Column,
+    Integer,
+    DateTime,
+    Boolean,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from datetime import datetime
@@ -6,6 +15,21 @@ from datetime import datetime
 
 class AgendaDisponivel(Base):
     __tablename__ = "agenda_disponivel"
+    __table_args__ = (
+        UniqueConstraint(
+            "profissional_id",
+            "data_hora",
+            name="uq_agenda_disponivel_profissional_data",
+        ),
+        Index(
+            "ix_agenda_disponivel_livres",
+            "profissional_id",
+            "data_hora",
+            postgresql_where=text("ocupado = false"),
+            postgresql_include=["id", "estabelecimento_id", "criado_em"],
+            sqlite_where=text("ocupado = 0"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     profissional_id = Column(Integer, ForeignKey("funcionarios.id"), nullable=False)
@@ -1,4 +1,14 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, Boolean
+from sqlalchemy import (
+    DDL,
+    Column,
+    Integer,
+    DateTime,
+    ForeignKey,
+    String,
+    Boolean,
+    Index,
+    event,
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -6,12 +16,30 @@ from app.db.database import Base
 
 class Agendamento(Base):
     __tablename__ = "agendamentos"
+    __table_args__ = (
+        Index("ix_agendamentos_cliente_horario_id", "cliente_id", "horario", "id"),
+        Index(
+            "ix_agendamentos_profissional_status_horario_id",
+            "profissional_id",
+            "status",
+            "horario",
+            "id",
+        ),
+        Index(
+            "ix_agendamentos_estabelecimento_status_horario_id",
+            "estabelecimento_id",
+            "status",
+            "horario",
+            "id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
     profissional_id = Column(Integer, ForeignKey("funcionarios.id"), nullable=False)
     servico_id = Column(Integer, ForeignKey("servicos.id"), nullable=False)
     horario = Column(DateTime, nullable=False)
+    horario_fim = Column(DateTime, nullable=False)
     status = Column(String(20), default="pendente")
     criado_em = Column(DateTime, default=datetime.utcnow)
     notificado_1_dia = Column(Boolean, default=False)
@@ -26,3 +54,20 @@ class Agendamento(Base):
     )
     servico = relationship("Servico", back_populates="agendamentos")
     estabelecimento = relationship("Estabelecimento", back_populates="agendamentos")
+
+
+DDL_PERIODO = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    "ALTER TABLE agendamentos ADD COLUMN IF NOT EXISTS periodo tsrange "
+    "GENERATED ALWAYS AS (tsrange(horario, horario_fim, '[)')) STORED",
+    "ALTER TABLE agendamentos ADD CONSTRAINT agendamentos_sem_sobreposicao "
+    "EXCLUDE USING gist (profissional_id WITH =, periodo WITH &&) "
+    "WHERE (status IN ('pendente', 'confirmado'))",
+)
+
+for comando in DDL_PERIODO:
+    event.listen(
+        Agendamento.__table__,
+        "after_create",
+        DDL(comando).execute_if(dialect="postgresql"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -6,6 +6,14 @@ from app.db.database import Base
 
 class AgendamentoCancelado(Base):
     __tablename__ = "agendamentos_cancelados"
+    __table_args__ = (
+        Index(
+            "ix_agendamentos_cancelados_cliente_horario_id",
+            "cliente_id",
+            "horario",
+            "id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
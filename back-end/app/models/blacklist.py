@@ -7,4 +7,6 @@ class BlacklistToken(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, unique=True, nullable=False)
+    jti = Column(String(64), unique=True, index=True, nullable=True)
+    expira_em = Column(DateTime, index=True, nullable=True)
     created_at = Column(DateTime, default=func.now())
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class CobrancaPendente(Base):
+    __tablename__ = "cobrancas_pendentes"
+    __table_args__ = (
+        Index("ix_cobrancas_pendentes_status_proxima", "status", "proxima_tentativa"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    agendamento_id = Column(
+        Integer, ForeignKey("agendamentos.id"), unique=True, nullable=False
+    )
+    valor_centavos = Column(Integer, nullable=False)
+    moeda = Column(String(3), default="brl", nullable=False)
+    email = Column(String, nullable=True)
+    descricao = Column(String, nullable=False)
+    id_pagamento = Column(String, nullable=True)
+    status = Column(String(20), default="pendente", nullable=False)
+    tentativas = Column(Integer, default=0, nullable=False)
+    ultimo_erro = Column(Text, nullable=True)
+    proxima_tentativa = Column(DateTime, default=datetime.utcnow, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    enviado_em = Column(DateTime, nullable=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class EmailPendente(Base):
+    __tablename__ = "emails_pendentes"
+    __table_args__ = (
+        Index("ix_emails_pendentes_status_proxima", "status", "proxima_tentativa"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(50), nullable=False)
+    destinatario = Column(String, nullable=False)
+    contexto = Column(JSON, nullable=False)
+    status = Column(String(20), default="pendente", nullable=False)
+    tentativas = Column(Integer, default=0, nullable=False)
+    ultimo_erro = Column(Text, nullable=True)
+    proxima_tentativa = Column(DateTime, default=datetime.utcnow, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    enviado_em = Column(DateTime, nullable=True)
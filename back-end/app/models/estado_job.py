@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime
+from app.db.database import Base
+
+
+class EstadoJob(Base):
+    __tablename__ = "estado_jobs"
+
+    nome = Column(String(100), primary_key=True)
+    instancia = Column(String(255), nullable=False)
+    execucoes = Column(Integer, default=0, nullable=False)
+    falhas = Column(Integer, default=0, nullable=False)
+    ultima_execucao = Column(DateTime, nullable=False)
+    ultima_duracao_ms = Column(Float, nullable=False)
+    ultimo_atraso_ms = Column(Float, nullable=False)
+    maior_duracao_ms = Column(Float, default=0, nullable=False)
+    maior_atraso_ms = Column(Float, default=0, nullable=False)
+    ultimo_erro = Column(Text, nullable=True)
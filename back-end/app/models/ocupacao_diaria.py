@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class OcupacaoDiaria(Base):
+    __tablename__ = "ocupacao_diaria"
+    __table_args__ = (
+        Index("ix_ocupacao_diaria_estabelecimento_data", "estabelecimento_id", "data"),
+    )
+
+    profissional_id = Column(Integer, ForeignKey("funcionarios.id"), primary_key=True)
+    data = Column(Date, primary_key=True)
+    estabelecimento_id = Column(
+        Integer, ForeignKey("estabelecimentos.id"), nullable=False
+    )
+    slots_livres = Column(Integer, default=0, nullable=False)
+    slots_ocupados = Column(Integer, default=0, nullable=False)
+    minutos_livres = Column(Integer, default=0, nullable=False)
+    minutos_ocupados = Column(Integer, default=0, nullable=False)
+    atualizado_em = Column(DateTime, default=datetime.utcnow)
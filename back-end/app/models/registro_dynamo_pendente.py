@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class RegistroDynamoPendente(Base):
+    __tablename__ = "registros_dynamo_pendentes"
+    __table_args__ = (
+        Index(
+            "ix_registros_dynamo_pendentes_status_proxima",
+            "status",
+            "proxima_tentativa",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tabela = Column(String, nullable=False)
+    item = Column(JSON, nullable=False)
+    atualizar_rollups = Column(Boolean, default=False, nullable=False)
+    status = Column(String(20), default="pendente", nullable=False)
+    tentativas = Column(Integer, default=0, nullable=False)
+    ultimo_erro = Column(Text, nullable=True)
+    proxima_tentativa = Column(DateTime, default=datetime.utcnow, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    enviado_em = Column(DateTime, nullable=True)
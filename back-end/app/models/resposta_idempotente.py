@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class RespostaIdempotente(Base):
+    __tablename__ = "respostas_idempotentes"
+    __table_args__ = (Index("ix_respostas_idempotentes_expira_em", "expira_em"),)
+
+    chave = Column(String(255), primary_key=True)
+    escopo = Column(String(255), primary_key=True)
+    impressao = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    tipo_conteudo = Column(String(100), nullable=True)
+    corpo = Column(LargeBinary, nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expira_em = Column(DateTime, nullable=False)
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, date, time
-from app.db.database import get_db
+from typing import Optional
+from app.db.database import get_db, get_async_db
 from app.models.agenda_disponivel import AgendaDisponivel
 from app.models.funcionarios import Funcionario
 from app.schemas import (
@@ -10,9 +13,30 @@ from app.schemas import (
     GerarAgendaRequest,
     GerarAgendaAdminRequest,
 )
-from app.models.agendamento import Agendamento
+from app.models.servico import Servico
 from app.models.configuracao_agenda import ConfiguracaoAgenda
 from app.utils.dependencies import get_current_user
+from app.models.agenda_bitmap import AgendaBitmap
+from app.utils.agenda_bitmap import armazenamento_bitmap, id_slot, slots_do_dia
+from app.utils.disponibilidade import (
+    AGENDA_JANELA_DIAS,
+    BUSCA_MAX_DIAS,
+    buscar_horarios,
+    consulta_horarios_livres,
+    invalidar_disponibilidade,
+    obter_slot,
+    remover_slot,
+)
+from app.utils.gerador_agenda import (
+    calcular_horarios_padrao,
+    calcular_horarios_personalizados,
+    inserir_slots,
+)
+from app.utils.ocupacao import (
+    OCUPACAO_MAX_DIAS,
+    consultar_ocupacao,
+    registrar_variacao_ocupacao,
+)
 
 router = APIRouter()
 
@@ -28,66 +52,166 @@ def criar_horario_disponivel(
     if not func or func.usuario_id != user["id"]:
         raise HTTPException(status_code=403, detail="Ação não permitida")
 
+    if armazenamento_bitmap():
+        inserir_slots(db, [(func.id, func.estabelecimento_id, agenda.data_hora)])
+        db.commit()
+        invalidar_disponibilidade(agenda.profissional_id)
+        novo_horario = obter_slot(db, id_slot(func.id, agenda.data_hora))
+        if not novo_horario:
+            raise HTTPException(status_code=400, detail="Horário inválido")
+        return novo_horario
+
     novo_horario = AgendaDisponivel(
         profissional_id=agenda.profissional_id,
+        estabelecimento_id=func.estabelecimento_id,
         data_hora=agenda.data_hora,
         ocupado=False,
     )
     db.add(novo_horario)
+    registrar_variacao_ocupacao(
+        db,
+        [(func.id, func.estabelecimento_id, agenda.data_hora)],
+        livres=1,
+    )
     db.commit()
     db.refresh(novo_horario)
+    invalidar_disponibilidade(agenda.profissional_id)
     return novo_horario
 
 
 @router.get("/", response_model=list[AgendaResponse])
-def listar_agenda(
+async def listar_agenda(
     profissional_id: int = Query(..., description="ID do profissional"),
+    data_fim: Optional[date] = Query(None, description="Último dia da janela"),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    agora = datetime.now()
+    data_fim = data_fim or agora.date() + timedelta(days=AGENDA_JANELA_DIAS)
+    fim = datetime.combine(data_fim + timedelta(days=1), time.min)
+
+    if armazenamento_bitmap():
+        resultado = await db.execute(
+            select(AgendaBitmap)
+            .where(
+                AgendaBitmap.profissional_id == profissional_id,
+                AgendaBitmap.data >= agora.date(),
+                AgendaBitmap.data <= data_fim,
+            )
+            .order_by(AgendaBitmap.data)
+        )
+        return [
+            slot
+            for registro in resultado.scalars()
+            for slot in slots_do_dia(registro)
+            if agora <= slot.data_hora < fim
+        ]
+
+    resultado = await db.execute(consulta_horarios_livres(profissional_id, agora, fim))
+    return resultado.scalars().all()
+
+
+@router.get("/disponibilidade")
+def buscar_disponibilidade(
+    estabelecimento_id: int = Query(...),
+    servico_id: int = Query(...),
+    data_inicio: date = Query(...),
+    data_fim: date = Query(...),
+    limite: int = Query(10, ge=1, le=100),
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    horarios_com_agendamento = (
-        db.query(Agendamento.horario)
-        .filter(
-            Agendamento.profissional_id == profissional_id,
-            Agendamento.status == "confirmado",
+    if data_fim < data_inicio or (data_fim - data_inicio).days >= BUSCA_MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Intervalo inválido. Informe no máximo {BUSCA_MAX_DIAS} dias.",
+        )
+    if data_fim > date.today() + timedelta(days=AGENDA_JANELA_DIAS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Informe datas até {AGENDA_JANELA_DIAS} dias a partir de hoje.",
         )
-        .subquery()
-    )
 
-    horarios_disponiveis = (
-        db.query(AgendaDisponivel)
+    servico = (
+        db.query(Servico)
         .filter(
-            AgendaDisponivel.profissional_id == profissional_id,
-            AgendaDisponivel.data_hora >= datetime.now(),
-            AgendaDisponivel.data_hora.notin_(horarios_com_agendamento),
-            AgendaDisponivel.ocupado == False,
+            Servico.id == servico_id, Servico.estabelecimento_id == estabelecimento_id
         )
-        .order_by(AgendaDisponivel.data_hora)
-        .all()
+        .first()
     )
+    if not servico:
+        raise HTTPException(status_code=404, detail="Serviço não encontrado")
 
-    unicos_por_data = {}
-    for h in horarios_disponiveis:
-        if h.data_hora not in unicos_por_data:
-            unicos_por_data[h.data_hora] = h
-    return list(unicos_por_data.values())
+    profissionais = dict(
+        db.query(Funcionario.id, Funcionario.nome)
+        .filter(Funcionario.estabelecimento_id == estabelecimento_id)
+        .all()
+    )
+    if not profissionais:
+        return []
+
+    horarios = buscar_horarios(
+        db,
+        list(profissionais),
+        timedelta(minutes=servico.tempo),
+        max(datetime.combine(data_inicio, time.min), datetime.now()),
+        datetime.combine(data_fim + timedelta(days=1), time.min),
+        limite,
+    )
+    return [
+        {
+            "profissional_id": profissional_id,
+            "profissional": profissionais[profissional_id],
+            "horario": horario,
+        }
+        for horario, profissional_id in horarios
+    ]
 
 
 @router.delete("/{horario_id}", status_code=status.HTTP_204_NO_CONTENT)
 def excluir_horario(
     horario_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)
 ):
-    horario = (
-        db.query(AgendaDisponivel).filter(AgendaDisponivel.id == horario_id).first()
-    )
+    horario = obter_slot(db, horario_id)
     if not horario:
         raise HTTPException(status_code=404, detail="Horário não encontrado")
 
     if user["tipo_usuario"] != "profissional" or user["id"] != horario.profissional_id:
         raise HTTPException(status_code=403, detail="Ação não permitida")
 
-    db.delete(horario)
+    remover_slot(db, horario)
+    registrar_variacao_ocupacao(
+        db,
+        [(horario.profissional_id, horario.estabelecimento_id, horario.data_hora)],
+        livres=0 if horario.ocupado else -1,
+        ocupados=-1 if horario.ocupado else 0,
+    )
     db.commit()
+    invalidar_disponibilidade(horario.profissional_id)
+
+
+@router.get("/ocupacao")
+def mapa_ocupacao(
+    data_inicio: date = Query(...),
+    data_fim: date = Query(...),
+    profissional_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    if user["tipo_usuario"] != "admin":
+        raise HTTPException(
+            status_code=403, detail="Apenas administradores podem acessar esta rota"
+        )
+
+    if data_fim < data_inicio or (data_fim - data_inicio).days >= OCUPACAO_MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Intervalo inválido. Informe no máximo {OCUPACAO_MAX_DIAS} dias.",
+        )
+
+    return consultar_ocupacao(
+        db, user["estabelecimento_id"], data_inicio, data_fim, profissional_id
+    )
 
 
 @router.get("/horarios-profissional")
@@ -140,10 +264,6 @@ def gerar_horarios_profissional(
     data_inicio = datetime.strptime(dados.data_inicial, "%Y-%m-%d").date()
     data_fim = data_inicio + timedelta(days=6) if dados.semana_toda else data_inicio
 
-    total_criados = 0
-    horarios_criados = []
-    data_atual = data_inicio
-
     if dados.usar_padrao:
         configuracoes = (
             db.query(ConfiguracaoAgenda)
@@ -156,85 +276,32 @@ def gerar_horarios_profissional(
                 status_code=404, detail="Nenhuma configuração de agenda foi encontrada."
             )
 
-        while data_atual <= data_fim:
-            dia_semana = data_atual.weekday()
-            dias_semana_map = {
-                0: "segunda",
-                1: "terca",
-                2: "quarta",
-                3: "quinta",
-                4: "sexta",
-                5: "sabado",
-                6: "domingo",
-            }
-            dia_semana = dias_semana_map[data_atual.weekday()]
-            confs_dia = [c for c in configuracoes if c.dia_semana == dia_semana]
-
-            for conf in confs_dia:
-                hora_inicio = datetime.combine(
-                    data_atual, datetime.strptime(conf.hora_inicio, "%H:%M").time()
-                )
-                hora_fim = datetime.combine(
-                    data_atual, datetime.strptime(conf.hora_fim, "%H:%M").time()
-                )
-                atual = hora_inicio
-                duracao = timedelta(minutes=conf.duracao_slot)
-
-                while atual + duracao <= hora_fim:
-                    conflito_existente = (
-                        db.query(AgendaDisponivel)
-                        .filter_by(profissional_id=funcionario.id, data_hora=atual)
-                        .first()
-                    )
-
-                    if not conflito_existente:
-                        slot = AgendaDisponivel(
-                            profissional_id=funcionario.id,
-                            estabelecimento_id=funcionario.estabelecimento_id,
-                            data_hora=atual,
-                            ocupado=False,
-                        )
-                        db.add(slot)
-                        total_criados += 1
-                        horarios_criados.append(atual.strftime("%Y-%m-%d %H:%M"))
-
-                    atual += duracao
-
-            data_atual += timedelta(days=1)
-
+        horarios = calcular_horarios_padrao(configuracoes, data_inicio, data_fim)
     else:
-        while data_atual <= data_fim:
-            for horario_str in dados.horarios_personalizados:
-                hora = datetime.strptime(horario_str, "%H:%M").time()
-                data_hora = datetime.combine(data_atual, hora)
-
-                conflito_existente = (
-                    db.query(AgendaDisponivel)
-                    .filter_by(profissional_id=funcionario.id, data_hora=data_hora)
-                    .first()
-                )
-
-                if not conflito_existente:
-                    slot = AgendaDisponivel(
-                        profissional_id=funcionario.id,
-                        estabelecimento_id=funcionario.estabelecimento_id,
-                        data_hora=data_hora,
-                        ocupado=False,
-                    )
-                    db.add(slot)
-                    total_criados += 1
-                    horarios_criados.append(data_hora.strftime("%Y-%m-%d %H:%M"))
-
-            data_atual += timedelta(days=1)
+        horarios = calcular_horarios_personalizados(
+            dados.horarios_personalizados, data_inicio, data_fim
+        )
+
+    novos, total_ignorados = inserir_slots(
+        db,
+        [
+            (funcionario.id, funcionario.estabelecimento_id, data_hora)
+            for data_hora in horarios
+        ],
+    )
 
     db.commit()
+    invalidar_disponibilidade(funcionario.id)
 
     return {
         "mensagem": "Agenda gerada com sucesso!",
         "de": str(data_inicio),
         "ate": str(data_fim),
-        "total_criados": total_criados,
-        "horarios_criados": horarios_criados,
+        "total_criados": len(novos),
+        "total_ignorados": total_ignorados,
+        "horarios_criados": [
+            slot["data_hora"].strftime("%Y-%m-%d %H:%M") for slot in novos
+        ],
     }
 
 
@@ -261,60 +328,34 @@ def gerar_agenda_para_todos(
             detail="Nenhum profissional encontrado para este estabelecimento",
         )
 
-    data_inicio = dados.data_inicio
-    data_fim = dados.data_fim
+    configuracoes = (
+        db.query(ConfiguracaoAgenda)
+        .filter(
+            ConfiguracaoAgenda.profissional_id.in_([p.id for p in profissionais])
+        )
+        .all()
+    )
 
+    candidatos = []
     for profissional in profissionais:
-        configuracoes = (
-            db.query(ConfiguracaoAgenda)
-            .filter_by(profissional_id=profissional.id)
-            .all()
+        configuracoes_profissional = [
+            cfg for cfg in configuracoes if cfg.profissional_id == profissional.id
+        ]
+        candidatos.extend(
+            (profissional.id, estabelecimento_id, data_hora)
+            for data_hora in calcular_horarios_padrao(
+                configuracoes_profissional, dados.data_inicio, dados.data_fim
+            )
         )
 
-        if not configuracoes:
-            continue
-
-        data_atual = data_inicio
-        while data_atual <= data_fim:
-            dias_semana_map = {
-                0: "segunda",
-                1: "terca",
-                2: "quarta",
-                3: "quinta",
-                4: "sexta",
-                5: "sabado",
-                6: "domingo",
-            }
-            dia_semana = dias_semana_map[data_atual.weekday()]
-
-            config_do_dia = [
-                cfg for cfg in configuracoes if cfg.dia_semana == dia_semana
-            ]
-
-            for config in config_do_dia:
-                hora_inicio = datetime.combine(
-                    data_atual, datetime.strptime(config.hora_inicio, "%H:%M").time()
-                )
-                hora_fim = datetime.combine(
-                    data_atual, datetime.strptime(config.hora_fim, "%H:%M").time()
-                )
-                duracao = timedelta(minutes=config.duracao_slot)
-
-                horario = hora_inicio
-                while horario + duracao <= hora_fim:
-                    nova_agenda = AgendaDisponivel(
-                        profissional_id=profissional.id,
-                        estabelecimento_id=estabelecimento_id,
-                        data_hora=horario,
-                        ocupado=False,
-                        criado_em=datetime.now(),
-                    )
-                    db.add(nova_agenda)
-                    horario += duracao
-
-            data_atual += timedelta(days=1)
+    novos, total_ignorados = inserir_slots(db, candidatos)
 
     db.commit()
+    for profissional in profissionais:
+        invalidar_disponibilidade(profissional.id)
+
     return {
-        "message": "Agendas geradas com sucesso com base na configuração dos profissionais."
+        "message": "Agendas geradas com sucesso com base na configuração dos profissionais.",
+        "total_criados": len(novos),
+        "total_ignorados": total_ignorados,
     }
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-import stripe
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
+from functools import partial
 from typing import Optional
 from sqlalchemy import text
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from app.db.database import get_db, get_async_db
 from app.models.agendamento import Agendamento
 from app.schemas import (
     AgendamentoCreate,
@@ -13,15 +15,49 @@ from app.schemas import (
 )
 from app.utils.dependencies import get_current_user
 from datetime import datetime, timedelta
-from app.models.agenda_disponivel import AgendaDisponivel
 from app.models.agendamento_cancelado import AgendamentoCancelado
 from app.models.servico import Servico
-from app.models.user import User
 from app.models.funcionarios import Funcionario
-from app.models.estabelecimento import Estabelecimento
 from app.models.pontos_fidelidade_cliente import PontosFidelidadeCliente
 from app.models.configuracao_agenda import ConfiguracaoAgenda
-from app.utils.dynamo_client import salvar_servico_finalizado, salvar_ponto_fidelidade
+from app.utils.dynamo_client import (
+    TABELA_PONTOS_FIDELIDADE,
+    TABELA_SERVICOS_FINALIZADOS,
+    montar_item_servico_finalizado,
+    montar_item_ponto_fidelidade,
+)
+from app.utils.fila_cobrancas import enfileirar_cobranca
+from app.utils.fila_dynamo import enfileirar_registro_dynamo
+from app.utils.exportacao import TIPOS_EXPORTACAO, exportar_linhas
+from app.utils.paginacao import (
+    Paginacao,
+    fechar_pagina,
+    paginacao,
+    paginar_query,
+    paginar_sql,
+)
+from app.utils.disponibilidade import (
+    horario_livre,
+    indice_para,
+    invalidar_disponibilidade,
+    reservar_slots,
+    liberar_slots,
+    obter_slot,
+    duracoes_slot_por_dia,
+    duracao_slot_em,
+    agendamento_conflitante,
+)
+from app.utils.ocupacao import registrar_variacao_ocupacao
+from app.utils.idempotencia import (
+    RotaIdempotente,
+    idempotente,
+)
+from app.utils.reserva_agenda import (
+    AgendaOcupada,
+    bloqueio_agenda,
+    gravar_sem_sobreposicao,
+    reservar_agendamento,
+)
 from app.utils.notifications import (
     enviar_email_confirmacao_agendamento,
     enviar_email_cancelamento_agendamento,
@@ -32,33 +68,114 @@ from app.utils.notifications import (
     enviar_email_profissional_remarcou,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=RotaIdempotente)
+
+COLUNAS_HISTORICO = ["id", "cliente", "profissional", "servico", "preco", "horario"]
+
+
+def carregar_contexto_agendamento(db, agendamento_id: int, **filtros):
+    return (
+        db.query(Agendamento)
+        .options(
+            joinedload(Agendamento.cliente),
+            joinedload(Agendamento.profissional).joinedload(
+                Funcionario.estabelecimento
+            ),
+            joinedload(Agendamento.servico),
+        )
+        .filter(Agendamento.id == agendamento_id)
+        .filter_by(**filtros)
+        .first()
+    )
 
 
 def liberar_slots_agendamento(db, agendamento: Agendamento):
-    servico = db.query(Servico).filter(Servico.id == agendamento.servico_id).first()
+    servico = agendamento.servico
     if not servico:
         return
 
-    duracao_total = timedelta(minutes=servico.tempo)
-    slots_ocupados = (
-        db.query(AgendaDisponivel)
-        .filter(
-            AgendaDisponivel.profissional_id == agendamento.profissional_id,
-            AgendaDisponivel.data_hora >= agendamento.horario,
-            AgendaDisponivel.data_hora < agendamento.horario + duracao_total,
-            AgendaDisponivel.ocupado == True,
-        )
-        .all()
+    liberar_intervalo(
+        db,
+        agendamento,
+        agendamento.horario,
+        agendamento.horario + timedelta(minutes=servico.tempo),
+    )
+
+
+def agenda_ocupada():
+    return HTTPException(
+        status_code=409,
+        detail="A agenda desse profissional está sendo alterada. Tente novamente.",
+        headers={"Retry-After": "1"},
+    )
+
+
+def notificar_novo_agendamento(db, agendamento: Agendamento):
+    cliente = agendamento.cliente
+    profissional = agendamento.profissional
+    servico = agendamento.servico
+    estabelecimento = profissional.estabelecimento if profissional else None
+    if not (cliente and profissional and servico and estabelecimento):
+        return
+
+    enviar_email_novo_agendamento_cliente(
+        db,
+        destinatario_email=cliente.email,
+        nome_cliente=cliente.nome,
+        nome_profissional=profissional.nome,
+        nome_servico=servico.nome,
+        data=agendamento.horario.strftime("%d/%m/%Y"),
+        horario=agendamento.horario.strftime("%H:%M"),
+        nome_estabelecimento=estabelecimento.nome,
+    )
+    enviar_email_novo_agendamento_profissional(
+        db,
+        destinatario_email=profissional.email,
+        nome_profissional=profissional.nome,
+        nome_cliente=cliente.nome,
+        nome_servico=servico.nome,
+        data=agendamento.horario.strftime("%d/%m/%Y"),
+        horario=agendamento.horario.strftime("%H:%M"),
+    )
+
+
+def notificar_confirmacao(db, agendamento: Agendamento):
+    cliente = agendamento.cliente
+    profissional = agendamento.profissional
+    servico = agendamento.servico
+    if not (cliente and profissional and servico):
+        return
+
+    enviar_email_confirmacao_agendamento(
+        db,
+        nome_estabelecimento=profissional.estabelecimento.nome,
+        destinatario_email=cliente.email,
+        nome_cliente=cliente.nome,
+        nome_profissional=profissional.nome,
+        nome_servico=servico.nome,
+        data=agendamento.horario.strftime("%d/%m/%Y"),
+        horario=agendamento.horario.strftime("%H:%M"),
     )
 
-    for slot in slots_ocupados:
-        slot.ocupado = False
+
+def liberar_intervalo(db, agendamento: Agendamento, inicio, fim):
+    liberados = liberar_slots(db, agendamento.profissional_id, inicio, fim)
+    registrar_variacao_ocupacao(
+        db,
+        (
+            (agendamento.profissional_id, agendamento.estabelecimento_id, horario)
+            for horario in liberados
+        ),
+        livres=1,
+        ocupados=-1,
+    )
+    invalidar_disponibilidade(agendamento.profissional_id)
 
 
 @router.post(
     "/", response_model=AgendamentoResponse, status_code=status.HTTP_201_CREATED
 )
+@idempotente
 def criar_agendamento(
     agendamento: AgendamentoCreate,
     db: Session = Depends(get_db),
@@ -99,39 +216,15 @@ def criar_agendamento(
 
     duracao_slot = timedelta(minutes=config.duracao_slot)
 
-    slots_disponiveis = (
-        db.query(AgendaDisponivel)
-        .filter(
-            AgendaDisponivel.profissional_id == agendamento.profissional_id,
-            AgendaDisponivel.data_hora >= agendamento.horario,
-            AgendaDisponivel.ocupado == False,
-        )
-        .all()
+    indice = indice_para(
+        db, agendamento.profissional_id, agendamento.horario, duracao_total
     )
-    slots_disponiveis = list(
-        {slot.data_hora: slot for slot in slots_disponiveis}.values()
-    )
-    slots_disponiveis.sort(key=lambda s: s.data_hora)
-
-    slots_utilizados = []
-    tempo_acumulado = timedelta()
-
-    for slot in slots_disponiveis:
-        esperado = agendamento.horario + len(slots_utilizados) * duracao_slot
-        if slot.data_hora == esperado:
-            slots_utilizados.append(slot)
-            tempo_acumulado += duracao_slot
-
-            if tempo_acumulado >= duracao_total:
-                break
-        elif slots_utilizados:
-            break
-
-    if tempo_acumulado < duracao_total:
+    if not indice.esta_livre(agendamento.horario, agendamento.horario + duracao_total):
+        tempo_disponivel = indice.minutos_livres_a_partir(agendamento.horario)
         raise HTTPException(
             status_code=400,
             detail=f"Não há tempo disponível suficiente para esse serviço. "
-            f"Apenas {tempo_acumulado.total_seconds() / 60:.0f} minutos disponíveis a partir de {agendamento.horario}, "
+            f"Apenas {tempo_disponivel:.0f} minutos disponíveis a partir de {agendamento.horario}, "
             f"mas o serviço exige {servico.tempo} minutos.",
         )
 
@@ -141,55 +234,28 @@ def criar_agendamento(
         .first()
     )
 
-    novo_agendamento = Agendamento(
-        cliente_id=user["id"],
-        profissional_id=agendamento.profissional_id,
-        servico_id=agendamento.servico_id,
-        horario=agendamento.horario,
-        status="pendente",
-        estabelecimento_id=profissional.estabelecimento_id,
-    )
-
-    db.add(novo_agendamento)
-
-    db.commit()
-    db.refresh(novo_agendamento)
-
-    cliente = db.query(User).filter(User.id == novo_agendamento.cliente_id).first()
-    profissional = (
-        db.query(Funcionario)
-        .filter(Funcionario.id == novo_agendamento.profissional_id)
-        .first()
-    )
-    servico = (
-        db.query(Servico).filter(Servico.id == novo_agendamento.servico_id).first()
-    )
-    estabelecimento = (
-        db.query(Estabelecimento)
-        .filter(Estabelecimento.id == profissional.estabelecimento_id)
-        .first()
-    )
-
-    if cliente and profissional and servico and estabelecimento:
-        enviar_email_novo_agendamento_cliente(
-            destinatario_email=cliente.email,
-            nome_cliente=cliente.nome,
-            nome_profissional=profissional.nome,
-            nome_servico=servico.nome,
-            data=novo_agendamento.horario.strftime("%d/%m/%Y"),
-            horario=novo_agendamento.horario.strftime("%H:%M"),
-            nome_estabelecimento=estabelecimento.nome,
+    try:
+        novo_agendamento = reservar_agendamento(
+            db,
+            user["id"],
+            agendamento.profissional_id,
+            servico,
+            agendamento.horario,
+            duracao_slot,
+            profissional.estabelecimento_id,
+            ao_reservar=notificar_novo_agendamento,
         )
-        enviar_email_novo_agendamento_profissional(
-            destinatario_email=profissional.email,
-            nome_profissional=profissional.nome,
-            nome_cliente=cliente.nome,
-            nome_servico=servico.nome,
-            data=novo_agendamento.horario.strftime("%d/%m/%Y"),
-            horario=novo_agendamento.horario.strftime("%H:%M"),
+    except AgendaOcupada:
+        raise agenda_ocupada()
+
+    if not novo_agendamento:
+        invalidar_disponibilidade(agendamento.profissional_id)
+        raise HTTPException(
+            status_code=409,
+            detail="Esse horário acabou de ser reservado por outro cliente.",
         )
 
-    return novo_agendamento
+    return carregar_contexto_agendamento(db, novo_agendamento.id)
 
 
 @router.post("/{agendamento_id}/repetir", response_model=AgendamentoResponse)
@@ -199,10 +265,8 @@ def repetir_agendamento(
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    agendamento_original = (
-        db.query(Agendamento)
-        .filter_by(id=agendamento_id, cliente_id=user["id"])
-        .first()
+    agendamento_original = carregar_contexto_agendamento(
+        db, agendamento_id, cliente_id=user["id"]
     )
 
     if not agendamento_original:
@@ -210,43 +274,28 @@ def repetir_agendamento(
             status_code=404, detail="Agendamento original não encontrado"
         )
 
-    novo_agendamento = Agendamento(
-        cliente_id=agendamento_original.cliente_id,
-        profissional_id=agendamento_original.profissional_id,
-        servico_id=agendamento_original.servico_id,
-        horario=request.nova_data_hora,
-        status="pendente",
-    )
-    db.add(novo_agendamento)
-    db.commit()
-    db.refresh(novo_agendamento)
-
-    cliente = db.query(User).filter(User.id == novo_agendamento.cliente_id).first()
-    profissional = (
-        db.query(Funcionario)
-        .filter(Funcionario.id == novo_agendamento.profissional_id)
-        .first()
-    )
-    servico = (
-        db.query(Servico).filter(Servico.id == novo_agendamento.servico_id).first()
-    )
-    estabelecimento = (
-        db.query(Estabelecimento)
-        .filter(Estabelecimento.id == servico.estabelecimento_id)
-        .first()
+    duracao_slot = duracao_slot_em(
+        duracoes_slot_por_dia(db, agendamento_original.profissional_id),
+        request.nova_data_hora,
     )
+    try:
+        novo_agendamento = reservar_agendamento(
+            db,
+            agendamento_original.cliente_id,
+            agendamento_original.profissional_id,
+            agendamento_original.servico,
+            request.nova_data_hora,
+            duracao_slot,
+            agendamento_original.estabelecimento_id,
+            ao_reservar=notificar_confirmacao,
+        )
+    except AgendaOcupada:
+        raise agenda_ocupada()
 
-    enviar_email_confirmacao_agendamento(
-        nome_estabelecimento=estabelecimento.nome,
-        destinatario_email=cliente.email,
-        nome_cliente=cliente.nome,
-        nome_profissional=profissional.nome,
-        nome_servico=servico.nome,
-        data=novo_agendamento.horario.strftime("%d/%m/%Y"),
-        horario=novo_agendamento.horario.strftime("%H:%M"),
-    )
+    if not novo_agendamento:
+        raise HTTPException(status_code=400, detail="Horário indisponível.")
 
-    return novo_agendamento
+    return carregar_contexto_agendamento(db, novo_agendamento.id)
 
 
 @router.get("/")
@@ -284,23 +333,12 @@ def listar_agendamentos_admin(
     return [dict(r) for r in resultados]
 
 
-@router.get("/admin/historico")
-def listar_historico_admin(
-    estabelecimento_id: int,
-    profissional_id: int = Query(None),
-    servico_id: int = Query(None),
-    periodo: str = Query(None),
-    mes: str = Query(None),
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+def _consulta_historico_admin(
+    estabelecimento_id, profissional_id, servico_id, periodo, mes
 ):
-    if user["tipo_usuario"] != "admin":
-        raise HTTPException(
-            status_code=403, detail="Apenas administradores podem acessar esta rota"
-        )
-
     query_base = """
         SELECT 
+            a.id,
             u.nome AS cliente,
             f.nome AS profissional,
             s.nome AS servico,
@@ -348,22 +386,87 @@ def listar_historico_admin(
                 status_code=400, detail="Formato de mês inválido. Use YYYY-MM."
             )
 
-    query_base += " ORDER BY a.horario DESC"
+    return query_base, params
+
+
+@router.get("/admin/historico")
+def listar_historico_admin(
+    estabelecimento_id: int,
+    response: Response,
+    profissional_id: int = Query(None),
+    servico_id: int = Query(None),
+    periodo: str = Query(None),
+    mes: str = Query(None),
+    pagina: Paginacao = Depends(paginacao),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    if user["tipo_usuario"] != "admin":
+        raise HTTPException(
+            status_code=403, detail="Apenas administradores podem acessar esta rota"
+        )
+
+    query_base, params = paginar_sql(
+        *_consulta_historico_admin(
+            estabelecimento_id, profissional_id, servico_id, periodo, mes
+        ),
+        pagina,
+    )
 
     resultados = db.execute(query_base, params).fetchall()
-    return [dict(r) for r in resultados]
+    return fechar_pagina(
+        response,
+        [dict(r) for r in resultados],
+        pagina,
+        lambda r: (r["horario"], r["id"]),
+    )
+
+
+@router.get("/admin/historico/exportar")
+def exportar_historico_admin(
+    estabelecimento_id: int,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    profissional_id: int = Query(None),
+    servico_id: int = Query(None),
+    periodo: str = Query(None),
+    mes: str = Query(None),
+    user=Depends(get_current_user),
+):
+    if user["tipo_usuario"] != "admin":
+        raise HTTPException(
+            status_code=403, detail="Apenas administradores podem acessar esta rota"
+        )
+
+    query_base, params = _consulta_historico_admin(
+        estabelecimento_id, profissional_id, servico_id, periodo, mes
+    )
+    query_base += " ORDER BY a.horario DESC, a.id DESC"
+
+    linhas = exportar_linhas(text(query_base), params, COLUNAS_HISTORICO, formato)
+    return StreamingResponse(
+        linhas,
+        media_type=TIPOS_EXPORTACAO[formato],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="historico-{estabelecimento_id}.{formato}"'
+            )
+        },
+    )
 
 
 @router.get("/profissional/confirmados")
-def listar_agendamentos_profissional(
-    db: Session = Depends(get_db), user=Depends(get_current_user)
+async def listar_agendamentos_profissional(
+    response: Response,
+    pagina: Paginacao = Depends(paginacao),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
 ):
     if user["tipo_usuario"] != "profissional":
         raise HTTPException(
             status_code=403, detail="Apenas profissionais podem acessar esta rota"
         )
 
-    resultados = db.execute(
+    sql, params = paginar_sql(
         """
         SELECT 
             a.id,
@@ -381,25 +484,33 @@ def listar_agendamentos_profissional(
         JOIN clientes c on u.id = c.usuario_id
         WHERE a.profissional_id = :profissional_id
         AND a.status = 'confirmado'
-        ORDER BY a.horario ASC
     """,
         {"profissional_id": user["funcionario_id"]},
-    ).fetchall()
+        pagina,
+        descendente=False,
+    )
 
-    return [dict(r) for r in resultados]
+    resultados = await db.execute(sql, params)
+    return fechar_pagina(
+        response,
+        [dict(r) for r in resultados.mappings()],
+        pagina,
+        lambda r: (r["horario"], r["id"]),
+    )
 
 
 @router.get("/profissional/pendentes")
-def listar_agendamentos_profissional(
-    db: Session = Depends(get_db), user=Depends(get_current_user)
+async def listar_agendamentos_profissional(
+    db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)
 ):
     if user["tipo_usuario"] != "profissional":
         raise HTTPException(
             status_code=403, detail="Apenas profissionais podem acessar esta rota"
         )
 
-    resultados = db.execute(
-        """
+    resultados = await db.execute(
+        text(
+            """
         SELECT 
             a.id,
             u.nome AS cliente,
@@ -414,16 +525,17 @@ def listar_agendamentos_profissional(
         WHERE a.profissional_id = :profissional_id
         AND a.status = 'pendente'
         ORDER BY a.horario ASC
-    """,
+    """
+        ),
         {"profissional_id": user["funcionario_id"]},
-    ).fetchall()
+    )
 
-    return [dict(r) for r in resultados]
+    return [dict(r) for r in resultados.mappings()]
 
 
 @router.get("/profissional/finalizados")
-def listar_agendamentos_finalizados(
-    db: Session = Depends(get_db), user=Depends(get_current_user)
+async def listar_agendamentos_finalizados(
+    db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)
 ):
     if user["tipo_usuario"] != "profissional":
         raise HTTPException(
@@ -432,8 +544,9 @@ def listar_agendamentos_finalizados(
 
     dois_dias_atras = datetime.now() - timedelta(days=3)
 
-    resultados = db.execute(
-        """
+    resultados = await db.execute(
+        text(
+            """
         SELECT 
             a.id,
             u.nome AS cliente,
@@ -448,19 +561,22 @@ def listar_agendamentos_finalizados(
         AND a.status = 'finalizado'
         AND a.horario >= :data_limite
         ORDER BY a.horario DESC
-    """,
+    """
+        ),
         {"prof_id": user["funcionario_id"], "data_limite": dois_dias_atras},
-    ).fetchall()
+    )
 
-    return [dict(r) for r in resultados]
+    return [dict(r) for r in resultados.mappings()]
 
 
 @router.get("/profissional/historico")
-def listar_historico_filtrado(
+async def listar_historico_filtrado(
+    response: Response,
     periodo: str = Query(None),
     mes: str = Query(None),
     servico_id: int = Query(None),
-    db: Session = Depends(get_db),
+    pagina: Paginacao = Depends(paginacao),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
     if user["tipo_usuario"] != "profissional":
@@ -510,10 +626,15 @@ def listar_historico_filtrado(
         query_base += " AND a.servico_id = :servico_id"
         params["servico_id"] = servico_id
 
-    query_base += " ORDER BY a.horario DESC"
+    query_base, params = paginar_sql(query_base, params, pagina)
 
-    resultados = db.execute(query_base, params).fetchall()
-    return [dict(r) for r in resultados]
+    resultados = await db.execute(query_base, params)
+    return fechar_pagina(
+        response,
+        [dict(r) for r in resultados.mappings()],
+        pagina,
+        lambda r: (r["horario"], r["id"]),
+    )
 
 
 @router.get("/cancelados")
@@ -555,20 +676,32 @@ def listar_agendamentos_cancelados(
 
 @router.get("/meus-cancelados", response_model=list[AgendamentoCanceladoResponse])
 def listar_cancelamentos_cliente(
-    db: Session = Depends(get_db), user=Depends(get_current_user)
+    response: Response,
+    pagina: Paginacao = Depends(paginacao),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
 ):
-    return (
-        db.query(AgendamentoCancelado)
-        .filter(AgendamentoCancelado.cliente_id == user["id"])
-        .all()
+    cancelamentos = paginar_query(
+        db.query(AgendamentoCancelado).filter(
+            AgendamentoCancelado.cliente_id == user["id"]
+        ),
+        pagina,
+        AgendamentoCancelado.horario,
+        AgendamentoCancelado.id,
+    ).all()
+    return fechar_pagina(
+        response, cancelamentos, pagina, lambda c: (c.horario, c.id)
     )
 
 
 @router.get("/meus", response_model=list[dict])
-def listar_meus_agendamentos(
-    db: Session = Depends(get_db), user=Depends(get_current_user)
+async def listar_meus_agendamentos(
+    response: Response,
+    pagina: Paginacao = Depends(paginacao),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
 ):
-    sql = text(
+    sql, params = paginar_sql(
         """
     SELECT 
         a.id,
@@ -587,13 +720,15 @@ def listar_meus_agendamentos(
     JOIN estabelecimentos e on e.id = a.estabelecimento_id
     LEFT JOIN avaliacoes av ON av.agendamento_id = a.id
     WHERE a.cliente_id = :cliente_id
-    ORDER BY a.id DESC
-    """
+    """,
+        {"cliente_id": user["id"]},
+        pagina,
+        ordem_sem_paginacao="a.id DESC",
     )
 
-    result = db.execute(sql, {"cliente_id": user["id"]}).fetchall()
+    result = await db.execute(sql, params)
 
-    return [
+    linhas = [
         {
             "id": row.id,
             "servico_id": row.servico_id,
@@ -607,13 +742,19 @@ def listar_meus_agendamentos(
         }
         for row in result
     ]
+    return fechar_pagina(
+        response, linhas, pagina, lambda r: (r["horario"], r["id"])
+    )
 
 
 @router.get("/meus-finalizados", response_model=list[dict])
 def listar_meus_agendamentos(
-    db: Session = Depends(get_db), user=Depends(get_current_user)
+    response: Response,
+    pagina: Paginacao = Depends(paginacao),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
 ):
-    sql = text(
+    sql, params = paginar_sql(
         """
     SELECT 
         a.id,
@@ -631,13 +772,15 @@ def listar_meus_agendamentos(
     LEFT JOIN avaliacoes av ON av.agendamento_id = a.id
     WHERE a.cliente_id = :cliente_id
     and a.status = 'finalizado'
-    ORDER BY a.id DESC
-    """
+    """,
+        {"cliente_id": user["id"]},
+        pagina,
+        ordem_sem_paginacao="a.id DESC",
     )
 
-    result = db.execute(sql, {"cliente_id": user["id"]}).fetchall()
+    result = db.execute(sql, params).fetchall()
 
-    return [
+    linhas = [
         {
             "id": row.id,
             "servico_id": row.servico_id,
@@ -650,95 +793,30 @@ def listar_meus_agendamentos(
         }
         for row in result
     ]
-
-
-@router.put("/editar/{agendamento_id}", response_model=AgendamentoResponse)
-def editar_agendamento(
-    agendamento_id: int,
-    payload: dict,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
-):
-    agendamento = db.query(Agendamento).filter(Agendamento.id == agendamento_id).first()
-    if not agendamento:
-        raise HTTPException(status_code=404, detail="Agendamento não encontrado.")
-
-    if user["tipo_usuario"] == "cliente" and agendamento.cliente_id != user["id"]:
-        raise HTTPException(status_code=403, detail="Acesso negado.")
-    elif user["tipo_usuario"] == "profissional":
-        if agendamento.profissional_id != user["funcionario_id"]:
-            raise HTTPException(status_code=403, detail="Acesso negado.")
-        if agendamento.status != "pendente":
-            raise HTTPException(
-                status_code=400,
-                detail="Apenas agendamentos pendentes podem ser remarcados pelo profissional.",
-            )
-
-    novo_horario = (
-        db.query(AgendaDisponivel)
-        .filter(
-            AgendaDisponivel.id == payload["horario_id"],
-            AgendaDisponivel.ocupado == False,
-        )
-        .first()
+    return fechar_pagina(
+        response, linhas, pagina, lambda r: (r["horario"], r["id"])
     )
 
-    if not novo_horario:
-        raise HTTPException(status_code=400, detail="Horário indisponível.")
-
-    data_antiga = agendamento.horario
-    profissional_antigo_id = agendamento.profissional_id
-
-    liberar_slots_agendamento(db, agendamento)
 
-    if "profissional_id" in payload:
-        novo_profissional_id = int(payload["profissional_id"])
-        if novo_profissional_id != agendamento.profissional_id:
-            agendamento.profissional_id = novo_profissional_id
-
-    agendamento.horario = novo_horario.data_hora
-
-    servico = db.query(Servico).filter(Servico.id == agendamento.servico_id).first()
-    if servico:
-        duracao_total = timedelta(minutes=servico.tempo)
-        inicio = agendamento.horario
-        fim = inicio + duracao_total
-
-        novos_slots = (
-            db.query(AgendaDisponivel)
-            .filter(
-                AgendaDisponivel.profissional_id == agendamento.profissional_id,
-                AgendaDisponivel.data_hora >= inicio,
-                AgendaDisponivel.data_hora < fim,
-            )
-            .all()
-        )
-
-        for slot in novos_slots:
-            slot.ocupado = False
-
-    agendamento.status = "pendente"
-    db.commit()
+def notificar_edicao(
+    db,
+    agendamento: Agendamento,
+    tipo_usuario,
+    antigo_profissional,
+    profissional_antigo_id,
+    data_antiga,
+):
     db.refresh(agendamento)
-
-    cliente = db.query(User).filter(User.id == agendamento.cliente_id).first()
-    servico = db.query(Servico).filter(Servico.id == agendamento.servico_id).first()
-    profissional = (
-        db.query(Funcionario)
-        .filter(Funcionario.id == agendamento.profissional_id)
-        .first()
-    )
+    cliente = agendamento.cliente
+    servico = agendamento.servico
+    profissional = agendamento.profissional
 
     if profissional_antigo_id != agendamento.profissional_id:
-        antigo_profissional = (
-            db.query(Funcionario)
-            .filter(Funcionario.id == profissional_antigo_id)
-            .first()
-        )
         novo_profissional = profissional
 
         if antigo_profissional and cliente and servico:
             enviar_email_mudanca_profissional(
+                db,
                 destinatario_email=antigo_profissional.email,
                 nome_profissional=antigo_profissional.nome,
                 nome_cliente=cliente.nome,
@@ -747,6 +825,7 @@ def editar_agendamento(
 
         if novo_profissional and cliente and servico:
             enviar_email_novo_agendamento_profissional(
+                db,
                 destinatario_email=novo_profissional.email,
                 nome_cliente=cliente.nome,
                 nome_profissional=novo_profissional.nome,
@@ -756,9 +835,10 @@ def editar_agendamento(
             )
 
     elif data_antiga != agendamento.horario:
-        if user["tipo_usuario"] == "cliente":
+        if tipo_usuario == "cliente":
             if profissional and cliente and servico:
                 enviar_email_mudanca_horario(
+                    db,
                     destinatario_email=profissional.email,
                     nome_profissional=profissional.nome,
                     nome_cliente=cliente.nome,
@@ -766,9 +846,10 @@ def editar_agendamento(
                     nova_data=agendamento.horario.strftime("%d/%m/%Y"),
                     novo_horario=agendamento.horario.strftime("%H:%M"),
                 )
-        elif user["tipo_usuario"] == "profissional":
+        elif tipo_usuario == "profissional":
             if cliente and profissional and servico:
                 enviar_email_profissional_remarcou(
+                    db,
                     destinatario_email=cliente.email,
                     nome_cliente=cliente.nome,
                     nome_profissional=profissional.nome,
@@ -777,7 +858,87 @@ def editar_agendamento(
                     novo_horario=agendamento.horario.strftime("%H:%M"),
                 )
 
-    return agendamento
+
+@router.put("/editar/{agendamento_id}", response_model=AgendamentoResponse)
+def editar_agendamento(
+    agendamento_id: int,
+    payload: dict,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    agendamento = carregar_contexto_agendamento(db, agendamento_id)
+    if not agendamento:
+        raise HTTPException(status_code=404, detail="Agendamento não encontrado.")
+
+    if user["tipo_usuario"] == "cliente" and agendamento.cliente_id != user["id"]:
+        raise HTTPException(status_code=403, detail="Acesso negado.")
+    elif user["tipo_usuario"] == "profissional":
+        if agendamento.profissional_id != user["funcionario_id"]:
+            raise HTTPException(status_code=403, detail="Acesso negado.")
+        if agendamento.status != "pendente":
+            raise HTTPException(
+                status_code=400,
+                detail="Apenas agendamentos pendentes podem ser remarcados pelo profissional.",
+            )
+
+    novo_horario = obter_slot(db, payload["horario_id"])
+
+    if not novo_horario or novo_horario.ocupado:
+        raise HTTPException(status_code=400, detail="Horário indisponível.")
+
+    data_antiga = agendamento.horario
+    profissional_antigo_id = agendamento.profissional_id
+    antigo_profissional = agendamento.profissional
+
+    novo_profissional_id = int(
+        payload.get("profissional_id", agendamento.profissional_id)
+    )
+    duracao = timedelta(minutes=agendamento.servico.tempo if agendamento.servico else 0)
+
+    try:
+        with bloqueio_agenda(db, novo_profissional_id, novo_horario.data_hora.date()):
+            if agendamento_conflitante(
+                db,
+                novo_profissional_id,
+                novo_horario.data_hora,
+                duracao,
+                ignorar_id=agendamento.id,
+            ):
+                raise HTTPException(status_code=409, detail="Horário indisponível.")
+
+            liberar_slots_agendamento(db, agendamento)
+
+            agendamento.profissional_id = novo_profissional_id
+            agendamento.horario = novo_horario.data_hora
+            agendamento.horario_fim = novo_horario.data_hora + duracao
+
+            servico = agendamento.servico
+            if servico:
+                liberar_intervalo(
+                    db,
+                    agendamento,
+                    agendamento.horario,
+                    agendamento.horario + timedelta(minutes=servico.tempo),
+                )
+
+            agendamento.status = "pendente"
+            if not gravar_sem_sobreposicao(
+                db,
+                partial(
+                    notificar_edicao,
+                    db,
+                    agendamento,
+                    user["tipo_usuario"],
+                    antigo_profissional,
+                    profissional_antigo_id,
+                    data_antiga,
+                ),
+            ):
+                raise HTTPException(status_code=409, detail="Horário indisponível.")
+    except AgendaOcupada:
+        raise agenda_ocupada()
+
+    return carregar_contexto_agendamento(db, agendamento.id)
 
 
 @router.put("/confirmar/{agendamento_id}")
@@ -791,7 +952,7 @@ def confirmar_agendamento(
             status_code=403, detail="Apenas profissionais podem confirmar agendamentos."
         )
 
-    agendamento = db.query(Agendamento).filter(Agendamento.id == agendamento_id).first()
+    agendamento = carregar_contexto_agendamento(db, agendamento_id)
     if not agendamento:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado.")
 
@@ -803,73 +964,62 @@ def confirmar_agendamento(
     if agendamento.status == "confirmado":
         raise HTTPException(status_code=400, detail="Agendamento já está confirmado.")
 
-    servico = db.query(Servico).filter(Servico.id == agendamento.servico_id).first()
+    servico = agendamento.servico
     if not servico:
         raise HTTPException(status_code=404, detail="Serviço não encontrado")
 
     duracao_total = timedelta(minutes=servico.tempo)
 
-    slots_disponiveis = (
-        db.query(AgendaDisponivel)
-        .filter(
-            AgendaDisponivel.profissional_id == agendamento.profissional_id,
-            AgendaDisponivel.data_hora >= agendamento.horario,
+    if not horario_livre(
+        db, agendamento.profissional_id, agendamento.horario, duracao_total
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="Horários conflitantes — não é possível confirmar.",
         )
-        .order_by(AgendaDisponivel.data_hora)
-        .all()
-    )
-
-    slots_utilizados = []
-    tempo_acumulado = timedelta()
 
-    for slot in slots_disponiveis:
-        if not slots_utilizados:
-            if slot.data_hora != agendamento.horario:
-                continue
-        else:
-            anterior = slots_utilizados[-1].data_hora
-            if slot.data_hora != anterior + timedelta(minutes=15):
-                break
+    duracao_slot = duracao_slot_em(
+        duracoes_slot_por_dia(db, agendamento.profissional_id), agendamento.horario
+    )
 
-        if slot.ocupado:
-            raise HTTPException(
-                status_code=400,
-                detail="Horários conflitantes — não é possível confirmar.",
+    try:
+        with bloqueio_agenda(
+            db, agendamento.profissional_id, agendamento.horario.date()
+        ):
+            reservados = reservar_slots(
+                db,
+                agendamento.profissional_id,
+                agendamento.horario,
+                duracao_total,
+                duracao_slot,
             )
+            if not reservados:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Horários conflitantes — não é possível confirmar.",
+                )
 
-        slots_utilizados.append(slot)
-        tempo_acumulado += timedelta(minutes=15)
-        if tempo_acumulado >= duracao_total:
-            break
+            registrar_variacao_ocupacao(
+                db,
+                (
+                    (
+                        agendamento.profissional_id,
+                        agendamento.estabelecimento_id,
+                        horario,
+                    )
+                    for horario in reservados
+                ),
+                livres=-1,
+                ocupados=1,
+            )
 
-    for slot in slots_utilizados:
-        slot.ocupado = True
+            agendamento.status = "confirmado"
+            notificar_confirmacao(db, agendamento)
+            db.commit()
+    except AgendaOcupada:
+        raise agenda_ocupada()
 
-    agendamento.status = "confirmado"
-    db.commit()
-
-    cliente = db.query(User).filter(User.id == agendamento.cliente_id).first()
-    profissional = (
-        db.query(Funcionario)
-        .filter(Funcionario.id == agendamento.profissional_id)
-        .first()
-    )
-    estabelecimento = (
-        db.query(Estabelecimento)
-        .filter(Estabelecimento.id == profissional.estabelecimento_id)
-        .first()
-    )
-
-    if cliente and profissional and servico:
-        enviar_email_confirmacao_agendamento(
-            nome_estabelecimento=estabelecimento.nome,
-            destinatario_email=cliente.email,
-            nome_cliente=cliente.nome,
-            nome_profissional=profissional.nome,
-            nome_servico=servico.nome,
-            data=agendamento.horario.strftime("%d/%m/%Y"),
-            horario=agendamento.horario.strftime("%H:%M"),
-        )
+    invalidar_disponibilidade(agendamento.profissional_id)
 
     return {"message": "Agendamento confirmado com sucesso!"}
 
@@ -883,7 +1033,7 @@ def recusar_agendamento(
             status_code=403, detail="Apenas profissionais podem recusar agendamentos."
         )
 
-    agendamento = db.query(Agendamento).filter(Agendamento.id == agendamento_id).first()
+    agendamento = carregar_contexto_agendamento(db, agendamento_id)
 
     if not agendamento:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado.")
@@ -910,7 +1060,7 @@ def recusar_agendamento(
 def cancelar_agendamento(
     agendamento_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)
 ):
-    agendamento = db.query(Agendamento).filter(Agendamento.id == agendamento_id).first()
+    agendamento = carregar_contexto_agendamento(db, agendamento_id)
 
     if not agendamento:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado.")
@@ -950,43 +1100,41 @@ def cancelar_agendamento(
         cancelado_por=cancelado_por,
     )
 
+    cliente = agendamento.cliente
+    profissional = agendamento.profissional
+    servico = agendamento.servico
+    if cancelado_por == "cliente" and cliente and profissional and servico:
+        enviar_email_cancelamento_agendamento(
+            db,
+            destinatario_email=profissional.email,
+            nome_profissional=profissional.nome,
+            nome_cliente=cliente.nome,
+            nome_servico=servico.nome,
+            data=agendamento.horario.strftime("%d/%m/%Y"),
+            horario=agendamento.horario.strftime("%H:%M"),
+            motivo="Cancelado diretamente pelo cliente via plataforma",
+        )
+
     db.add(agendamento_cancelado)
     db.delete(agendamento)
     db.commit()
 
-    if cancelado_por == "cliente":
-        cliente = db.query(User).filter(User.id == agendamento.cliente_id).first()
-        profissional = (
-            db.query(Funcionario)
-            .filter(Funcionario.id == agendamento.profissional_id)
-            .first()
-        )
-        servico = db.query(Servico).filter(Servico.id == agendamento.servico_id).first()
-
-        if cliente and profissional and servico:
-            enviar_email_cancelamento_agendamento(
-                destinatario_email=profissional.email,
-                nome_profissional=profissional.nome,
-                nome_cliente=cliente.nome,
-                nome_servico=servico.nome,
-                data=agendamento.horario.strftime("%d/%m/%Y"),
-                horario=agendamento.horario.strftime("%H:%M"),
-                motivo="Cancelado diretamente pelo cliente via plataforma",
-            )
-
     return {"message": "Agendamento cancelado com sucesso!"}
 
 
 @router.put("/finalizar/{agendamento_id}")
+@idempotente
 def finalizar_agendamento(
-    agendamento_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)
+    agendamento_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
 ):
     if user["tipo_usuario"] != "profissional":
         raise HTTPException(
             status_code=403, detail="Apenas profissionais podem finalizar agendamentos."
         )
 
-    agendamento = db.query(Agendamento).filter(Agendamento.id == agendamento_id).first()
+    agendamento = carregar_contexto_agendamento(db, agendamento_id)
 
     if not agendamento:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado.")
@@ -1003,53 +1151,46 @@ def finalizar_agendamento(
 
     agendamento.status = "finalizado"
 
-    servico = db.query(Servico).filter(Servico.id == agendamento.servico_id).first()
-    cliente = db.query(User).filter(User.id == agendamento.cliente_id).first()
-    profissional = (
-        db.query(Funcionario)
-        .filter(Funcionario.id == agendamento.profissional_id)
-        .first()
-    )
+    servico = agendamento.servico
+    cliente = agendamento.cliente
+    profissional = agendamento.profissional
     estabelecimento_nome = (
         profissional.estabelecimento.nome
         if profissional and profissional.estabelecimento
         else "Desconhecido"
     )
 
-    salvar_servico_finalizado(
-        agendamento=agendamento,
-        cliente_nome=cliente.nome,
-        profissional_nome=profissional.nome,
-        estabelecimento_nome=estabelecimento_nome,
-        servico_nome=servico.nome,
-        tempo=servico.tempo,
-        valor=servico.preco,
-        estabelecimento_id=profissional.estabelecimento_id,
+    enfileirar_registro_dynamo(
+        db,
+        TABELA_SERVICOS_FINALIZADOS,
+        montar_item_servico_finalizado(
+            agendamento=agendamento,
+            cliente_nome=cliente.nome,
+            profissional_nome=profissional.nome,
+            estabelecimento_nome=estabelecimento_nome,
+            servico_nome=servico.nome,
+            tempo=servico.tempo,
+            valor=servico.preco,
+            estabelecimento_id=profissional.estabelecimento_id,
+        ),
+        atualizar_rollups=True,
     )
 
-    salvar_ponto_fidelidade(
-        cliente_id=cliente.id,
-        cliente_nome=cliente.nome,
-        estabelecimento_id=profissional.estabelecimento_id,
-        estabelecimento_nome=estabelecimento_nome,
-        servico_nome=servico.nome,
-        valor_servico=servico.preco,
-        data_servico=agendamento.horario,
+    enfileirar_registro_dynamo(
+        db,
+        TABELA_PONTOS_FIDELIDADE,
+        montar_item_ponto_fidelidade(
+            cliente_id=cliente.id,
+            cliente_nome=cliente.nome,
+            estabelecimento_id=profissional.estabelecimento_id,
+            estabelecimento_nome=estabelecimento_nome,
+            servico_nome=servico.nome,
+            valor_servico=servico.preco,
+            data_servico=agendamento.horario,
+        ),
     )
 
-    try:
-        stripe.PaymentIntent.create(
-            amount=int(servico.preco * 100),
-            currency="brl",
-            receipt_email=cliente.email,
-            metadata={
-                "descricao": f"Pagamento de serviço '{servico.nome}' no AgendaVip"
-            },
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Erro ao realizar cobrança: {str(e)}"
-        )
+    enfileirar_cobranca(db, agendamento, servico, cliente)
 
     if cliente and cliente.tipo_usuario == "cliente":
         registro_pontos = (
@@ -1,9 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 import secrets
-from app.utils.security import create_access_token, verify_password
+import jwt
+from app.utils.security import (
+    create_access_token,
+    get_password_hash,
+    verify_and_update_password,
+    SECRET_KEY,
+    ALGORITHM,
+)
+from app.utils.revogacao import revogar_token
 from datetime import timedelta, datetime
 from app.utils.dependencies import get_current_user
 from app.utils.recuperar_senha import enviar_email_recuperacao
@@ -13,7 +20,6 @@ from app.models.user import User
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login/")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 @router.post("/login/")
@@ -26,9 +32,17 @@ def login(user: Login, response: Response, db: Session = Depends(get_db)):
     if not user_db:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-    if not verify_password(user.senha, user_db.senha):
+    senha_valida, novo_hash = verify_and_update_password(user.senha, user_db.senha)
+    if not senha_valida:
         raise HTTPException(status_code=401, detail="Senha incorreta")
 
+    if novo_hash:
+        db.execute(
+            "UPDATE usuarios SET senha = :senha WHERE id = :id",
+            {"senha": novo_hash, "id": user_db.id},
+        )
+        db.commit()
+
     payload = {
         "sub": user_db.email,
         "id": user_db.id,
@@ -66,15 +80,21 @@ def logout(
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme),
 ):
-    existing_token = db.execute(
-        "SELECT token FROM blacklist_tokens WHERE token = :token", {"token": token}
-    ).fetchone()
-
-    if existing_token:
-        raise HTTPException(status_code=400, detail="Token já foi invalidado")
-
-    db.execute("INSERT INTO blacklist_tokens (token) VALUES (:token)", {"token": token})
-    db.commit()
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    if not payload.get("jti"):
+        db.execute(
+            "INSERT INTO blacklist_tokens (token) VALUES (:token)", {"token": token}
+        )
+        db.commit()
+        return {"message": "Logout realizado com sucesso"}
+
+    revogar_token(
+        db,
+        token=token,
+        jti=payload["jti"],
+        expira_em=datetime.utcfromtimestamp(payload["exp"]),
+    )
 
     return {"message": "Logout realizado com sucesso"}
 
@@ -127,7 +147,7 @@ def resetar_senha(data: ResetarSenhaRequest, db: Session = Depends(get_db)):
     if token_info.validade < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Token expirado.")
 
-    nova_senha_hash = pwd_context.hash(data.nova_senha)
+    nova_senha_hash = get_password_hash(data.nova_senha)
 
     db.execute(
         """
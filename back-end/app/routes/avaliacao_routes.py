@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.models.avaliacao import Avaliacao
 from app.models.agendamento import Agendamento
 from app.models.user import User
@@ -44,10 +46,12 @@ def listar_avaliacoes_com_nomes(estabelecimento_id: int, db: Session = Depends(g
 
 
 @router.get("/publicas", response_model=List[AvaliacaoPublicaResponse])
-def listar_avaliacoes_publicas(db: Session = Depends(get_db)):
+async def listar_avaliacoes_publicas(db: AsyncSession = Depends(get_async_db)):
     resultados = (
-        db.execute(
-            """
+        (
+            await db.execute(
+                text(
+                    """
         SELECT 
             u.nome AS cliente, 
             e.nome AS estabelecimento, 
@@ -59,6 +63,8 @@ def listar_avaliacoes_publicas(db: Session = Depends(get_db)):
         ORDER BY a.criado_em DESC
         LIMIT 5
     """
+                )
+            )
         )
         .mappings()
         .all()
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from datetime import time
 from app.db.database import get_db
 from app.utils.dependencies import get_current_user
 from app.models.configuracao_agenda import ConfiguracaoAgenda
+from app.utils.cache_catalogo import (
+    chave_configuracoes,
+    invalidar_catalogo,
+    resposta_em_cache,
+)
+from app.utils.disponibilidade import invalidar_disponibilidade
 from app.schemas import (
     ConfiguracaoAgendaCreate,
     ConfiguracaoAgendaUpdate,
@@ -13,6 +19,11 @@ from app.schemas import (
 router = APIRouter()
 
 
+def invalidar_configuracoes(profissional_id: int):
+    invalidar_catalogo(chave_configuracoes(profissional_id))
+    invalidar_disponibilidade(profissional_id)
+
+
 @router.post("/", response_model=ConfiguracaoAgendaResponse)
 def criar_ou_atualizar_configuracao_agenda(
     config: ConfiguracaoAgendaCreate,
@@ -44,6 +55,7 @@ def criar_ou_atualizar_configuracao_agenda(
         conflito.duracao_slot = config.duracao_slot
         db.commit()
         db.refresh(conflito)
+        invalidar_configuracoes(config.profissional_id)
         return conflito
 
     nova_config = ConfiguracaoAgenda(
@@ -58,16 +70,27 @@ def criar_ou_atualizar_configuracao_agenda(
     db.add(nova_config)
     db.commit()
     db.refresh(nova_config)
+    invalidar_configuracoes(config.profissional_id)
     return nova_config
 
 
 @router.get("/{profissional_id}", response_model=list[ConfiguracaoAgendaResponse])
 def listar_configuracoes(
-    profissional_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)
+    profissional_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
 ):
-    return (
-        db.query(ConfiguracaoAgenda)
-        .filter(ConfiguracaoAgenda.profissional_id == profissional_id)
-        .order_by(ConfiguracaoAgenda.dia_semana)
-        .all()
+    return resposta_em_cache(
+        request,
+        chave_configuracoes(profissional_id),
+        lambda: [
+            ConfiguracaoAgendaResponse.model_validate(
+                configuracao, from_attributes=True
+            )
+            for configuracao in db.query(ConfiguracaoAgenda)
+            .filter(ConfiguracaoAgenda.profissional_id == profissional_id)
+            .order_by(ConfiguracaoAgenda.dia_semana)
+            .all()
+        ],
     )
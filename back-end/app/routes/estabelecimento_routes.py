@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.utils.dependencies import get_current_user
@@ -8,6 +8,12 @@ from app.schemas import (
     EstabelecimentoUpdate,
 )
 from app.models.estabelecimento import Estabelecimento
+from app.utils.cache_catalogo import (
+    chave_estabelecimento,
+    chave_estabelecimentos,
+    invalidar_catalogo,
+    resposta_em_cache,
+)
 
 router = APIRouter()
 
@@ -48,25 +54,46 @@ def cadastrar_estabelecimento(
         {"estabelecimento_id": estabelecimento_db.id, "user_id": user["id"]},
     )
     db.commit()
+    invalidar_catalogo(chave_estabelecimentos())
 
     return {"message": "Estabelecimento cadastrado e usuário atualizado!"}
 
 
 @router.get("/", response_model=list[EstabelecimentoResponse])
 def listar_estabelecimentos(
-    db: Session = Depends(get_db), user=Depends(get_current_user)
+    request: Request, db: Session = Depends(get_db), user=Depends(get_current_user)
 ):
-    return db.query(Estabelecimento).order_by(Estabelecimento.id.asc()).all()
+    return resposta_em_cache(
+        request,
+        chave_estabelecimentos(),
+        lambda: [
+            EstabelecimentoResponse.model_validate(
+                estabelecimento, from_attributes=True
+            )
+            for estabelecimento in db.query(Estabelecimento)
+            .order_by(Estabelecimento.id.asc())
+            .all()
+        ],
+    )
 
 
 @router.get("/{id}", response_model=EstabelecimentoResponse)
-def get_estabelecimento(id: int, db: Session = Depends(get_db)):
-    estabelecimento = db.query(Estabelecimento).filter(Estabelecimento.id == id).first()
+def get_estabelecimento(id: int, request: Request, db: Session = Depends(get_db)):
+    def carregar():
+        estabelecimento = (
+            db.query(Estabelecimento).filter(Estabelecimento.id == id).first()
+        )
 
-    if not estabelecimento:
-        raise HTTPException(status_code=404, detail="Estabelecimento não encontrado")
+        if not estabelecimento:
+            raise HTTPException(
+                status_code=404, detail="Estabelecimento não encontrado"
+            )
+
+        return EstabelecimentoResponse.model_validate(
+            estabelecimento, from_attributes=True
+        )
 
-    return estabelecimento
+    return resposta_em_cache(request, chave_estabelecimento(id), carregar)
 
 
 @router.put("/{id}")
@@ -93,5 +120,6 @@ def update_estabelecimento(
 
     db.commit()
     db.refresh(estabelecimento)
+    invalidar_catalogo(chave_estabelecimentos(), chave_estabelecimento(id))
 
     return {"message": "Estabelecimento atualizado com sucesso"}
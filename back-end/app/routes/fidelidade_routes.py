@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.models.user import User
 from app.models.programa_finalidade import ProgramaFidelidade
 from app.models.resgate_fidelidade import ResgateFidelidade
@@ -15,6 +17,12 @@ from app.schemas import (
 from app.utils.dependencies import get_current_user
 from app.utils.dynamo_client import listar_pontos_cliente, buscar_ultimo_servico_cliente
 from app.utils.notifications import enviar_email_resgate_fidelidade
+from app.utils.qrcode_resgate import (
+    TIPOS_MIDIA,
+    chave_qrcode,
+    conteudo_qrcode,
+    gerar_qrcode_async,
+)
 from datetime import datetime
 
 router = APIRouter()
@@ -143,21 +151,81 @@ def resgatar_premio(resgate: ResgateFidelidadeCreate, db: Session = Depends(get_
     )
     db.add(novo_resgate)
     db.add(pontos_cliente)
+    db.flush()
+    db.refresh(novo_resgate)
+
+    enviar_email_resgate_fidelidade(
+        db,
+        destinatario_email=cliente.email,
+        nome_cliente=cliente.nome,
+        nome_servico=programa.descricao_premio,
+        nome_estabelecimento=programa.estabelecimento.nome,
+        data_resgate=novo_resgate.data_resgate or datetime.now(),
+    )
     db.commit()
     db.refresh(novo_resgate)
 
-    try:
-        enviar_email_resgate_fidelidade(
-            destinatario_email=cliente.email,
-            nome_cliente=cliente.nome,
-            nome_servico=programa.descricao_premio,
-            nome_estabelecimento=programa.estabelecimento.nome,
-            data_resgate=datetime.now(),
+    return novo_resgate
+
+
+@router.get("/resgates/{resgate_id}/qrcode")
+async def obter_qrcode_resgate(
+    resgate_id: int,
+    request: Request,
+    formato: str = Query("png", pattern="^(png|svg)$"),
+    tamanho: int = Query(10, ge=1, le=40),
+    correcao: str = Query("M", pattern="^[LMQH]$"),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    resgate = (
+        (
+            await db.execute(
+                text(
+                    """
+            SELECT
+                r.cliente_id,
+                r.data_resgate,
+                u.nome AS cliente,
+                p.descricao_premio AS servico,
+                p.estabelecimento_id,
+                e.nome AS estabelecimento
+            FROM resgates_fidelidade r
+            JOIN usuarios u ON u.id = r.cliente_id
+            JOIN programa_fidelidade p ON p.id = r.programa_fidelidade_id
+            JOIN estabelecimentos e ON e.id = p.estabelecimento_id
+            WHERE r.id = :resgate_id
+        """
+                ),
+                {"resgate_id": resgate_id},
+            )
         )
-    except Exception as e:
-        raise Exception("Erro ao enviar email: ", e)
+        .mappings()
+        .first()
+    )
 
-    return novo_resgate
+    if not resgate:
+        raise HTTPException(status_code=404, detail="Resgate não encontrado")
+
+    if user["tipo_usuario"] == "cliente":
+        autorizado = resgate["cliente_id"] == user["id"]
+    else:
+        autorizado = resgate["estabelecimento_id"] == user.get("estabelecimento_id")
+    if not autorizado:
+        raise HTTPException(status_code=403, detail="Acesso negado.")
+
+    data_resgate = resgate["data_resgate"]
+    if isinstance(data_resgate, str):
+        data_resgate = datetime.fromisoformat(data_resgate)
+
+    conteudo = conteudo_qrcode({**resgate, "data_resgate": data_resgate})
+    etag = f'"{chave_qrcode(conteudo, formato, tamanho, correcao)}"'
+    cabecalhos = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cabecalhos)
+
+    _, imagem = await gerar_qrcode_async(conteudo, formato, tamanho, correcao)
+    return Response(content=imagem, media_type=TIPOS_MIDIA[formato], headers=cabecalhos)
 
 
 @router.patch("/programa/{programa_id}", response_model=ProgramaFidelidadeResponse)
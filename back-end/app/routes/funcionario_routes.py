@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from sqlalchemy.orm import Session
 import traceback
 from app.db.database import get_db
@@ -7,6 +7,11 @@ from app.models.user import User
 from app.schemas import FuncionarioCreate, FuncionarioResponse, FuncionarioUpdate
 from app.utils.dependencies import get_current_user
 from app.utils.security import get_password_hash
+from app.utils.cache_catalogo import (
+    chave_funcionarios,
+    invalidar_catalogo,
+    resposta_em_cache,
+)
 
 router = APIRouter()
 
@@ -14,6 +19,7 @@ router = APIRouter()
 @router.get("/", response_model=list[FuncionarioResponse])
 def listar_funcionarios(
     estabelecimento_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -22,10 +28,15 @@ def listar_funcionarios(
             status_code=403, detail="Apenas administradores ou clientes podem acessar."
         )
 
-    return (
-        db.query(Funcionario)
-        .filter(Funcionario.estabelecimento_id == estabelecimento_id)
-        .all()
+    return resposta_em_cache(
+        request,
+        chave_funcionarios(estabelecimento_id),
+        lambda: [
+            FuncionarioResponse.model_validate(funcionario, from_attributes=True)
+            for funcionario in db.query(Funcionario)
+            .filter(Funcionario.estabelecimento_id == estabelecimento_id)
+            .all()
+        ],
     )
 
 
@@ -93,6 +104,7 @@ def cadastrar_funcionario(
             },
         )
         db.commit()
+        invalidar_catalogo(chave_funcionarios(user["estabelecimento_id"]))
 
         return {"message": "Funcionário cadastrado com sucesso!"}
 
@@ -131,6 +143,7 @@ def atualizar_funcionario(
 
     db.commit()
     db.refresh(funcionario_db)
+    invalidar_catalogo(chave_funcionarios(funcionario_db.estabelecimento_id))
 
     return funcionario_db
 
@@ -151,5 +164,6 @@ def deletar_funcionario(
         db.delete(usuario)
 
     db.commit()
+    invalidar_catalogo(chave_funcionarios(funcionario.estabelecimento_id))
 
     return {"message": "Funcionário excluído com sucesso!"}
@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import DBAPIError
+from app.db.database import SessionAvulsa, async_engine, engine
+from app.db.telemetria import estatisticas_pool
 from app.utils.metricas import obter_faturamento_mensal, obter_agendamentos_por_servico
 from app.utils.dependencies import get_current_user
+from app.utils.agendador import lideranca, listar_estado_jobs
+from app.utils.security import executor_senhas
 
 router = APIRouter()
 
@@ -15,3 +20,25 @@ def listar_faturamento_mensal(usuario=Depends(get_current_user)):
 def listar_agendamentos_por_dia(usuario=Depends(get_current_user)):
     estabelecimento_id = usuario["estabelecimento_id"]
     return obter_agendamentos_por_servico(estabelecimento_id)
+
+
+@router.get("/runtime")
+def listar_metricas_runtime(usuario=Depends(get_current_user)):
+    if usuario["tipo_usuario"] != "admin":
+        raise HTTPException(
+            status_code=403, detail="Apenas administradores podem acessar esta rota"
+        )
+    pool_async = None
+    if async_engine is not None:
+        pool_async = estatisticas_pool(async_engine.sync_engine)
+    try:
+        with SessionAvulsa() as db:
+            jobs = listar_estado_jobs(db)
+    except DBAPIError as e:
+        jobs = {"erro": f"{type(e.orig).__name__}: {e.orig}"}
+    return {
+        "pool": estatisticas_pool(engine),
+        "pool_async": pool_async,
+        "agendador": {"lider": lideranca.ativa, "jobs": jobs},
+        "senhas": executor_senhas.resumo(),
+    }
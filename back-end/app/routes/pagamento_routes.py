@@ -1,5 +1,6 @@
 import stripe
 from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 import os
@@ -13,12 +14,17 @@ from app.schemas import (
 from app.utils.dependencies import get_current_user
 from app.db.database import get_db
 from app.models.clientes import Cliente
+from app.utils.idempotencia import (
+    RotaIdempotente,
+    idempotente,
+    obter_chave_idempotencia,
+)
 import traceback
 
 load_dotenv()
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
-router = APIRouter()
+router = APIRouter(route_class=RotaIdempotente)
 
 
 @router.post("/cadastrar-cartao/")
@@ -135,7 +141,12 @@ def get_cartao_salvo(
 
 
 @router.post("/cobrar-agendamento/")
-def cobrar_agendamento(data: AgendamentoPagamento, db: Session = Depends(get_db)):
+@idempotente
+def cobrar_agendamento(
+    data: AgendamentoPagamento,
+    db: Session = Depends(get_db),
+    chave_idempotencia: Optional[str] = Depends(obter_chave_idempotencia),
+):
     try:
         cliente = db.query(Cliente).filter(Cliente.id == data.cliente_id).first()
         if not cliente or not cliente.stripe_customer_id:
@@ -162,6 +173,7 @@ def cobrar_agendamento(data: AgendamentoPagamento, db: Session = Depends(get_db)
             off_session=True,
             confirm=True,
             metadata={"descricao": "Pagamento de agendamento AgendaVip"},
+            idempotency_key=chave_idempotencia,
         )
 
         return {"status": "sucesso", "id_pagamento": intent.id, "valor": intent.amount}
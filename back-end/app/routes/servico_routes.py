@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.models.servico import Servico
 from app.models.agendamento import Agendamento
 from app.schemas import ServicoCreate, ServicoResponse, ServicoUpdate
 from app.utils.dependencies import get_current_user
+from app.utils.cache_catalogo import (
+    chave_servicos,
+    invalidar_catalogo,
+    resposta_em_cache,
+)
 from datetime import datetime
 
 router = APIRouter()
@@ -30,13 +35,23 @@ def criar_servico(
     db.add(novo_servico)
     db.commit()
     db.refresh(novo_servico)
+    invalidar_catalogo(chave_servicos(novo_servico.estabelecimento_id))
     return novo_servico
 
 
 @router.get("/", response_model=list[ServicoResponse])
-def listar_servicos(estabelecimento_id: int, db: Session = Depends(get_db)):
-    return (
-        db.query(Servico).filter(Servico.estabelecimento_id == estabelecimento_id).all()
+def listar_servicos(
+    estabelecimento_id: int, request: Request, db: Session = Depends(get_db)
+):
+    return resposta_em_cache(
+        request,
+        chave_servicos(estabelecimento_id),
+        lambda: [
+            ServicoResponse.model_validate(servico, from_attributes=True)
+            for servico in db.query(Servico)
+            .filter(Servico.estabelecimento_id == estabelecimento_id)
+            .all()
+        ],
     )
 
 
@@ -91,6 +106,7 @@ def atualizar_servico(
     servico.tempo = servico_atualizado.tempo
     db.commit()
     db.refresh(servico)
+    invalidar_catalogo(chave_servicos(servico.estabelecimento_id))
     return servico
 
 
@@ -104,4 +120,5 @@ def deletar_servico(
 
     db.delete(servico)
     db.commit()
+    invalidar_catalogo(chave_servicos(servico.estabelecimento_id))
     return {"message": "Serviço excluído com sucesso"}
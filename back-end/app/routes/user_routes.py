@@ -1,7 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from app.db.database import get_db
 from app.utils.security import get_password_hash
 from app.utils.dependencies import get_current_user
@@ -10,9 +9,6 @@ from app.schemas import UserResponse, UpdateUser, RegisterUser, UpdateProfile
 router = APIRouter()
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
 @router.post("/")
 def register(user: RegisterUser, db: Session = Depends(get_db)):
     user = user.dict()
@@ -174,6 +174,7 @@ class AgendamentoUpdate(BaseModel):
 class AgendamentoResponse(AgendamentoBase):
     id: int
     cliente_id: int
+    horario_fim: datetime
     status: str
     criado_em: datetime
 
@@ -0,0 +1,408 @@
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from math import gcd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models.agenda_bitmap import AgendaBitmap
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.models.agendamento import Agendamento
+
+AGENDA_ARMAZENAMENTO = os.getenv("AGENDA_ARMAZENAMENTO", "linhas")
+AGENDA_BITMAP_LOTE_MIGRACAO = int(os.getenv("AGENDA_BITMAP_LOTE_MIGRACAO", "5000"))
+MINUTOS_DIA = 24 * 60
+EPOCA = datetime(1970, 1, 1)
+
+SlotBitmap = namedtuple(
+    "SlotBitmap",
+    "id profissional_id estabelecimento_id data_hora ocupado criado_em",
+)
+
+
+def armazenamento_bitmap():
+    return AGENDA_ARMAZENAMENTO == "bitmap"
+
+
+def id_slot(profissional_id: int, data_hora: datetime):
+    return (profissional_id << 32) | int((data_hora - EPOCA).total_seconds() // 60)
+
+
+def decodificar_id_slot(horario_id: int):
+    return horario_id >> 32, EPOCA + timedelta(minutes=horario_id & 0xFFFFFFFF)
+
+
+def _bits(valor: bytes):
+    return int.from_bytes(valor, "little")
+
+
+def _bytes(bits: int, resolucao: int):
+    return bits.to_bytes((MINUTOS_DIA // resolucao + 7) // 8, "little")
+
+
+def _indices(bits: int):
+    while bits:
+        menor = bits & -bits
+        yield menor.bit_length() - 1
+        bits ^= menor
+
+
+def _minutos(momento: datetime):
+    return momento.hour * 60 + momento.minute
+
+
+def _horario(registro: AgendaBitmap, bit: int):
+    return datetime.combine(registro.data, time.min) + timedelta(
+        minutes=bit * registro.resolucao
+    )
+
+
+def _bit(registro: AgendaBitmap, momento: datetime):
+    if momento.date() != registro.data or momento.second or momento.microsecond:
+        return None
+    bit, resto = divmod(_minutos(momento), registro.resolucao)
+    return None if resto else bit
+
+
+def _ajustar_resolucao(registro: AgendaBitmap, minutos: int):
+    resolucao = gcd(registro.resolucao, minutos)
+    if resolucao == registro.resolucao:
+        return
+
+    fator = registro.resolucao // resolucao
+    for coluna in ("existentes", "ocupados"):
+        bits = 0
+        for bit in _indices(_bits(getattr(registro, coluna))):
+            bits |= 1 << (bit * fator)
+        setattr(registro, coluna, _bytes(bits, resolucao))
+    registro.resolucao = resolucao
+
+
+def _montar_registro(profissional_id, estabelecimento_id, data, horarios, agora):
+    resolucao = MINUTOS_DIA
+    for minutos, _ in horarios:
+        resolucao = gcd(resolucao, minutos)
+
+    existentes = ocupados = 0
+    for minutos, ocupado in horarios:
+        existentes |= 1 << (minutos // resolucao)
+        if ocupado:
+            ocupados |= 1 << (minutos // resolucao)
+
+    return AgendaBitmap(
+        profissional_id=profissional_id,
+        estabelecimento_id=estabelecimento_id,
+        data=data,
+        resolucao=resolucao,
+        existentes=_bytes(existentes, resolucao),
+        ocupados=_bytes(ocupados, resolucao),
+        criado_em=agora,
+    )
+
+
+def slots_do_dia(registro: AgendaBitmap, apenas_livres=True):
+    existentes = _bits(registro.existentes)
+    ocupados = _bits(registro.ocupados)
+    bits = existentes & ~ocupados if apenas_livres else existentes
+    for bit in _indices(bits):
+        data_hora = _horario(registro, bit)
+        yield SlotBitmap(
+            id_slot(registro.profissional_id, data_hora),
+            registro.profissional_id,
+            registro.estabelecimento_id,
+            data_hora,
+            bool(ocupados >> bit & 1),
+            registro.criado_em,
+        )
+
+
+def _dias(db: Session, profissional_id: int, inicio, fim=None, bloquear=False):
+    query = db.query(AgendaBitmap).filter(
+        AgendaBitmap.profissional_id == profissional_id,
+        AgendaBitmap.data >= inicio.date(),
+    )
+    if fim is not None:
+        query = query.filter(AgendaBitmap.data <= fim.date())
+    if bloquear:
+        query = query.with_for_update()
+    return query.order_by(AgendaBitmap.data).all()
+
+
+def horarios_livres(db: Session, profissional_id: int, inicio: datetime, fim=None):
+    return [
+        slot.data_hora
+        for registro in _dias(db, profissional_id, inicio, fim)
+        for slot in slots_do_dia(registro)
+        if slot.data_hora >= inicio and (fim is None or slot.data_hora < fim)
+    ]
+
+
+def horarios_livres_por_profissional(
+    db: Session, profissionais, inicio: datetime, fim: datetime
+):
+    horarios = {}
+    for registro in (
+        db.query(AgendaBitmap)
+        .filter(
+            AgendaBitmap.profissional_id.in_(profissionais),
+            AgendaBitmap.data >= inicio.date(),
+            AgendaBitmap.data <= fim.date(),
+        )
+        .order_by(AgendaBitmap.profissional_id, AgendaBitmap.data)
+    ):
+        horarios.setdefault(registro.profissional_id, []).extend(
+            slot.data_hora
+            for slot in slots_do_dia(registro)
+            if inicio <= slot.data_hora < fim
+        )
+    return horarios
+
+
+def reservar_slots_bitmap(
+    db: Session,
+    profissional_id: int,
+    inicio: datetime,
+    duracao: timedelta,
+    duracao_slot: timedelta,
+):
+    fim = inicio + duracao
+    dias = {
+        registro.data: registro
+        for registro in _dias(db, profissional_id, inicio, fim, bloquear=True)
+    }
+
+    esperado = inicio
+    while esperado < fim:
+        registro = dias.get(esperado.date())
+        bit = _bit(registro, esperado) if registro is not None else None
+        if bit is None:
+            return []
+        livres = _bits(registro.existentes) & ~_bits(registro.ocupados)
+        if not livres >> bit & 1:
+            return []
+        esperado += duracao_slot
+
+    reservados = []
+    for registro in dias.values():
+        ocupados = _bits(registro.ocupados)
+        for bit in _indices(_bits(registro.existentes) & ~ocupados):
+            data_hora = _horario(registro, bit)
+            if inicio <= data_hora < fim:
+                ocupados |= 1 << bit
+                reservados.append(data_hora)
+        registro.ocupados = _bytes(ocupados, registro.resolucao)
+    return reservados
+
+
+def liberar_slots_bitmap(
+    db: Session, profissional_id: int, inicio: datetime, fim: datetime
+):
+    liberados = []
+    for registro in _dias(db, profissional_id, inicio, fim, bloquear=True):
+        ocupados = _bits(registro.ocupados)
+        for bit in _indices(ocupados):
+            data_hora = _horario(registro, bit)
+            if inicio <= data_hora < fim:
+                ocupados &= ~(1 << bit)
+                liberados.append(data_hora)
+        registro.ocupados = _bytes(ocupados, registro.resolucao)
+    return liberados
+
+
+def inserir_slots_bitmap(db: Session, candidatos):
+    profissionais = {profissional_id for profissional_id, _, _ in candidatos}
+    inicio = min(data_hora for _, _, data_hora in candidatos)
+    fim = max(data_hora for _, _, data_hora in candidatos)
+    dias = {
+        (registro.profissional_id, registro.data): registro
+        for registro in db.query(AgendaBitmap)
+        .filter(
+            AgendaBitmap.profissional_id.in_(profissionais),
+            AgendaBitmap.data >= inicio.date(),
+            AgendaBitmap.data <= fim.date(),
+        )
+        .with_for_update()
+    }
+
+    agora = datetime.now()
+    novos = []
+    for profissional_id, estabelecimento_id, data_hora in candidatos:
+        registro = dias.get((profissional_id, data_hora.date()))
+        if registro is None:
+            registro = _montar_registro(
+                profissional_id, estabelecimento_id, data_hora.date(), [], agora
+            )
+            dias[(profissional_id, data_hora.date())] = registro
+            db.add(registro)
+
+        _ajustar_resolucao(registro, _minutos(data_hora))
+        bit = _bit(registro, data_hora)
+        existentes = _bits(registro.existentes)
+        if bit is None or existentes >> bit & 1:
+            continue
+
+        registro.existentes = _bytes(existentes | 1 << bit, registro.resolucao)
+        novos.append(
+            {
+                "profissional_id": profissional_id,
+                "estabelecimento_id": estabelecimento_id,
+                "data_hora": data_hora,
+                "ocupado": False,
+                "criado_em": agora,
+            }
+        )
+    return novos
+
+
+def obter_slot_bitmap(db: Session, horario_id: int):
+    profissional_id, data_hora = decodificar_id_slot(horario_id)
+    registro = db.get(AgendaBitmap, (profissional_id, data_hora.date()))
+    if registro is None:
+        return None
+    bit = _bit(registro, data_hora)
+    if bit is None or not _bits(registro.existentes) >> bit & 1:
+        return None
+    return SlotBitmap(
+        horario_id,
+        profissional_id,
+        registro.estabelecimento_id,
+        data_hora,
+        bool(_bits(registro.ocupados) >> bit & 1),
+        registro.criado_em,
+    )
+
+
+def remover_slot_bitmap(db: Session, slot: SlotBitmap):
+    registro = (
+        db.query(AgendaBitmap)
+        .filter(
+            AgendaBitmap.profissional_id == slot.profissional_id,
+            AgendaBitmap.data == slot.data_hora.date(),
+        )
+        .with_for_update()
+        .first()
+    )
+    if registro is None:
+        return
+
+    mascara = ~(1 << _bit(registro, slot.data_hora))
+    resolucao = registro.resolucao
+    registro.existentes = _bytes(_bits(registro.existentes) & mascara, resolucao)
+    registro.ocupados = _bytes(_bits(registro.ocupados) & mascara, resolucao)
+
+
+def contagens_bitmap(db: Session, data_inicio=None, data_fim=None):
+    query = db.query(AgendaBitmap)
+    if data_inicio is not None:
+        query = query.filter(AgendaBitmap.data >= data_inicio)
+    if data_fim is not None:
+        query = query.filter(AgendaBitmap.data <= data_fim)
+
+    contagens = []
+    for registro in query:
+        existentes = _bits(registro.existentes)
+        ocupados = _bits(registro.ocupados) & existentes
+        for ocupado, bits in ((False, existentes & ~ocupados), (True, ocupados)):
+            if bits:
+                contagens.append(
+                    (
+                        registro.profissional_id,
+                        registro.estabelecimento_id,
+                        registro.data,
+                        ocupado,
+                        bin(bits).count("1"),
+                    )
+                )
+    return contagens
+
+
+def migrar_para_bitmap(db: Session, profissionais=None):
+    confirmados = db.query(Agendamento.profissional_id, Agendamento.horario).filter(
+        Agendamento.status == "confirmado"
+    )
+    linhas = db.query(
+        AgendaDisponivel.profissional_id,
+        AgendaDisponivel.estabelecimento_id,
+        AgendaDisponivel.data_hora,
+        AgendaDisponivel.ocupado,
+    )
+    bitmaps = db.query(AgendaBitmap)
+    if profissionais is not None:
+        confirmados = confirmados.filter(
+            Agendamento.profissional_id.in_(profissionais)
+        )
+        linhas = linhas.filter(AgendaDisponivel.profissional_id.in_(profissionais))
+        bitmaps = bitmaps.filter(AgendaBitmap.profissional_id.in_(profissionais))
+    confirmados = set(confirmados)
+    linhas = linhas.order_by(
+        AgendaDisponivel.profissional_id, AgendaDisponivel.data_hora
+    ).yield_per(AGENDA_BITMAP_LOTE_MIGRACAO)
+
+    bitmaps.delete(synchronize_session=False)
+    agora = datetime.now()
+    dias = {}
+    total_linhas = marcados = 0
+    for profissional_id, estabelecimento_id, data_hora, ocupado in linhas:
+        _, horarios = dias.setdefault(
+            (profissional_id, data_hora.date()), (estabelecimento_id, [])
+        )
+        if not ocupado and (profissional_id, data_hora) in confirmados:
+            ocupado = True
+            marcados += 1
+        horarios.append((_minutos(data_hora), ocupado))
+        total_linhas += 1
+
+    registros = [
+        _montar_registro(profissional_id, estabelecimento_id, data, horarios, agora)
+        for (profissional_id, data), (estabelecimento_id, horarios) in dias.items()
+    ]
+    db.add_all(registros)
+    db.commit()
+    return {"linhas": total_linhas, "dias": len(registros), "marcados": marcados}
+
+
+def migrar_para_linhas(db: Session, profissionais=None):
+    linhas = db.query(AgendaDisponivel)
+    bitmaps = db.query(AgendaBitmap)
+    if profissionais is not None:
+        linhas = linhas.filter(AgendaDisponivel.profissional_id.in_(profissionais))
+        bitmaps = bitmaps.filter(AgendaBitmap.profissional_id.in_(profissionais))
+
+    linhas.delete(synchronize_session=False)
+    total_linhas = 0
+    lote = []
+    for registro in bitmaps.yield_per(AGENDA_BITMAP_LOTE_MIGRACAO):
+        for slot in slots_do_dia(registro, apenas_livres=False):
+            lote.append(
+                {
+                    "profissional_id": slot.profissional_id,
+                    "estabelecimento_id": slot.estabelecimento_id,
+                    "data_hora": slot.data_hora,
+                    "ocupado": slot.ocupado,
+                    "criado_em": slot.criado_em,
+                }
+            )
+        if len(lote) >= AGENDA_BITMAP_LOTE_MIGRACAO:
+            db.execute(insert(AgendaDisponivel.__table__), lote)
+            total_linhas += len(lote)
+            lote = []
+    if lote:
+        db.execute(insert(AgendaDisponivel.__table__), lote)
+        total_linhas += len(lote)
+
+    db.commit()
+    return {"linhas": total_linhas}
+
+
+if __name__ == "__main__":
+    from app.db.database import SessionLocal
+
+    destino = sys.argv[1] if len(sys.argv) > 1 else "bitmap"
+    db = SessionLocal()
+    try:
+        if destino == "linhas":
+            print(migrar_para_linhas(db))
+        else:
+            print(migrar_para_bitmap(db))
+    finally:
+        db.close()
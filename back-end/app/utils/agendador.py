@@ -0,0 +1,234 @@
+import os
+import socket
+import time
+import traceback
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock
+from apscheduler.events import EVENT_JOB_EXECUTED
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal, engine_avulso
+from app.models.estado_job import EstadoJob
+from app.utils.fila_cobrancas import processar_fila_cobrancas
+from app.utils.fila_dynamo import processar_fila_dynamo
+from app.utils.fila_email import processar_fila_emails
+from app.utils.idempotencia import purgar_respostas_expiradas
+from app.utils.ocupacao import OCUPACAO_JANELA_RECONCILIACAO, reconciliar_ocupacao
+from app.utils.reminder import verificar_e_enviar_notificacoes_agendamentos
+from app.utils.revogacao import (
+    REVOGACAO_INTERVALO_SINCRONIZACAO,
+    purgar_tokens_expirados,
+    sincronizar_revogacoes,
+)
+
+AGENDADOR_NA_API = os.getenv("AGENDADOR_NA_API", "true").lower() == "true"
+AGENDADOR_CHAVE_LIDERANCA = int(os.getenv("AGENDADOR_CHAVE_LIDERANCA", "7310024"))
+AGENDADOR_TOLERANCIA_ATRASO = int(os.getenv("AGENDADOR_TOLERANCIA_ATRASO", "30"))
+
+
+def _reconciliar_ocupacao_recente(db: Session):
+    reconciliar_ocupacao(
+        db, date.today() - timedelta(days=OCUPACAO_JANELA_RECONCILIACAO)
+    )
+
+
+JOBS_UNICOS = (
+    (
+        "lembrete_agendamentos",
+        verificar_e_enviar_notificacoes_agendamentos,
+        "interval",
+        {"minutes": 1},
+    ),
+    ("processar_emails", processar_fila_emails, "interval", {"seconds": 5}),
+    ("processar_dynamo", processar_fila_dynamo, "interval", {"seconds": 5}),
+    ("processar_cobrancas", processar_fila_cobrancas, "interval", {"seconds": 5}),
+    ("purgar_tokens_expirados", purgar_tokens_expirados, "interval", {"hours": 1}),
+    (
+        "purgar_respostas_idempotentes",
+        purgar_respostas_expiradas,
+        "interval",
+        {"hours": 1},
+    ),
+    ("reconciliar_ocupacao", _reconciliar_ocupacao_recente, "cron", {"hour": 3}),
+)
+
+
+def _instancia():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Lideranca:
+    def __init__(self, engine, chave: int):
+        self.engine = engine
+        self.chave = chave
+        self._conexao = None
+        self._lock = Lock()
+
+    @property
+    def ativa(self) -> bool:
+        return self.engine.dialect.name != "postgresql" or self._conexao is not None
+
+    def _descartar(self):
+        try:
+            self._conexao.invalidate()
+        finally:
+            self._conexao = None
+
+    def confirmar(self) -> bool:
+        if self.engine.dialect.name != "postgresql":
+            return True
+
+        with self._lock:
+            if self._conexao is not None:
+                try:
+                    self._conexao.exec_driver_sql("SELECT 1")
+                    return True
+                except DBAPIError:
+                    self._descartar()
+
+            try:
+                conexao = self.engine.connect().execution_options(
+                    isolation_level="AUTOCOMMIT"
+                )
+            except DBAPIError:
+                return False
+            try:
+                obtida = conexao.execute(
+                    text("SELECT pg_try_advisory_lock(:chave)"), {"chave": self.chave}
+                ).scalar()
+            except DBAPIError:
+                conexao.invalidate()
+                conexao.close()
+                return False
+
+            if not obtida:
+                conexao.close()
+                return False
+            self._conexao = conexao
+            return True
+
+    def renunciar(self):
+        with self._lock:
+            if self._conexao is None:
+                return
+            try:
+                self._conexao.execute(
+                    text("SELECT pg_advisory_unlock(:chave)"), {"chave": self.chave}
+                )
+                self._conexao.close()
+            except DBAPIError:
+                self._descartar()
+            self._conexao = None
+
+
+lideranca = Lideranca(engine_avulso, AGENDADOR_CHAVE_LIDERANCA)
+
+
+def _executar_como_lider(funcao):
+    def executar():
+        if not lideranca.confirmar():
+            return None
+
+        inicio = datetime.now(timezone.utc)
+        comeco = time.perf_counter()
+        erro = None
+        db = SessionLocal()
+        try:
+            funcao(db)
+        except Exception as e:
+            traceback.print_exc()
+            erro = f"{type(e).__name__}: {e}"
+        finally:
+            db.close()
+        return inicio, time.perf_counter() - comeco, erro
+
+    return executar
+
+
+def registrar_execucao(
+    db: Session, nome: str, inicio: datetime, duracao: float, atraso: float, erro=None
+):
+    estado = db.get(EstadoJob, nome)
+    if estado is None:
+        estado = EstadoJob(
+            nome=nome, execucoes=0, falhas=0, maior_duracao_ms=0, maior_atraso_ms=0
+        )
+        db.add(estado)
+
+    estado.instancia = _instancia()
+    estado.execucoes += 1
+    estado.ultima_execucao = inicio.astimezone(timezone.utc).replace(tzinfo=None)
+    estado.ultima_duracao_ms = round(duracao * 1000, 3)
+    estado.ultimo_atraso_ms = round(atraso * 1000, 3)
+    estado.maior_duracao_ms = max(estado.maior_duracao_ms, estado.ultima_duracao_ms)
+    estado.maior_atraso_ms = max(estado.maior_atraso_ms, estado.ultimo_atraso_ms)
+    if erro:
+        estado.falhas += 1
+        estado.ultimo_erro = erro
+    db.commit()
+
+
+def _ao_executar(evento):
+    if not evento.retval:
+        return
+
+    inicio, duracao, erro = evento.retval
+    atraso = max((inicio - evento.scheduled_run_time).total_seconds(), 0.0)
+    db = SessionLocal()
+    try:
+        registrar_execucao(db, evento.job_id, inicio, duracao, atraso, erro)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        db.close()
+
+
+def listar_estado_jobs(db: Session):
+    return [
+        {
+            "nome": estado.nome,
+            "instancia": estado.instancia,
+            "execucoes": estado.execucoes,
+            "falhas": estado.falhas,
+            "ultima_execucao": estado.ultima_execucao,
+            "ultima_duracao_ms": estado.ultima_duracao_ms,
+            "ultimo_atraso_ms": estado.ultimo_atraso_ms,
+            "maior_duracao_ms": estado.maior_duracao_ms,
+            "maior_atraso_ms": estado.maior_atraso_ms,
+            "ultimo_erro": estado.ultimo_erro,
+        }
+        for estado in db.query(EstadoJob).order_by(EstadoJob.nome)
+    ]
+
+
+def _sincronizar_revogacoes():
+    db = SessionLocal()
+    try:
+        sincronizar_revogacoes(db)
+    finally:
+        db.close()
+
+
+def registrar_jobs_locais(scheduler):
+    scheduler.add_job(
+        _sincronizar_revogacoes,
+        "interval",
+        seconds=REVOGACAO_INTERVALO_SINCRONIZACAO,
+        id="sincronizar_revogacoes",
+        next_run_time=datetime.now(),
+    )
+
+
+def registrar_jobs_unicos(scheduler):
+    for nome, funcao, gatilho, parametros in JOBS_UNICOS:
+        scheduler.add_job(
+            _executar_como_lider(funcao),
+            gatilho,
+            id=nome,
+            name=nome,
+            coalesce=True,
+            misfire_grace_time=AGENDADOR_TOLERANCIA_ATRASO,
+            **parametros,
+        )
+    scheduler.add_listener(_ao_executar, EVENT_JOB_EXECUTED)
@@ -0,0 +1,158 @@
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.models.agendamento import Agendamento
+from app.models.estabelecimento import Estabelecimento
+from app.models.funcionarios import Funcionario
+from app.models.servico import Servico
+from app.models.user import User
+from app.utils.disponibilidade import consulta_horarios_livres
+
+BENCH_TOTAL_SLOTS = int(os.getenv("BENCH_TOTAL_SLOTS", "100000"))
+BENCH_PROFISSIONAIS = int(os.getenv("BENCH_PROFISSIONAIS", "50"))
+BENCH_REPETICOES = int(os.getenv("BENCH_REPETICOES", "20"))
+INDICE_ESPERADO = "ix_agenda_disponivel_livres"
+SLOTS_POR_DIA = 20
+
+
+def _popular(db: Session, inicio: datetime):
+    estabelecimento = Estabelecimento(
+        nome="Benchmark", cnpj=f"bench-{time.time_ns()}", tipo_servico="bench"
+    )
+    db.add(estabelecimento)
+    db.flush()
+    cliente = User(
+        nome="Benchmark",
+        email=f"bench-{time.time_ns()}@exemplo.com",
+        senha="-",
+        tipo_usuario="cliente",
+    )
+    servico = Servico(
+        nome="Benchmark", preco=0, tempo=30, estabelecimento_id=estabelecimento.id
+    )
+    profissionais = [
+        Funcionario(
+            nome=f"Benchmark {i}",
+            email=f"bench-{time.time_ns()}-{i}@exemplo.com",
+            senha="-",
+            cargo="bench",
+            estabelecimento_id=estabelecimento.id,
+        )
+        for i in range(BENCH_PROFISSIONAIS)
+    ]
+    db.add_all([cliente, servico, *profissionais])
+    db.flush()
+
+    aleatorio = random.Random(42)
+    slots, agendamentos = [], []
+    por_profissional = BENCH_TOTAL_SLOTS // len(profissionais)
+    for profissional in profissionais:
+        for i in range(por_profissional):
+            data_hora = inicio + timedelta(
+                days=i // SLOTS_POR_DIA, minutes=30 * (i % SLOTS_POR_DIA)
+            )
+            ocupado = aleatorio.random() < 0.25
+            slots.append(
+                {
+                    "profissional_id": profissional.id,
+                    "estabelecimento_id": estabelecimento.id,
+                    "data_hora": data_hora,
+                    "ocupado": ocupado,
+                    "criado_em": inicio,
+                }
+            )
+            if ocupado and aleatorio.random() < 0.5:
+                agendamentos.append(
+                    {
+                        "cliente_id": cliente.id,
+                        "profissional_id": profissional.id,
+                        "servico_id": servico.id,
+                        "estabelecimento_id": estabelecimento.id,
+                        "horario": data_hora,
+                        "horario_fim": data_hora + timedelta(minutes=30),
+                        "status": "confirmado",
+                    }
+                )
+
+    db.execute(insert(AgendaDisponivel.__table__), slots)
+    db.execute(insert(Agendamento.__table__), agendamentos)
+    db.flush()
+    return profissionais[len(profissionais) // 2].id
+
+
+def _consulta_not_in(profissional_id: int, inicio: datetime, fim: datetime):
+    confirmados = select(Agendamento.horario).where(
+        Agendamento.profissional_id == profissional_id,
+        Agendamento.status == "confirmado",
+    )
+    return (
+        select(AgendaDisponivel)
+        .where(
+            AgendaDisponivel.profissional_id == profissional_id,
+            AgendaDisponivel.data_hora >= inicio,
+            AgendaDisponivel.data_hora < fim,
+            AgendaDisponivel.data_hora.notin_(confirmados),
+            AgendaDisponivel.ocupado == False,
+        )
+        .order_by(AgendaDisponivel.data_hora)
+    )
+
+
+def explicar(db: Session, consulta):
+    dialeto = db.bind.dialect
+    compilada = consulta.compile(dialect=dialeto)
+    params = compilada.params
+    if compilada.positional:
+        params = tuple(params[nome] for nome in compilada.positiontup)
+    prefixo = "EXPLAIN QUERY PLAN " if dialeto.name == "sqlite" else "EXPLAIN "
+    linhas = db.connection().exec_driver_sql(prefixo + str(compilada), params)
+    return "\n".join(str(linha[-1]) for linha in linhas)
+
+
+def _medir(db: Session, consulta):
+    inicio = time.perf_counter()
+    for _ in range(BENCH_REPETICOES):
+        linhas = db.execute(consulta).scalars().all()
+    return (time.perf_counter() - inicio) / BENCH_REPETICOES, len(linhas)
+
+
+def executar(db: Session):
+    dialeto = db.bind.dialect.name
+    inicio = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    profissional_id = _popular(db, inicio + timedelta(days=1))
+    db.execute(select(1))
+    db.connection().exec_driver_sql("ANALYZE")
+
+    fim = inicio + timedelta(days=90)
+    consulta = consulta_horarios_livres(profissional_id, inicio, fim)
+    plano = explicar(db, consulta)
+    assert INDICE_ESPERADO in plano, plano
+
+    tempo_not_in, linhas_not_in = _medir(
+        db, _consulta_not_in(profissional_id, inicio, fim)
+    )
+    tempo_anti_join, linhas_anti_join = _medir(db, consulta)
+    return {
+        "dialeto": dialeto,
+        "slots": BENCH_TOTAL_SLOTS,
+        "plano": plano,
+        "not_in_ms": round(tempo_not_in * 1000, 2),
+        "not_in_linhas": linhas_not_in,
+        "anti_join_ms": round(tempo_anti_join * 1000, 2),
+        "anti_join_linhas": linhas_anti_join,
+    }
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        for chave, valor in executar(db).items():
+            print(f"{chave}: {valor}")
+    finally:
+        db.rollback()
+        db.close()
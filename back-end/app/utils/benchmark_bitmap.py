@@ -0,0 +1,163 @@
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, insert
+from sqlalchemy.orm import Session
+from app.db import database
+from app.db.database import SessionLocal
+from app.models.agenda_bitmap import AgendaBitmap
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.models.estabelecimento import Estabelecimento
+from app.models.funcionarios import Funcionario
+from app.utils import agenda_bitmap
+from app.utils.security import create_access_token
+
+BENCH_DIAS_BITMAP = int(os.getenv("BENCH_DIAS_BITMAP", "365"))
+BENCH_REPETICOES = int(os.getenv("BENCH_REPETICOES", "5"))
+SLOTS_POR_DIA = 24
+
+
+def _popular(db: Session):
+    estabelecimento = Estabelecimento(
+        nome="Benchmark", cnpj=f"bench-{time.time_ns()}", tipo_servico="bench"
+    )
+    db.add(estabelecimento)
+    db.flush()
+    profissional = Funcionario(
+        nome="Benchmark",
+        email=f"bench-{time.time_ns()}-p@exemplo.com",
+        senha="-",
+        cargo="bench",
+        estabelecimento_id=estabelecimento.id,
+    )
+    db.add(profissional)
+    db.flush()
+
+    inicio = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    db.execute(
+        insert(AgendaDisponivel.__table__),
+        [
+            {
+                "profissional_id": profissional.id,
+                "estabelecimento_id": estabelecimento.id,
+                "data_hora": inicio + timedelta(days=1 + dia, minutes=30 * i),
+                "ocupado": i % 4 == 0,
+                "criado_em": inicio,
+            }
+            for dia in range(BENCH_DIAS_BITMAP)
+            for i in range(SLOTS_POR_DIA)
+        ],
+    )
+    db.commit()
+    return estabelecimento, profissional
+
+
+def _limpar(db: Session, estabelecimento, profissional):
+    db.query(AgendaBitmap).filter(
+        AgendaBitmap.profissional_id == profissional.id
+    ).delete()
+    db.query(AgendaDisponivel).filter(
+        AgendaDisponivel.profissional_id == profissional.id
+    ).delete()
+    db.delete(profissional)
+    db.delete(estabelecimento)
+    db.commit()
+
+
+def _slots(db: Session, profissional_id: int):
+    return sorted(
+        db.query(AgendaDisponivel.data_hora, AgendaDisponivel.ocupado).filter(
+            AgendaDisponivel.profissional_id == profissional_id
+        )
+    )
+
+
+def _medir(cliente: TestClient, url: str, cabecalhos: dict):
+    consultas = [0]
+
+    def contar(*_):
+        consultas[0] += 1
+
+    motor = database.async_engine.sync_engine
+    event.listen(motor, "before_cursor_execute", contar)
+    try:
+        cliente.get(url, headers=cabecalhos)
+        consultas[0] = 0
+        inicio = time.perf_counter()
+        for _ in range(BENCH_REPETICOES):
+            resposta = cliente.get(url, headers=cabecalhos)
+            assert resposta.status_code == 200, resposta.text
+        segundos = (time.perf_counter() - inicio) / BENCH_REPETICOES
+    finally:
+        event.remove(motor, "before_cursor_execute", contar)
+
+    tracemalloc.start()
+    try:
+        cliente.get(url, headers=cabecalhos)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ms": round(segundos * 1000, 1),
+        "consultas": consultas[0] / BENCH_REPETICOES,
+        "pico_mib": round(pico / 2**20, 2),
+        "horarios": len(resposta.json()),
+    }
+
+
+def executar(app):
+    db = SessionLocal()
+    estabelecimento, profissional = _popular(db)
+    armazenamento_original = agenda_bitmap.AGENDA_ARMAZENAMENTO
+    cabecalhos = {
+        "Authorization": "Bearer "
+        + create_access_token(
+            {"sub": "bench@exemplo.com", "id": 0, "tipo_usuario": "cliente"}
+        )
+    }
+    url = f"/agenda/?profissional_id={profissional.id}"
+    try:
+        antes = _slots(db, profissional.id)
+        migracao = agenda_bitmap.migrar_para_bitmap(db, [profissional.id])
+        bytes_bitmap = (
+            db.query(
+                func.sum(
+                    func.length(AgendaBitmap.existentes)
+                    + func.length(AgendaBitmap.ocupados)
+                )
+            )
+            .filter(AgendaBitmap.profissional_id == profissional.id)
+            .scalar()
+        )
+
+        resultado = {
+            "dialeto": db.bind.dialect.name,
+            "slots": migracao["linhas"],
+            "dias": migracao["dias"],
+            "bytes_bitmap": bytes_bitmap,
+        }
+        with TestClient(app) as cliente:
+            for modo in ("linhas", "bitmap"):
+                agenda_bitmap.AGENDA_ARMAZENAMENTO = modo
+                resultado[modo] = _medir(cliente, url, cabecalhos)
+
+        agenda_bitmap.migrar_para_linhas(db, [profissional.id])
+        resultado["ida_e_volta_identica"] = (
+            migracao["marcados"] == 0 and _slots(db, profissional.id) == antes
+        )
+        return resultado
+    finally:
+        agenda_bitmap.AGENDA_ARMAZENAMENTO = armazenamento_original
+        _limpar(db, estabelecimento, profissional)
+        db.close()
+
+
+if __name__ == "__main__":
+    from app.main import app, scheduler
+
+    scheduler.shutdown(wait=False)
+    for chave, valor in executar(app).items():
+        print(f"{chave}: {valor}")
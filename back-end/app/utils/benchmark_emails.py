@@ -0,0 +1,513 @@
+import os
+import timeit
+from datetime import datetime
+from app.utils.fila_email import _preparar_contexto
+from app.utils.qrcode_resgate import gerar_qrcode_base64
+from app.utils.templates_email import FRONTEND_LOGIN_URL, obter_modelo
+
+BENCH_REPETICOES_EMAIL = int(os.getenv("BENCH_REPETICOES_EMAIL", "2000"))
+
+
+def email_mudanca_horario(
+    nome_profissional, nome_cliente, nome_servico, nova_data, novo_horario
+):
+    return {
+        "assunto": "Alteração de Agendamento - AgendaVip",
+        "texto": f"O cliente {nome_cliente} alterou a data/horário do serviço {nome_servico}. Nova data: {nova_data}, novo horário: {novo_horario}.",
+        "html": montar_html_mudanca_horario(
+            nome_profissional, nome_cliente, nome_servico, nova_data, novo_horario
+        ),
+    }
+
+
+def email_mudanca_profissional(nome_profissional, nome_cliente, nome_servico):
+    return {
+        "assunto": "Atualização de Agendamento - AgendaVip",
+        "texto": f"O cliente {nome_cliente} alterou o profissional para o serviço {nome_servico}.",
+        "html": montar_html_mudanca_profissional(
+            nome_profissional, nome_cliente, nome_servico
+        ),
+    }
+
+
+def montar_html_mudanca_horario(profissional, cliente, servico, data, hora):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Alteração de Agendamento</h2>
+            <p>Olá <strong>{profissional}</strong>,</p>
+            <p>O cliente <strong>{cliente}</strong> alterou o horário do serviço <strong>{servico}</strong>.</p>
+            <p>🗓️ Nova data: <strong>{data}</strong><br>⏰ Novo horário: <strong>{hora}</strong></p>
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Acessar Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def montar_html_mudanca_profissional(profissional, cliente, servico):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Atualização de Agendamento</h2>
+            <p>Olá <strong>{profissional}</strong>,</p>
+            <p>O cliente <strong>{cliente}</strong> alterou o profissional responsável pelo serviço <strong>{servico}</strong>.</p>
+            <p>Este agendamento não será mais realizado por você.</p>
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Acessar Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def email_confirmacao_agendamento(
+    nome_cliente, nome_profissional, nome_servico, data, horario, nome_estabelecimento
+):
+    return {
+        "assunto": f"Agendamento Confirmado - {nome_estabelecimento}",
+        "texto": f"Olá {nome_cliente}, seu agendamento no estabelecimento {nome_estabelecimento} para o serviço {nome_servico} com {nome_profissional} foi confirmado. Data: {data}, Horário: {horario}.",
+        "html": montar_html_confirmacao_agendamento(
+            nome_cliente,
+            nome_profissional,
+            nome_servico,
+            data,
+            horario,
+            nome_estabelecimento,
+        ),
+    }
+
+
+def montar_html_confirmacao_agendamento(
+    cliente, profissional, servico, data, hora, estabelecimento
+):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Agendamento Confirmado</h2>
+            <p>Olá <strong>{cliente}</strong>,</p>
+            <p>Seu agendamento foi confirmado com sucesso no estabelecimento <strong>{estabelecimento}</strong>!</p>
+            <p>
+                📌 Serviço: <strong>{servico}</strong><br>
+                👤 Profissional: <strong>{profissional}</strong><br>
+                🗓️ Data: <strong>{data}</strong><br>
+                ⏰ Horário: <strong>{hora}</strong>
+            </p>
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Acessar Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def email_cancelamento_agendamento(
+    nome_profissional, nome_cliente, nome_servico, data, horario, motivo=None
+):
+    return {
+        "assunto": "Agendamento Cancelado - AgendaVip",
+        "texto": f"O cliente {nome_cliente} cancelou o agendamento do serviço {nome_servico} marcado para {data} às {horario}."
+        + (f"\nMotivo: {motivo}" if motivo else ""),
+        "html": montar_html_cancelamento_agendamento(
+            nome_profissional, nome_cliente, nome_servico, data, horario, motivo
+        ),
+    }
+
+
+def montar_html_cancelamento_agendamento(
+    profissional, cliente, servico, data, hora, motivo
+):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Agendamento Cancelado</h2>
+            <p>Olá <strong>{profissional}</strong>,</p>
+            <p>O cliente <strong>{cliente}</strong> cancelou o agendamento do serviço <strong>{servico}</strong>.</p>
+            <p>
+                📅 Data: <strong>{data}</strong><br>
+                ⏰ Horário: <strong>{hora}</strong>
+            </p>
+            {f"<p><strong>Motivo:</strong> {motivo}</p>" if motivo else ""}
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Acessar Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def email_novo_agendamento_profissional(
+    nome_profissional, nome_cliente, nome_servico, data, horario
+):
+    return {
+        "assunto": "Novo Agendamento Atribuído - AgendaVip",
+        "texto": f"Olá {nome_profissional}, você foi designado para um novo agendamento do serviço {nome_servico} com o cliente {nome_cliente}. Data: {data}, Horário: {horario}.",
+        "html": montar_html_novo_agendamento_profissional(
+            nome_profissional, nome_cliente, nome_servico, data, horario
+        ),
+    }
+
+
+def montar_html_novo_agendamento_profissional(
+    profissional, cliente, servico, data, hora
+):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Novo Agendamento Atribuído</h2>
+            <p>Olá <strong>{profissional}</strong>,</p>
+            <p>Você foi designado para um novo agendamento:</p>
+            <p>
+                📌 Serviço: <strong>{servico}</strong><br>
+                👤 Cliente: <strong>{cliente}</strong><br>
+                🗓️ Data: <strong>{data}</strong><br>
+                ⏰ Horário: <strong>{hora}</strong>
+            </p>
+            <p>Esse agendamento ainda está pendente de confirmação.</p>
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Acessar Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def email_novo_agendamento_cliente(
+    nome_cliente, nome_profissional, nome_servico, data, horario, nome_estabelecimento
+):
+    return {
+        "assunto": "Novo Agendamento Criado - AgendaVip",
+        "texto": f"Olá {nome_cliente}, seu agendamento para o serviço {nome_servico} com {nome_profissional} foi criado no estabelecimento {nome_estabelecimento}. Data: {data}, Horário: {horario}.",
+        "html": montar_html_novo_agendamento_cliente(
+            nome_cliente,
+            nome_profissional,
+            nome_servico,
+            data,
+            horario,
+            nome_estabelecimento,
+        ),
+    }
+
+
+def montar_html_novo_agendamento_cliente(
+    cliente, profissional, servico, data, hora, estabelecimento
+):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Agendamento Realizado</h2>
+            <p>Olá <strong>{cliente}</strong>,</p>
+            <p>Seu agendamento foi registrado com sucesso no estabelecimento <strong>{estabelecimento}</strong>:</p>
+            <p>
+                📌 Serviço: <strong>{servico}</strong><br>
+                👨‍⚕️ Profissional: <strong>{profissional}</strong><br>
+                🗓️ Data: <strong>{data}</strong><br>
+                ⏰ Horário: <strong>{hora}</strong>
+            </p>
+            <p>Assim que o profissional <strong>{profissional}</strong> atualizar o status do seu agendamento, você será notificado!
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Visualizar na Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def email_lembrete_1_dia(nome_destinatario, servico, profissional, horario):
+    horario = datetime.fromisoformat(horario)
+    return {
+        "assunto": "Lembrete: Seu agendamento é amanhã",
+        "texto": f"Olá {nome_destinatario}, este é um lembrete que você possui um agendamento amanhã ({horario.strftime('%d/%m/%Y')} às {horario.strftime('%H:%M')}).",
+        "html": _montar_html_lembrete(
+            nome_destinatario,
+            titulo="Lembrete: Agendamento amanhã",
+            servico=servico,
+            profissional=profissional,
+            data=horario.strftime("%d/%m/%Y"),
+            hora=horario.strftime("%H:%M"),
+        ),
+    }
+
+
+def email_lembrete_1_hora(nome_destinatario, servico, profissional, horario):
+    horario = datetime.fromisoformat(horario)
+    return {
+        "assunto": "Lembrete: Seu agendamento é em 1 hora",
+        "texto": f"Olá {nome_destinatario}, este é um lembrete que seu agendamento começa em aproximadamente 1 hora ({horario.strftime('%H:%M')}).",
+        "html": _montar_html_lembrete(
+            nome_destinatario,
+            titulo="Lembrete: Agendamento em 1 hora!",
+            servico=servico,
+            profissional=profissional,
+            data=horario.strftime("%d/%m/%Y"),
+            hora=horario.strftime("%H:%M"),
+        ),
+    }
+
+
+def _montar_html_lembrete(nome, titulo, servico, profissional, data, hora):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>{titulo}</h2>
+            <p>Olá <strong>{nome}</strong>,</p>
+            <p>Você possui um agendamento confirmado:</p>
+            <p>
+                📌 Serviço: <strong>{servico}</strong><br>
+                👨‍⚕️ Profissional: <strong>{profissional}</strong><br>
+                🗓️ Data: <strong>{data}</strong><br>
+                ⏰ Horário: <strong>{hora}</strong>
+            </p>
+            <p>Certifique-se de estar disponível nesse horário.</p>
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Acessar Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def email_profissional_remarcou(
+    nome_cliente, nome_profissional, nome_servico, nova_data, novo_horario
+):
+    return {
+        "assunto": "Atualização do seu agendamento - AgendaVip",
+        "texto": f"Olá {nome_cliente}, o profissional {nome_profissional} alterou o horário do seu agendamento para o serviço {nome_servico}. Novo horário: {nova_data} às {novo_horario}.",
+        "html": montar_html_profissional_remarcou(
+            nome_cliente, nome_profissional, nome_servico, nova_data, novo_horario
+        ),
+    }
+
+
+def montar_html_profissional_remarcou(cliente, profissional, servico, data, hora):
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Horário Atualizado</h2>
+            <p>Olá <strong>{cliente}</strong>,</p>
+            <p>O profissional <strong>{profissional}</strong> alterou o horário do seu agendamento.</p>
+            <p>
+                📌 Serviço: <strong>{servico}</strong><br>
+                🗓️ Nova data: <strong>{data}</strong><br>
+                ⏰ Novo horário: <strong>{hora}</strong>
+            </p>
+            <p>Se tiver alguma dúvida, entre em contato com o estabelecimento.</p>
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Ver na Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def email_resgate_fidelidade(
+    nome_cliente, nome_servico, nome_estabelecimento, data_resgate
+):
+    data_resgate = datetime.fromisoformat(data_resgate)
+    dados = {
+        "cliente": nome_cliente,
+        "servico": nome_servico,
+        "estabelecimento": nome_estabelecimento,
+        "data_resgate": data_resgate,
+    }
+
+    conteudo_qr = gerar_qrcode_base64(dados, return_bytes=True)
+
+    html = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f5; padding: 20px;">
+        <div style="background-color: #fff; padding: 30px; border-radius: 12px; max-width: 600px; margin: auto;">
+            <h2>Resgate de Fidelidade Confirmado</h2>
+            <p>Olá <strong>{nome_cliente}</strong>,</p>
+            <p>Seu resgate de fidelidade foi confirmado com sucesso no estabelecimento <strong>{nome_estabelecimento}</strong>.</p>
+            <p>🎁 <strong>Serviço:</strong> {nome_servico}<br>
+               📅 <strong>Data de Resgate:</strong> {data_resgate.strftime('%d/%m/%Y às %H:%M')}</p>
+            <p>Apresente este QR Code no momento do atendimento:</p>
+            <img src="cid:qrcode" alt="QR Code de Resgate" style="width: 200px; height: 200px;" />
+            <br><br>
+            <a href="{FRONTEND_LOGIN_URL}" style="display:inline-block;margin-top:20px;padding:10px 20px;background:#3b82f6;color:#fff;text-decoration:none;border-radius:8px;">Acessar Plataforma</a>
+            <p style="font-size: 12px; color: #888; margin-top: 40px;">© {datetime.now().year} AgendaVip</p>
+        </div>
+    </body>
+    </html>
+    """
+
+    return {
+        "assunto": "Resgate de Fidelidade - AgendaVip",
+        "texto": "Resgate de fidelidade confirmado!",
+        "html": html,
+        "imagens": {"qrcode": conteudo_qr},
+    }
+
+
+def email_recuperacao_senha(link):
+    return {
+        "assunto": "Redefinição de Senha - AgendaVip",
+        "texto": f"Olá,\n\nClique aqui para redefinir sua senha:\n{link}",
+        "html": montar_email_html(link),
+    }
+
+
+def montar_email_html(link):
+    return f"""
+    <!DOCTYPE html>
+    <html lang="pt-BR">
+      <head>
+        <meta charset="UTF-8" />
+        <style>
+          body {{
+            background-color: #f4f4f5;
+            font-family: Arial, sans-serif;
+            margin: 0;
+            padding: 0;
+            color: #1f2937;
+          }}
+          .container {{
+            max-width: 600px;
+            margin: 40px auto;
+            background-color: #ffffff;
+            padding: 40px;
+            border-radius: 12px;
+            box-shadow: 0 2px 10px rgba(0, 0, 0, 0.05);
+          }}
+          h1 {{
+            font-size: 22px;
+            margin-bottom: 20px;
+            color: #111827;
+          }}
+          p {{
+            font-size: 16px;
+            line-height: 1.6;
+          }}
+          .button {{
+            display: inline-block;
+            margin-top: 30px;
+            padding: 14px 24px;
+            background-color: #3b82f6;
+            color: #ffffff !important;
+            text-decoration: none;
+            border-radius: 8px;
+            font-weight: bold;
+            transition: background-color 0.2s ease;
+          }}
+          .button:hover {{
+            background-color: #2563eb;
+          }}
+          .footer {{
+            margin-top: 40px;
+            font-size: 12px;
+            color: #6b7280;
+            text-align: center;
+          }}
+        </style>
+      </head>
+      <body>
+        <div class="container">
+          <h1>Redefinição de Senha</h1>
+          <p>Olá,</p>
+          <p>
+            Recebemos uma solicitação para redefinir sua senha no
+            <strong>AgendaVip</strong>.
+          </p>
+          <p>Para continuar, clique no botão abaixo:</p>
+
+          <a href="{link}" class="button">Redefinir Senha</a>
+
+          <p>
+            Se você não solicitou essa alteração, apenas ignore este e-mail. O link
+            irá expirar em 1 hora por motivos de segurança.
+          </p>
+
+          <div class="footer">
+            © {datetime.now().year} AgendaVip. Todos os direitos reservados.
+          </div>
+        </div>
+      </body>
+    </html>
+    """
+
+
+_BUILDERS_FSTRING = {
+    "mudanca_horario": email_mudanca_horario,
+    "mudanca_profissional": email_mudanca_profissional,
+    "confirmacao_agendamento": email_confirmacao_agendamento,
+    "cancelamento_agendamento": email_cancelamento_agendamento,
+    "novo_agendamento_profissional": email_novo_agendamento_profissional,
+    "novo_agendamento_cliente": email_novo_agendamento_cliente,
+    "lembrete_1_dia": email_lembrete_1_dia,
+    "lembrete_1_hora": email_lembrete_1_hora,
+    "profissional_remarcou": email_profissional_remarcou,
+    "resgate_fidelidade": email_resgate_fidelidade,
+    "recuperacao_senha": email_recuperacao_senha,
+}
+
+_CONTEXTO = {
+    "nome_cliente": "Maria & Filhos",
+    "nome_profissional": "Ana",
+    "nome_servico": "Corte",
+    "nome_estabelecimento": "Barbearia",
+    "nome_destinatario": "Maria",
+    "servico": "Corte",
+    "profissional": "Ana",
+    "data": "10/10/2030",
+    "horario": "10:00",
+    "nova_data": "10/10/2030",
+    "novo_horario": "10:00",
+    "motivo": "Imprevisto",
+    "link": "https://exemplo/reset/token",
+}
+_CONTEXTO_POR_TIPO = {
+    "lembrete_1_dia": {"horario": "2030-10-10T10:00:00"},
+    "lembrete_1_hora": {"horario": "2030-10-10T10:00:00"},
+    "resgate_fidelidade": {"data_resgate": "2030-10-10T10:00:00"},
+}
+
+
+def _contexto(tipo, builder):
+    contexto = {**_CONTEXTO, **_CONTEXTO_POR_TIPO.get(tipo, {})}
+    parametros = builder.__code__.co_varnames[: builder.__code__.co_argcount]
+    return {nome: contexto[nome] for nome in parametros}
+
+
+def _jinja(tipo, contexto):
+    def renderizar():
+        preparado, imagens = _preparar_contexto({"tipo": tipo, "contexto": contexto})
+        return {**obter_modelo(tipo).renderizar(preparado), "imagens": imagens}
+
+    return renderizar
+
+
+def _medir(funcao):
+    segundos = timeit.timeit(funcao, number=BENCH_REPETICOES_EMAIL)
+    return round(segundos / BENCH_REPETICOES_EMAIL * 1e6, 1)
+
+
+def executar():
+    resultado = {}
+    for tipo, builder in _BUILDERS_FSTRING.items():
+        contexto = _contexto(tipo, builder)
+        fstring = _medir(lambda: builder(**contexto))
+        jinja = _medir(_jinja(tipo, contexto))
+        resultado[tipo] = {
+            "fstring_us": fstring,
+            "jinja_us": jinja,
+            "razao": round(jinja / fstring, 2),
+        }
+    return resultado
+
+
+if __name__ == "__main__":
+    from app.main import scheduler
+
+    scheduler.shutdown(wait=False)
+    for chave, valor in executar().items():
+        print(f"{chave}: {valor}")
@@ -0,0 +1,156 @@
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.models.agendamento import Agendamento
+from app.models.estabelecimento import Estabelecimento
+from app.models.funcionarios import Funcionario
+from app.models.servico import Servico
+from app.models.user import User
+from app.routes.agendamento_routes import (
+    COLUNAS_HISTORICO,
+    _consulta_historico_admin,
+)
+from app.utils.exportacao import exportar_linhas
+
+BENCH_LINHAS_EXPORTACAO = int(os.getenv("BENCH_LINHAS_EXPORTACAO", "1000000"))
+BENCH_LOTE_INSERCAO = 50000
+
+
+def _popular(db: Session):
+    estabelecimento = Estabelecimento(
+        nome="Benchmark", cnpj=f"bench-{time.time_ns()}", tipo_servico="bench"
+    )
+    db.add(estabelecimento)
+    db.flush()
+    cliente = User(
+        nome="Cliente Benchmark",
+        email=f"bench-{time.time_ns()}@exemplo.com",
+        senha="-",
+        tipo_usuario="cliente",
+    )
+    profissional = Funcionario(
+        nome="Profissional Benchmark",
+        email=f"bench-{time.time_ns()}-p@exemplo.com",
+        senha="-",
+        cargo="bench",
+        estabelecimento_id=estabelecimento.id,
+    )
+    servico = Servico(
+        nome="Corte de cabelo",
+        preco=45.5,
+        tempo=30,
+        estabelecimento_id=estabelecimento.id,
+    )
+    db.add_all([cliente, profissional, servico])
+    db.flush()
+
+    inicio = datetime(2024, 1, 1, 8)
+    for posicao in range(0, BENCH_LINHAS_EXPORTACAO, BENCH_LOTE_INSERCAO):
+        fim = min(posicao + BENCH_LOTE_INSERCAO, BENCH_LINHAS_EXPORTACAO)
+        db.execute(
+            insert(Agendamento.__table__),
+            [
+                {
+                    "cliente_id": cliente.id,
+                    "profissional_id": profissional.id,
+                    "servico_id": servico.id,
+                    "estabelecimento_id": estabelecimento.id,
+                    "horario": inicio + timedelta(minutes=30 * i),
+                    "horario_fim": inicio + timedelta(minutes=30 * (i + 1)),
+                    "status": "finalizado",
+                }
+                for i in range(posicao, fim)
+            ],
+        )
+    db.commit()
+    return estabelecimento, cliente, profissional, servico
+
+
+def _limpar(db: Session, estabelecimento, cliente, profissional, servico):
+    db.query(Agendamento).filter(
+        Agendamento.estabelecimento_id == estabelecimento.id
+    ).delete(synchronize_session=False)
+    db.delete(servico)
+    db.delete(profissional)
+    db.delete(cliente)
+    db.delete(estabelecimento)
+    db.commit()
+
+
+def _fetchall(consulta, params):
+    db = SessionLocal()
+    try:
+        linhas = [dict(linha) for linha in db.execute(consulta, params).fetchall()]
+    finally:
+        db.close()
+    return len(linhas), 0
+
+
+def _stream(formato):
+    def executar(consulta, params):
+        linhas = bytes_gerados = 0
+        for pedaco in exportar_linhas(consulta, params, COLUNAS_HISTORICO, formato):
+            bytes_gerados += len(pedaco)
+            linhas += pedaco.count(b"\n")
+        if formato == "csv":
+            linhas -= 1
+        return linhas, bytes_gerados
+
+    return executar
+
+
+def _medir(variante, consulta, params):
+    inicio = time.perf_counter()
+    linhas, bytes_gerados = variante(consulta, params)
+    segundos = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    try:
+        variante(consulta, params)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "segundos": round(segundos, 2),
+        "pico_mib": round(pico / 2**20, 1),
+        "linhas": linhas,
+        "saida_mb": round(bytes_gerados / 10**6, 1),
+    }
+
+
+def executar(db: Session):
+    estabelecimento, cliente, profissional, servico = _popular(db)
+    try:
+        sql, params = _consulta_historico_admin(
+            estabelecimento.id, None, None, None, None
+        )
+        consulta = text(sql + " ORDER BY a.horario DESC, a.id DESC")
+        variantes = {
+            "fetchall_dict": _fetchall,
+            "stream_csv": _stream("csv"),
+            "stream_ndjson": _stream("ndjson"),
+        }
+        return {
+            "dialeto": db.bind.dialect.name,
+            "linhas": BENCH_LINHAS_EXPORTACAO,
+            **{
+                nome: _medir(variante, consulta, params)
+                for nome, variante in variantes.items()
+            },
+        }
+    finally:
+        _limpar(db, estabelecimento, cliente, profissional, servico)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        for chave, valor in executar(db).items():
+            print(f"{chave}: {valor}")
+    finally:
+        db.close()
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from statistics import quantiles
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.models.estabelecimento import Estabelecimento
+from app.models.funcionarios import Funcionario
+from app.models.user import User
+from app.utils import security
+
+BENCH_LOGINS_CONCORRENTES = int(os.getenv("BENCH_LOGINS_CONCORRENTES", "32"))
+BENCH_LEITURAS = int(os.getenv("BENCH_LEITURAS", "200"))
+SENHA_BENCH = "benchmark-senha"
+
+
+def _popular(db: Session):
+    estabelecimento = Estabelecimento(
+        nome="Benchmark", cnpj=f"bench-{time.time_ns()}", tipo_servico="bench"
+    )
+    db.add(estabelecimento)
+    db.flush()
+    usuario = User(
+        nome="Benchmark",
+        email=f"bench-{time.time_ns()}@exemplo.com",
+        senha=security.pwd_context.hash(SENHA_BENCH),
+        tipo_usuario="cliente",
+    )
+    profissional = Funcionario(
+        nome="Benchmark",
+        email=f"bench-{time.time_ns()}-p@exemplo.com",
+        senha="-",
+        cargo="bench",
+        estabelecimento_id=estabelecimento.id,
+    )
+    db.add_all([usuario, profissional])
+    db.flush()
+
+    inicio = datetime.now().replace(minute=0, second=0, microsecond=0)
+    db.execute(
+        insert(AgendaDisponivel.__table__),
+        [
+            {
+                "profissional_id": profissional.id,
+                "estabelecimento_id": estabelecimento.id,
+                "data_hora": inicio
+                + timedelta(days=1 + i // 16, minutes=30 * (i % 16)),
+                "ocupado": False,
+                "criado_em": inicio,
+            }
+            for i in range(160)
+        ],
+    )
+    db.commit()
+    return estabelecimento, usuario, profissional
+
+
+def _limpar(db: Session, estabelecimento, usuario, profissional):
+    db.query(AgendaDisponivel).filter(
+        AgendaDisponivel.profissional_id == profissional.id
+    ).delete()
+    db.delete(profissional)
+    db.delete(usuario)
+    db.delete(estabelecimento)
+    db.commit()
+
+
+def _medir_leituras(cliente: TestClient, url: str, cabecalhos: dict):
+    latencias = []
+    for _ in range(BENCH_LEITURAS):
+        inicio = time.perf_counter()
+        resposta = cliente.get(url, headers=cabecalhos)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        assert resposta.status_code == 200, resposta.text
+    percentis = quantiles(latencias, n=100)
+    return {"p50_ms": round(percentis[49], 2), "p99_ms": round(percentis[98], 2)}
+
+
+def _tempestade(cliente: TestClient, email: str, parar: threading.Event, contagem):
+    while not parar.is_set():
+        resposta = cliente.post(
+            "/auth/login/", json={"email": email, "senha": SENHA_BENCH}
+        )
+        contagem[resposta.status_code] += 1
+        if resposta.status_code == 503:
+            time.sleep(0.01)
+
+
+def _fase(cliente: TestClient, url, cabecalhos, email, executor):
+    if executor is None:
+        return _medir_leituras(cliente, url, cabecalhos)
+
+    security.executor_senhas = executor
+    parar = threading.Event()
+    contagem = Counter()
+    threads = [
+        threading.Thread(target=_tempestade, args=(cliente, email, parar, contagem))
+        for _ in range(BENCH_LOGINS_CONCORRENTES)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        time.sleep(0.5)
+        resultado = _medir_leituras(cliente, url, cabecalhos)
+    finally:
+        parar.set()
+        for thread in threads:
+            thread.join()
+    segundos = time.perf_counter() - inicio
+    resultado.update(
+        {
+            "logins_ok": contagem[200],
+            "logins_503": contagem[503],
+            "logins_por_segundo": round(contagem[200] / segundos, 1),
+        }
+    )
+    return resultado
+
+
+def executar(app):
+    db = SessionLocal()
+    estabelecimento, usuario, profissional = _popular(db)
+    executor_original = security.executor_senhas
+    cabecalhos = {
+        "Authorization": "Bearer "
+        + security.create_access_token(
+            {"sub": usuario.email, "id": usuario.id, "tipo_usuario": "cliente"}
+        )
+    }
+    url = f"/agenda/?profissional_id={profissional.id}"
+    fases = {
+        "sem_tempestade": None,
+        "tempestade_sem_limite": security.ExecutorSenhas(
+            workers=BENCH_LOGINS_CONCORRENTES, max_fila=BENCH_LOGINS_CONCORRENTES
+        ),
+        "tempestade_limitada": executor_original,
+    }
+    try:
+        with TestClient(app) as cliente:
+            return {
+                nome: _fase(cliente, url, cabecalhos, usuario.email, executor)
+                for nome, executor in fases.items()
+            }
+    finally:
+        security.executor_senhas = executor_original
+        _limpar(db, estabelecimento, usuario, profissional)
+        db.close()
+
+
+if __name__ == "__main__":
+    from app.main import app, scheduler
+
+    scheduler.shutdown(wait=False)
+    for fase, resultado in executar(app).items():
+        print(f"{fase}: {resultado}")
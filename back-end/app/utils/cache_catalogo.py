@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+CATALOGO_CACHE_BACKEND = os.getenv("CATALOGO_CACHE_BACKEND", "memoria")
+CATALOGO_CACHE_TTL = int(os.getenv("CATALOGO_CACHE_TTL", "300"))
+CATALOGO_CACHE_TTL_MEMORIA = int(os.getenv("CATALOGO_CACHE_TTL_MEMORIA", "15"))
+CATALOGO_CACHE_MAX_ITENS = int(os.getenv("CATALOGO_CACHE_MAX_ITENS", "2048"))
+CATALOGO_CACHE_URL = os.getenv("CATALOGO_CACHE_URL", "redis://localhost:6379/0")
+PREFIXO_CHAVE = "catalogo:"
+
+
+class CacheMemoria:
+    def __init__(
+        self, max_itens=CATALOGO_CACHE_MAX_ITENS, ttl_maximo=CATALOGO_CACHE_TTL_MEMORIA
+    ):
+        self.max_itens = max_itens
+        self.ttl_maximo = ttl_maximo
+        self._itens = OrderedDict()
+        self._lock = Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is None:
+                return None
+            valor, expira_em = entrada
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor, ttl):
+        with self._lock:
+            expira_em = time.monotonic() + min(ttl, self.ttl_maximo)
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover(self, *chaves):
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+
+
+class CacheRedis:
+    def __init__(self, url=CATALOGO_CACHE_URL):
+        import redis
+
+        self.cliente = redis.Redis.from_url(url)
+
+    def obter(self, chave):
+        return self.cliente.get(PREFIXO_CHAVE + chave)
+
+    def guardar(self, chave, valor, ttl):
+        self.cliente.set(PREFIXO_CHAVE + chave, valor, ex=ttl)
+
+    def remover(self, *chaves):
+        if chaves:
+            self.cliente.delete(*(PREFIXO_CHAVE + chave for chave in chaves))
+
+
+BACKENDS = {
+    "memoria": CacheMemoria,
+    "redis": CacheRedis,
+}
+
+_backend = None
+
+
+def obter_backend_cache():
+    global _backend
+    if _backend is None:
+        if CATALOGO_CACHE_BACKEND not in BACKENDS:
+            raise ValueError(
+                f"Backend de cache desconhecido: {CATALOGO_CACHE_BACKEND}. "
+                f"Use um de: {', '.join(BACKENDS)}"
+            )
+        _backend = BACKENDS[CATALOGO_CACHE_BACKEND]()
+    return _backend
+
+
+def definir_backend_cache(backend):
+    global _backend
+    _backend = backend
+
+
+def chave_servicos(estabelecimento_id):
+    return f"servicos:{estabelecimento_id}"
+
+
+def chave_funcionarios(estabelecimento_id):
+    return f"funcionarios:{estabelecimento_id}"
+
+
+def chave_estabelecimentos():
+    return "estabelecimentos"
+
+
+def chave_estabelecimento(estabelecimento_id):
+    return f"estabelecimento:{estabelecimento_id}"
+
+
+def chave_configuracoes(profissional_id):
+    return f"configuracoes:{profissional_id}"
+
+
+def _empacotar(dados):
+    corpo = json.dumps(
+        jsonable_encoder(dados), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = f'"{hashlib.sha1(corpo).hexdigest()}"'.encode("ascii")
+    return etag + b"\n" + corpo
+
+
+def _etags_informadas(request: Request):
+    return [
+        etag.strip().removeprefix("W/")
+        for etag in request.headers.get("if-none-match", "").split(",")
+    ]
+
+
+def resposta_em_cache(request: Request, chave, carregar, ttl=CATALOGO_CACHE_TTL):
+    backend = obter_backend_cache()
+    entrada = backend.obter(chave)
+    if entrada is None:
+        entrada = _empacotar(carregar())
+        backend.guardar(chave, entrada, ttl)
+
+    etag, corpo = entrada.split(b"\n", 1)
+    cabecalhos = {"ETag": etag.decode("ascii"), "Cache-Control": "no-cache"}
+    if cabecalhos["ETag"] in _etags_informadas(request):
+        return Response(status_code=304, headers=cabecalhos)
+
+    return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
+
+def invalidar_catalogo(*chaves):
+    obter_backend_cache().remover(*chaves)
@@ -1,29 +1,43 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 import jwt
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.models.blacklist import BlacklistToken
+from app.db.database import SessionLocal
+from app.utils.revogacao import token_revogado
 from app.utils.security import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login/")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
-    blacklisted_token = db.execute(
-        "SELECT id FROM blacklist_tokens WHERE token = :token", {"token": token}
-    ).fetchone()
-
-    if blacklisted_token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido"
+def _token_legado_revogado(token: str) -> bool:
+    db = SessionLocal()
+    try:
+        return (
+            db.execute(
+                "SELECT id FROM blacklist_tokens WHERE token = :token",
+                {"token": token},
+            ).fetchone()
+            is not None
         )
+    finally:
+        db.close()
+
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
+        jti = payload.get("jti")
+        if jti:
+            revogado = token_revogado(jti)
+        else:
+            revogado = await run_in_threadpool(_token_legado_revogado, token)
+
+        if revogado:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido"
+            )
+
         user_email: str = payload.get("sub")
         user_id: int = payload.get("id")
         user_role: str = payload.get("tipo_usuario")
@@ -0,0 +1,377 @@
+import heapq
+import os
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from itertools import islice
+from threading import Lock
+from sqlalchemy import text, DateTime, exists, func, literal_column, select
+from sqlalchemy.orm import Session
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.models.agendamento import Agendamento
+from app.models.configuracao_agenda import ConfiguracaoAgenda
+from app.utils.agenda_bitmap import (
+    armazenamento_bitmap,
+    horarios_livres,
+    horarios_livres_por_profissional,
+    liberar_slots_bitmap,
+    obter_slot_bitmap,
+    remover_slot_bitmap,
+    reservar_slots_bitmap,
+)
+
+DURACAO_SLOT_PADRAO = 30
+VALIDADE_INDICE = timedelta(seconds=60)
+BUSCA_MAX_DIAS = int(os.getenv("BUSCA_MAX_DIAS", "31"))
+AGENDA_JANELA_DIAS = int(os.getenv("AGENDA_JANELA_DIAS", "90"))
+STATUS_ATIVOS = ("pendente", "confirmado")
+DIAS_SEMANA = ["segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo"]
+
+_indices = {}
+_lock = Lock()
+
+
+def mesclar_intervalos(intervalos):
+    mesclados = []
+    for inicio, fim in sorted(intervalos):
+        if mesclados and inicio <= mesclados[-1][1]:
+            if fim > mesclados[-1][1]:
+                mesclados[-1][1] = fim
+        else:
+            mesclados.append([inicio, fim])
+    return [(inicio, fim) for inicio, fim in mesclados]
+
+
+class IndiceDisponibilidade:
+    def __init__(self, intervalos, fim: datetime):
+        self.fim = fim
+        mesclados = mesclar_intervalos(intervalos)
+        self.inicios = [inicio for inicio, _ in mesclados]
+        self.fins = [fim for _, fim in mesclados]
+
+    def intervalo_em(self, momento: datetime):
+        pos = bisect_right(self.inicios, momento) - 1
+        if pos < 0 or self.fins[pos] <= momento:
+            return None
+        return self.inicios[pos], self.fins[pos]
+
+    def esta_livre(self, inicio: datetime, fim: datetime) -> bool:
+        intervalo = self.intervalo_em(inicio)
+        return intervalo is not None and intervalo[1] >= fim
+
+    def minutos_livres_a_partir(self, inicio: datetime) -> float:
+        intervalo = self.intervalo_em(inicio)
+        if intervalo is None:
+            return 0
+        return (intervalo[1] - inicio).total_seconds() / 60
+
+    def intervalos_a_partir(self, inicio: datetime):
+        pos = max(bisect_right(self.inicios, inicio) - 1, 0)
+        return zip(self.inicios[pos:], self.fins[pos:])
+
+
+def duracoes_slot_por_dia(db: Session, profissional_id: int):
+    return duracoes_slot_por_profissional(db, [profissional_id])[profissional_id]
+
+
+def duracoes_slot_por_profissional(db: Session, profissionais):
+    duracoes = {profissional_id: {} for profissional_id in profissionais}
+    configuracoes = db.query(
+        ConfiguracaoAgenda.profissional_id,
+        ConfiguracaoAgenda.dia_semana,
+        ConfiguracaoAgenda.duracao_slot,
+    ).filter(ConfiguracaoAgenda.profissional_id.in_(profissionais))
+    for profissional_id, dia, duracao in configuracoes:
+        duracoes[profissional_id][dia] = duracao or DURACAO_SLOT_PADRAO
+    return duracoes
+
+
+def duracao_slot_em(duracoes: dict, momento: datetime) -> timedelta:
+    dia = DIAS_SEMANA[momento.weekday()]
+    return timedelta(minutes=duracoes.get(dia, DURACAO_SLOT_PADRAO))
+
+
+def consulta_horarios_livres(profissional_id: int, inicio: datetime, fim: datetime):
+    confirmado = exists().where(
+        Agendamento.profissional_id == AgendaDisponivel.profissional_id,
+        Agendamento.horario == AgendaDisponivel.data_hora,
+        Agendamento.status == "confirmado",
+    )
+    return (
+        select(AgendaDisponivel)
+        .where(
+            AgendaDisponivel.profissional_id == profissional_id,
+            AgendaDisponivel.data_hora >= inicio,
+            AgendaDisponivel.data_hora < fim,
+            AgendaDisponivel.ocupado == False,
+            ~confirmado,
+        )
+        .order_by(AgendaDisponivel.data_hora)
+    )
+
+
+def _horarios_livres_linhas(
+    db: Session, profissionais, inicio: datetime, fim: datetime
+):
+    horarios = {}
+    for profissional_id, data_hora in db.query(
+        AgendaDisponivel.profissional_id, AgendaDisponivel.data_hora
+    ).filter(
+        AgendaDisponivel.profissional_id.in_(profissionais),
+        AgendaDisponivel.data_hora >= inicio,
+        AgendaDisponivel.data_hora < fim,
+        AgendaDisponivel.ocupado == False,
+    ):
+        horarios.setdefault(profissional_id, []).append(data_hora)
+    return horarios
+
+
+def construir_indices(db: Session, profissionais, inicio=None, fim=None):
+    inicio = inicio or datetime.now()
+    fim = fim or inicio + timedelta(days=AGENDA_JANELA_DIAS)
+    duracoes = duracoes_slot_por_profissional(db, profissionais)
+    if armazenamento_bitmap():
+        horarios = horarios_livres_por_profissional(db, profissionais, inicio, fim)
+    else:
+        horarios = _horarios_livres_linhas(db, profissionais, inicio, fim)
+    return {
+        profissional_id: IndiceDisponibilidade(
+            (
+                (
+                    data_hora,
+                    data_hora + duracao_slot_em(duracoes[profissional_id], data_hora),
+                )
+                for data_hora in horarios.get(profissional_id, [])
+            ),
+            fim,
+        )
+        for profissional_id in profissionais
+    }
+
+
+def construir_indice(db: Session, profissional_id: int) -> IndiceDisponibilidade:
+    return construir_indices(db, [profissional_id])[profissional_id]
+
+
+def obter_indices(db: Session, profissionais):
+    agora = datetime.now()
+    indices = {}
+    with _lock:
+        for profissional_id in profissionais:
+            entrada = _indices.get(profissional_id)
+            if entrada is not None and agora - entrada[1] < VALIDADE_INDICE:
+                indices[profissional_id] = entrada[0]
+
+    faltantes = [p for p in profissionais if p not in indices]
+    if faltantes:
+        construidos = construir_indices(db, faltantes)
+        with _lock:
+            for profissional_id, indice in construidos.items():
+                _indices[profissional_id] = (indice, agora)
+        indices.update(construidos)
+    return indices
+
+
+def obter_indice(db: Session, profissional_id: int) -> IndiceDisponibilidade:
+    return obter_indices(db, [profissional_id])[profissional_id]
+
+
+def invalidar_disponibilidade(profissional_id: int):
+    with _lock:
+        _indices.pop(profissional_id, None)
+
+
+def indice_para(
+    db: Session, profissional_id: int, inicio: datetime, duracao: timedelta
+) -> IndiceDisponibilidade:
+    indice = obter_indice(db, profissional_id)
+    if inicio + duracao <= indice.fim:
+        return indice
+    return construir_indices(db, [profissional_id], inicio, inicio + duracao)[
+        profissional_id
+    ]
+
+
+def horario_livre(
+    db: Session, profissional_id: int, inicio: datetime, duracao: timedelta
+) -> bool:
+    return indice_para(db, profissional_id, inicio, duracao).esta_livre(
+        inicio, inicio + duracao
+    )
+
+
+def minutos_livres(db: Session, profissional_id: int, inicio: datetime) -> float:
+    return obter_indice(db, profissional_id).minutos_livres_a_partir(inicio)
+
+
+def _inicios_possiveis(
+    profissional_id: int,
+    indice: IndiceDisponibilidade,
+    duracoes: dict,
+    duracao: timedelta,
+    inicio: datetime,
+    fim: datetime,
+):
+    for intervalo_inicio, intervalo_fim in indice.intervalos_a_partir(inicio):
+        if intervalo_inicio >= fim:
+            return
+        atual = intervalo_inicio
+        while atual < fim and atual + duracao <= intervalo_fim:
+            if atual >= inicio and DIAS_SEMANA[atual.weekday()] in duracoes:
+                yield atual, profissional_id
+            atual += duracao_slot_em(duracoes, atual)
+
+
+def buscar_horarios(
+    db: Session,
+    profissionais,
+    duracao: timedelta,
+    inicio: datetime,
+    fim: datetime,
+    limite: int,
+):
+    indices = obter_indices(db, profissionais)
+    duracoes = duracoes_slot_por_profissional(db, profissionais)
+    candidatos = heapq.merge(
+        *(
+            _inicios_possiveis(
+                profissional_id,
+                indices[profissional_id],
+                duracoes[profissional_id],
+                duracao,
+                inicio,
+                fim,
+            )
+            for profissional_id in profissionais
+        )
+    )
+    return list(islice(candidatos, limite))
+
+
+def slots_contiguos(horarios, inicio: datetime, fim: datetime, duracao_slot: timedelta):
+    esperado = inicio
+    for horario in sorted(set(horarios)):
+        if esperado >= fim:
+            break
+        if horario != esperado:
+            return False
+        esperado += duracao_slot
+    return esperado >= fim
+
+
+def verificar_slots(
+    db: Session,
+    profissional_id: int,
+    inicio: datetime,
+    duracao: timedelta,
+    duracao_slot: timedelta,
+) -> bool:
+    if armazenamento_bitmap():
+        horarios = horarios_livres(db, profissional_id, inicio, inicio + duracao)
+    else:
+        horarios = [
+            data_hora
+            for (data_hora,) in db.query(AgendaDisponivel.data_hora).filter(
+                AgendaDisponivel.profissional_id == profissional_id,
+                AgendaDisponivel.data_hora >= inicio,
+                AgendaDisponivel.data_hora < inicio + duracao,
+                AgendaDisponivel.ocupado == False,
+            )
+        ]
+    return slots_contiguos(horarios, inicio, inicio + duracao, duracao_slot)
+
+
+def agendamento_conflitante(
+    db: Session,
+    profissional_id: int,
+    inicio: datetime,
+    duracao: timedelta,
+    ignorar_id: int = None,
+) -> bool:
+    fim = inicio + duracao
+    filtros = [
+        Agendamento.profissional_id == profissional_id,
+        Agendamento.status.in_(STATUS_ATIVOS),
+    ]
+    if db.bind.dialect.name == "postgresql":
+        filtros.append(
+            literal_column("agendamentos.periodo").op("&&")(
+                func.tsrange(inicio, fim, "[)")
+            )
+        )
+    else:
+        filtros += [Agendamento.horario < fim, Agendamento.horario_fim > inicio]
+    if ignorar_id is not None:
+        filtros.append(Agendamento.id != ignorar_id)
+    return db.query(exists().where(*filtros)).scalar()
+
+
+def reservar_slots(
+    db: Session,
+    profissional_id: int,
+    inicio: datetime,
+    duracao: timedelta,
+    duracao_slot: timedelta,
+):
+    if armazenamento_bitmap():
+        return reservar_slots_bitmap(
+            db, profissional_id, inicio, duracao, duracao_slot
+        )
+
+    savepoint = db.begin_nested()
+    horarios = db.execute(
+        text(
+            """
+            UPDATE agenda_disponivel
+            SET ocupado = true
+            WHERE profissional_id = :profissional_id
+            AND data_hora >= :inicio
+            AND data_hora < :fim
+            AND ocupado = false
+            RETURNING data_hora
+            """
+        ).columns(data_hora=DateTime),
+        {"profissional_id": profissional_id, "inicio": inicio, "fim": inicio + duracao},
+    ).fetchall()
+
+    if not slots_contiguos(
+        [row.data_hora for row in horarios], inicio, inicio + duracao, duracao_slot
+    ):
+        savepoint.rollback()
+        return []
+
+    savepoint.commit()
+    return [row.data_hora for row in horarios]
+
+
+def liberar_slots(db: Session, profissional_id: int, inicio: datetime, fim: datetime):
+    if armazenamento_bitmap():
+        return liberar_slots_bitmap(db, profissional_id, inicio, fim)
+
+    horarios = db.execute(
+        text(
+            """
+            UPDATE agenda_disponivel
+            SET ocupado = false
+            WHERE profissional_id = :profissional_id
+            AND data_hora >= :inicio
+            AND data_hora < :fim
+            AND ocupado = true
+            RETURNING data_hora
+            """
+        ).columns(data_hora=DateTime),
+        {"profissional_id": profissional_id, "inicio": inicio, "fim": fim},
+    ).fetchall()
+    return [row.data_hora for row in horarios]
+
+
+def obter_slot(db: Session, horario_id: int):
+    if armazenamento_bitmap():
+        return obter_slot_bitmap(db, horario_id)
+    return db.query(AgendaDisponivel).filter(AgendaDisponivel.id == horario_id).first()
+
+
+def remover_slot(db: Session, slot):
+    if armazenamento_bitmap():
+        remover_slot_bitmap(db, slot)
+    else:
+        db.delete(slot)
@@ -1,8 +1,7 @@
 import boto3
 from boto3.dynamodb.conditions import Key, Attr
 from datetime import datetime, timedelta
-from uuid import uuid4
-from decimal import Decimal
+from uuid import NAMESPACE_URL, uuid5
 import os
 
 aws_region = os.getenv("AWS_REGION")
@@ -14,13 +13,17 @@ dynamodb = boto3.resource(
     region_name=aws_region,
     aws_access_key_id=aws_access_key,
     aws_secret_access_key=aws_secret_key,
+    endpoint_url=os.getenv("DYNAMODB_ENDPOINT_URL"),
 )
 
-table = dynamodb.Table("servicos_finalizados_plataforma_tcc")
-pontos_table = dynamodb.Table("pontos_fidelidade_plataforma_tcc")
+TABELA_SERVICOS_FINALIZADOS = "servicos_finalizados_plataforma_tcc"
+TABELA_PONTOS_FIDELIDADE = "pontos_fidelidade_plataforma_tcc"
 
+table = dynamodb.Table(TABELA_SERVICOS_FINALIZADOS)
+pontos_table = dynamodb.Table(TABELA_PONTOS_FIDELIDADE)
 
-def salvar_servico_finalizado(
+
+def montar_item_servico_finalizado(
     agendamento,
     cliente_nome,
     profissional_nome,
@@ -30,29 +33,26 @@ def salvar_servico_finalizado(
     valor,
     estabelecimento_id,
 ):
-    response = table.put_item(
-        Item={
-            "id_agendamento": str(agendamento.id),
-            "id": str(uuid4()),
-            "cliente_id": agendamento.cliente_id,
-            "cliente_nome": cliente_nome,
-            "profissional_id": agendamento.profissional_id,
-            "profissional_nome": profissional_nome,
-            "estabelecimento_id": estabelecimento_id,
-            "estabelecimento_nome": estabelecimento_nome,
-            "servico_id": agendamento.servico_id,
-            "servico_nome": servico_nome,
-            "tempo": tempo,
-            "valor": Decimal(str(valor)),
-            "data_inicio": agendamento.horario.isoformat(),
-            "data_fim": (agendamento.horario + timedelta(minutes=tempo)).isoformat(),
-            "criado_em": datetime.utcnow().isoformat(),
-        }
-    )
-    return response
+    return {
+        "id_agendamento": str(agendamento.id),
+        "id": str(uuid5(NAMESPACE_URL, f"agendamento/{agendamento.id}")),
+        "cliente_id": agendamento.cliente_id,
+        "cliente_nome": cliente_nome,
+        "profissional_id": agendamento.profissional_id,
+        "profissional_nome": profissional_nome,
+        "estabelecimento_id": estabelecimento_id,
+        "estabelecimento_nome": estabelecimento_nome,
+        "servico_id": agendamento.servico_id,
+        "servico_nome": servico_nome,
+        "tempo": tempo,
+        "valor": valor,
+        "data_inicio": agendamento.horario.isoformat(),
+        "data_fim": (agendamento.horario + timedelta(minutes=tempo)).isoformat(),
+        "criado_em": datetime.utcnow().isoformat(),
+    }
 
 
-def salvar_ponto_fidelidade(
+def montar_item_ponto_fidelidade(
     cliente_id,
     cliente_nome,
     estabelecimento_id,
@@ -61,22 +61,19 @@ def salvar_ponto_fidelidade(
     valor_servico,
     data_servico,
 ):
-    response = pontos_table.put_item(
-        Item={
-            "pk": f"CLIENTE#{cliente_id}",
-            "sk": f"PONTO#{data_servico.isoformat()}",
-            "cliente_id": cliente_id,
-            "cliente_nome": cliente_nome,
-            "estabelecimento_id": estabelecimento_id,
-            "estabelecimento_nome": estabelecimento_nome,
-            "servico_realizado": servico_nome,
-            "valor_servico": Decimal(str(valor_servico)),
-            "pontos_ganhos": 1,
-            "data_servico": data_servico.isoformat(),
-            "criado_em": datetime.utcnow().isoformat(),
-        }
-    )
-    return response
+    return {
+        "pk": f"CLIENTE#{cliente_id}",
+        "sk": f"PONTO#{data_servico.isoformat()}",
+        "cliente_id": cliente_id,
+        "cliente_nome": cliente_nome,
+        "estabelecimento_id": estabelecimento_id,
+        "estabelecimento_nome": estabelecimento_nome,
+        "servico_realizado": servico_nome,
+        "valor_servico": valor_servico,
+        "pontos_ganhos": 1,
+        "data_servico": data_servico.isoformat(),
+        "criado_em": datetime.utcnow().isoformat(),
+    }
 
 
 def listar_pontos_cliente(cliente_id: int):
@@ -0,0 +1,193 @@
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.models.agendamento import Agendamento
+from app.models.estabelecimento import Estabelecimento
+from app.models.funcionarios import Funcionario
+from app.models.servico import Servico
+from app.models.user import User
+from app.utils.disponibilidade import STATUS_ATIVOS
+from app.utils.reserva_agenda import AgendaOcupada, reservar_agendamento
+
+ESTRESSE_THREADS = int(os.getenv("ESTRESSE_THREADS", "16"))
+ESTRESSE_TENTATIVAS = int(os.getenv("ESTRESSE_TENTATIVAS", "50"))
+ESTRESSE_PROFISSIONAIS = int(os.getenv("ESTRESSE_PROFISSIONAIS", "4"))
+ESTRESSE_SLOTS = int(os.getenv("ESTRESSE_SLOTS", "48"))
+DURACAO_SLOT = timedelta(minutes=30)
+
+
+def _popular(db: Session, inicio: datetime):
+    estabelecimento = Estabelecimento(
+        nome="Estresse", cnpj=f"estresse-{time.time_ns()}", tipo_servico="estresse"
+    )
+    db.add(estabelecimento)
+    db.flush()
+    cliente = User(
+        nome="Estresse",
+        email=f"estresse-{time.time_ns()}@exemplo.com",
+        senha="-",
+        tipo_usuario="cliente",
+    )
+    servico = Servico(
+        nome="Estresse", preco=0, tempo=60, estabelecimento_id=estabelecimento.id
+    )
+    profissionais = [
+        Funcionario(
+            nome=f"Estresse {i}",
+            email=f"estresse-{time.time_ns()}-{i}@exemplo.com",
+            senha="-",
+            cargo="estresse",
+            estabelecimento_id=estabelecimento.id,
+        )
+        for i in range(ESTRESSE_PROFISSIONAIS)
+    ]
+    db.add_all([cliente, servico, *profissionais])
+    db.flush()
+
+    db.execute(
+        insert(AgendaDisponivel.__table__),
+        [
+            {
+                "profissional_id": profissional.id,
+                "estabelecimento_id": estabelecimento.id,
+                "data_hora": inicio + DURACAO_SLOT * i,
+                "ocupado": False,
+                "criado_em": inicio,
+            }
+            for profissional in profissionais
+            for i in range(ESTRESSE_SLOTS)
+        ],
+    )
+    db.commit()
+    return {
+        "inicio": inicio,
+        "estabelecimento_id": estabelecimento.id,
+        "cliente_id": cliente.id,
+        "servico_id": servico.id,
+        "profissionais": [profissional.id for profissional in profissionais],
+    }
+
+
+def _limpar(db: Session, contexto):
+    profissionais = contexto["profissionais"]
+    db.query(Agendamento).filter(
+        Agendamento.profissional_id.in_(profissionais)
+    ).delete(synchronize_session=False)
+    db.query(AgendaDisponivel).filter(
+        AgendaDisponivel.profissional_id.in_(profissionais)
+    ).delete(synchronize_session=False)
+    db.query(Funcionario).filter(Funcionario.id.in_(profissionais)).delete(
+        synchronize_session=False
+    )
+    db.query(Servico).filter(Servico.id == contexto["servico_id"]).delete()
+    db.query(User).filter(User.id == contexto["cliente_id"]).delete()
+    db.query(Estabelecimento).filter(
+        Estabelecimento.id == contexto["estabelecimento_id"]
+    ).delete()
+    db.commit()
+
+
+def _cliente(contexto, semente: int):
+    aleatorio = random.Random(semente)
+    resultado = Counter()
+    db = SessionLocal()
+    try:
+        servico = db.get(Servico, contexto["servico_id"])
+        ultimo_inicio = ESTRESSE_SLOTS - servico.tempo // 30
+        for _ in range(ESTRESSE_TENTATIVAS):
+            horario = contexto["inicio"] + DURACAO_SLOT * aleatorio.randint(
+                0, ultimo_inicio
+            )
+            try:
+                agendamento = reservar_agendamento(
+                    db,
+                    contexto["cliente_id"],
+                    aleatorio.choice(contexto["profissionais"]),
+                    servico,
+                    horario,
+                    DURACAO_SLOT,
+                    contexto["estabelecimento_id"],
+                )
+            except AgendaOcupada:
+                db.rollback()
+                resultado["bloqueio_esgotado"] += 1
+                continue
+            resultado["reservados" if agendamento else "recusados"] += 1
+    finally:
+        db.close()
+    return resultado
+
+
+def contar_sobreposicoes(db: Session, profissionais):
+    agendamentos = (
+        db.query(
+            Agendamento.profissional_id, Agendamento.horario, Agendamento.horario_fim
+        )
+        .filter(
+            Agendamento.profissional_id.in_(profissionais),
+            Agendamento.status.in_(STATUS_ATIVOS),
+        )
+        .order_by(Agendamento.profissional_id, Agendamento.horario)
+        .all()
+    )
+    sobreposicoes = sum(
+        1
+        for anterior, atual in zip(agendamentos, agendamentos[1:])
+        if anterior.profissional_id == atual.profissional_id
+        and atual.horario < anterior.horario_fim
+    )
+    return len(agendamentos), sobreposicoes
+
+
+def executar(db: Session):
+    inicio = datetime.now().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(days=1)
+    contexto = _popular(db, inicio)
+    try:
+        comeco = time.perf_counter()
+        with ThreadPoolExecutor(ESTRESSE_THREADS) as executor:
+            resultados = list(
+                executor.map(
+                    _cliente, [contexto] * ESTRESSE_THREADS, range(ESTRESSE_THREADS)
+                )
+            )
+        segundos = time.perf_counter() - comeco
+
+        total = sum(resultados, Counter())
+        agendamentos, sobreposicoes = contar_sobreposicoes(
+            db, contexto["profissionais"]
+        )
+        assert sobreposicoes == 0, f"{sobreposicoes} agendamentos sobrepostos"
+        assert agendamentos == total["reservados"], (agendamentos, total)
+        tentativas = ESTRESSE_THREADS * ESTRESSE_TENTATIVAS
+        return {
+            "dialeto": db.bind.dialect.name,
+            "threads": ESTRESSE_THREADS,
+            "tentativas": tentativas,
+            "reservados": total["reservados"],
+            "recusados": total["recusados"],
+            "bloqueio_esgotado": total["bloqueio_esgotado"],
+            "segundos": round(segundos, 3),
+            "tentativas_por_segundo": round(tentativas / segundos, 1),
+            "reservas_por_segundo": round(total["reservados"] / segundos, 1),
+            "sobreposicoes": sobreposicoes,
+        }
+    finally:
+        _limpar(db, contexto)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        for chave, valor in executar(db).items():
+            print(f"{chave}: {valor}")
+    finally:
+        db.close()
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from app.db.database import engine
+
+EXPORTACAO_TAMANHO_LOTE = int(os.getenv("EXPORTACAO_TAMANHO_LOTE", "2000"))
+TIPOS_EXPORTACAO = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+def _lotes_csv(lotes, colunas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for linhas in lotes:
+        escritor.writerows(linhas)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+_codificador_json = json.JSONEncoder(default=_valor_json, ensure_ascii=False)
+
+
+def _lotes_ndjson(lotes, colunas):
+    codificar = _codificador_json.encode
+    for linhas in lotes:
+        yield "".join(
+            codificar(dict(zip(colunas, linha))) + "\n" for linha in linhas
+        ).encode("utf-8")
+
+
+def exportar_linhas(consulta, params, colunas, formato):
+    with engine.connect() as conexao:
+        resultado = conexao.execution_options(stream_results=True).execute(
+            consulta, params
+        )
+        lotes = resultado.partitions(EXPORTACAO_TAMANHO_LOTE)
+        if formato == "ndjson":
+            yield from _lotes_ndjson(lotes, colunas)
+        else:
+            yield from _lotes_csv(lotes, colunas)
@@ -0,0 +1,90 @@
+import os
+from datetime import datetime, timedelta
+import stripe
+from sqlalchemy.orm import Session
+from app.models.cobranca_pendente import CobrancaPendente
+
+COBRANCA_MAX_TENTATIVAS = int(os.getenv("COBRANCA_MAX_TENTATIVAS", "6"))
+COBRANCA_TAMANHO_LOTE = int(os.getenv("COBRANCA_TAMANHO_LOTE", "20"))
+COBRANCA_BACKOFF_SEGUNDOS = int(os.getenv("COBRANCA_BACKOFF_SEGUNDOS", "30"))
+COBRANCA_TIMEOUT_ENVIO = timedelta(minutes=5)
+ERROS_DEFINITIVOS = (stripe.error.CardError, stripe.error.InvalidRequestError)
+
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+
+def enfileirar_cobranca(db: Session, agendamento, servico, cliente):
+    db.add(
+        CobrancaPendente(
+            agendamento_id=agendamento.id,
+            valor_centavos=int(servico.preco * 100),
+            email=cliente.email if cliente else None,
+            descricao=f"Pagamento de serviço '{servico.nome}' no AgendaVip",
+            status="pendente",
+        )
+    )
+
+
+def chave_cobranca(cobranca: CobrancaPendente):
+    return f"agendamento-{cobranca.agendamento_id}-finalizacao"
+
+
+def _reservar_lote(db: Session, agora: datetime):
+    query = (
+        db.query(CobrancaPendente)
+        .filter(
+            CobrancaPendente.status.in_(["pendente", "enviando"]),
+            CobrancaPendente.proxima_tentativa <= agora,
+        )
+        .order_by(CobrancaPendente.id)
+        .limit(COBRANCA_TAMANHO_LOTE)
+    )
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    cobrancas = query.all()
+    for cobranca in cobrancas:
+        cobranca.status = "enviando"
+        cobranca.tentativas += 1
+        cobranca.proxima_tentativa = agora + COBRANCA_TIMEOUT_ENVIO
+    db.commit()
+    return cobrancas
+
+
+def _marcar_falha(cobranca, erro):
+    print(f"[ERRO AO REALIZAR COBRANÇA {cobranca.agendamento_id}] {erro}")
+    cobranca.ultimo_erro = str(erro)
+    if (
+        isinstance(erro, ERROS_DEFINITIVOS)
+        or cobranca.tentativas >= COBRANCA_MAX_TENTATIVAS
+    ):
+        cobranca.status = "falhou"
+    else:
+        cobranca.status = "pendente"
+        cobranca.proxima_tentativa = datetime.utcnow() + timedelta(
+            seconds=COBRANCA_BACKOFF_SEGUNDOS * 2 ** (cobranca.tentativas - 1)
+        )
+
+
+def processar_fila_cobrancas(db: Session):
+    lote = _reservar_lote(db, datetime.utcnow())
+    enviadas = 0
+    for cobranca in lote:
+        try:
+            intent = stripe.PaymentIntent.create(
+                amount=cobranca.valor_centavos,
+                currency=cobranca.moeda,
+                receipt_email=cobranca.email,
+                metadata={"descricao": cobranca.descricao},
+                idempotency_key=chave_cobranca(cobranca),
+            )
+        except Exception as e:
+            _marcar_falha(cobranca, e)
+        else:
+            cobranca.status = "enviado"
+            cobranca.id_pagamento = intent.id
+            cobranca.enviado_em = datetime.utcnow()
+            cobranca.ultimo_erro = None
+            enviadas += 1
+        db.commit()
+    return enviadas
@@ -0,0 +1,114 @@
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from app.models.registro_dynamo_pendente import RegistroDynamoPendente
+from app.utils.dynamo_client import dynamodb
+from app.utils.metricas import TABELA_METRICAS, atualizar_rollups
+
+DYNAMO_MAX_TENTATIVAS = int(os.getenv("DYNAMO_MAX_TENTATIVAS", "8"))
+DYNAMO_TAMANHO_LOTE = int(os.getenv("DYNAMO_TAMANHO_LOTE", "100"))
+DYNAMO_BACKOFF_SEGUNDOS = int(os.getenv("DYNAMO_BACKOFF_SEGUNDOS", "15"))
+DYNAMO_TIMEOUT_ENVIO = timedelta(minutes=5)
+TAMANHO_BATCH_DYNAMO = 25
+
+
+def enfileirar_registro_dynamo(
+    db: Session, tabela: str, item: dict, atualizar_rollups=False
+):
+    db.add(
+        RegistroDynamoPendente(
+            tabela=tabela,
+            item=item,
+            atualizar_rollups=atualizar_rollups,
+            status="pendente",
+        )
+    )
+
+
+def _para_dynamo(item):
+    return json.loads(json.dumps(item), parse_float=Decimal)
+
+
+def _reservar_lote(db: Session, agora: datetime):
+    query = (
+        db.query(RegistroDynamoPendente)
+        .filter(
+            RegistroDynamoPendente.status.in_(["pendente", "enviando"]),
+            RegistroDynamoPendente.proxima_tentativa <= agora,
+        )
+        .order_by(RegistroDynamoPendente.id)
+        .limit(DYNAMO_TAMANHO_LOTE)
+    )
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    registros = query.all()
+    for registro in registros:
+        registro.status = "enviando"
+        registro.tentativas += 1
+        registro.proxima_tentativa = agora + DYNAMO_TIMEOUT_ENVIO
+    db.commit()
+    return registros
+
+
+def _gravar_batch(tabela, registros):
+    with tabela.batch_writer() as batch:
+        for registro in registros:
+            batch.put_item(Item=_para_dynamo(registro.item))
+
+
+def _marcar_falha(registro, erro):
+    print(f"[ERRO AO GRAVAR NO DYNAMODB {registro.tabela}] {erro}")
+    registro.ultimo_erro = str(erro)
+    if registro.tentativas >= DYNAMO_MAX_TENTATIVAS:
+        registro.status = "falhou"
+    else:
+        registro.status = "pendente"
+        registro.proxima_tentativa = datetime.utcnow() + timedelta(
+            seconds=DYNAMO_BACKOFF_SEGUNDOS * 2 ** (registro.tentativas - 1)
+        )
+
+
+def processar_fila_dynamo(db: Session, recurso=None):
+    recurso = recurso or dynamodb
+    lote = _reservar_lote(db, datetime.utcnow())
+    if not lote:
+        return 0
+
+    por_tabela = defaultdict(list)
+    for registro in lote:
+        por_tabela[registro.tabela].append(registro)
+
+    tabela_metricas = recurso.Table(TABELA_METRICAS)
+    enviados = 0
+    for nome_tabela, registros in por_tabela.items():
+        tabela = recurso.Table(nome_tabela)
+        for i in range(0, len(registros), TAMANHO_BATCH_DYNAMO):
+            batch = registros[i : i + TAMANHO_BATCH_DYNAMO]
+            try:
+                _gravar_batch(tabela, batch)
+            except Exception as e:
+                for registro in batch:
+                    _marcar_falha(registro, e)
+                db.commit()
+                continue
+
+            for registro in batch:
+                try:
+                    if registro.atualizar_rollups:
+                        atualizar_rollups(
+                            _para_dynamo(registro.item), tabela=tabela_metricas
+                        )
+                except Exception as e:
+                    _marcar_falha(registro, e)
+                    continue
+                registro.status = "enviado"
+                registro.enviado_em = datetime.utcnow()
+                registro.ultimo_erro = None
+                enviados += 1
+            db.commit()
+
+    return enviados
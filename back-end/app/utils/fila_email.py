@@ -0,0 +1,158 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from jinja2 import UndefinedError
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.models.email_pendente import EmailPendente
+from app.utils.templates_email import existe_modelo, obter_modelo
+from app.utils.transporte_email import obter_transporte
+
+EMAIL_MAX_CONCORRENCIA = int(os.getenv("EMAIL_MAX_CONCORRENCIA", "4"))
+EMAIL_MAX_TENTATIVAS = int(os.getenv("EMAIL_MAX_TENTATIVAS", "5"))
+EMAIL_TAMANHO_LOTE = int(os.getenv("EMAIL_TAMANHO_LOTE", "50"))
+EMAIL_BACKOFF_SEGUNDOS = int(os.getenv("EMAIL_BACKOFF_SEGUNDOS", "30"))
+EMAIL_TIMEOUT_ENVIO = timedelta(minutes=5)
+
+_preparadores = {}
+_executor = ThreadPoolExecutor(
+    max_workers=EMAIL_MAX_CONCORRENCIA, thread_name_prefix="email"
+)
+
+
+def contexto_email(tipo):
+    def registrar(funcao):
+        _preparadores[tipo] = funcao
+        return funcao
+
+    return registrar
+
+
+def enfileirar_email(db: Session, tipo, destinatario_email, contexto: dict):
+    if not existe_modelo(tipo):
+        raise ValueError(f"Modelo de e-mail desconhecido: {tipo}")
+
+    db.add(
+        EmailPendente(
+            tipo=tipo,
+            destinatario=destinatario_email,
+            contexto=contexto,
+            status="pendente",
+        )
+    )
+
+
+def _reservar_lote(db: Session, agora: datetime):
+    query = (
+        db.query(EmailPendente)
+        .filter(
+            EmailPendente.status.in_(["pendente", "enviando"]),
+            EmailPendente.proxima_tentativa <= agora,
+        )
+        .order_by(EmailPendente.id)
+        .limit(EMAIL_TAMANHO_LOTE)
+    )
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    emails = query.all()
+    lote = []
+    for email in emails:
+        email.status = "enviando"
+        email.tentativas += 1
+        email.proxima_tentativa = agora + EMAIL_TIMEOUT_ENVIO
+        lote.append(
+            {
+                "id": email.id,
+                "tipo": email.tipo,
+                "destinatario": email.destinatario,
+                "contexto": email.contexto,
+                "tentativas": email.tentativas,
+            }
+        )
+    db.commit()
+    return lote
+
+
+def _preparar_contexto(email):
+    preparador = _preparadores.get(email["tipo"])
+    contexto = preparador(**email["contexto"]) if preparador else email["contexto"]
+    imagens = contexto.pop("imagens", None) if preparador else None
+    return contexto, imagens
+
+
+def _renderizar(lote):
+    por_tipo = defaultdict(list)
+    for email in lote:
+        por_tipo[email["tipo"]].append(email)
+
+    ano = datetime.now().year
+    for tipo, emails in por_tipo.items():
+        for email in emails:
+            try:
+                contexto, imagens = _preparar_contexto(email)
+                mensagem = obter_modelo(tipo).renderizar(contexto, ano)
+                email["mensagem"] = {**mensagem, "imagens": imagens}
+            except Exception as e:
+                email["erro"] = e
+
+
+def _entregar(email):
+    if "erro" in email:
+        return email, email["erro"]
+    try:
+        mensagem = email["mensagem"]
+        obter_transporte().enviar(
+            email["destinatario"],
+            mensagem["assunto"],
+            mensagem["texto"],
+            mensagem["html"],
+            mensagem["imagens"],
+        )
+        return email, None
+    except Exception as e:
+        return email, e
+
+
+def processar_fila_emails(db: Session):
+    agora = datetime.utcnow()
+    lote = _reservar_lote(db, agora)
+    if not lote:
+        return 0
+
+    _renderizar(lote)
+    resultados = list(_executor.map(_entregar, lote))
+
+    registros = {
+        registro.id: registro
+        for registro in db.query(EmailPendente).filter(
+            EmailPendente.id.in_([email["id"] for email in lote])
+        )
+    }
+
+    enviados = 0
+    for email, erro in resultados:
+        registro = registros[email["id"]]
+        if erro is None:
+            registro.status = "enviado"
+            registro.enviado_em = datetime.utcnow()
+            registro.ultimo_erro = None
+            enviados += 1
+            continue
+
+        print(f"[ERRO AO ENVIAR E-MAIL {email['tipo']}] {erro}")
+        registro.ultimo_erro = str(erro)
+        if (
+            isinstance(erro, UndefinedError)
+            or email["tentativas"] >= EMAIL_MAX_TENTATIVAS
+        ):
+            registro.status = "falhou"
+        else:
+            registro.status = "pendente"
+            registro.proxima_tentativa = datetime.utcnow() + timedelta(
+                seconds=EMAIL_BACKOFF_SEGUNDOS * 2 ** (email["tentativas"] - 1)
+            )
+
+    db.commit()
+    return enviados
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.utils.agenda_bitmap import armazenamento_bitmap, inserir_slots_bitmap
+from app.utils.disponibilidade import DIAS_SEMANA
+from app.utils.ocupacao import registrar_variacao_ocupacao
+
+LOTE_INSERCAO = 5000
+
+
+def calcular_horarios_padrao(configuracoes, data_inicio, data_fim):
+    horarios = []
+    data_atual = data_inicio
+    while data_atual <= data_fim:
+        dia_semana = DIAS_SEMANA[data_atual.weekday()]
+
+        for conf in configuracoes:
+            if conf.dia_semana != dia_semana:
+                continue
+
+            hora_inicio = datetime.combine(
+                data_atual, datetime.strptime(conf.hora_inicio, "%H:%M").time()
+            )
+            hora_fim = datetime.combine(
+                data_atual, datetime.strptime(conf.hora_fim, "%H:%M").time()
+            )
+            duracao = timedelta(minutes=conf.duracao_slot)
+
+            atual = hora_inicio
+            while atual + duracao <= hora_fim:
+                horarios.append(atual)
+                atual += duracao
+
+        data_atual += timedelta(days=1)
+
+    return horarios
+
+
+def calcular_horarios_personalizados(horarios_personalizados, data_inicio, data_fim):
+    horas = [datetime.strptime(h, "%H:%M").time() for h in horarios_personalizados]
+    horarios = []
+    data_atual = data_inicio
+    while data_atual <= data_fim:
+        horarios.extend(datetime.combine(data_atual, hora) for hora in horas)
+        data_atual += timedelta(days=1)
+    return horarios
+
+
+def _inserir_linhas(db: Session, candidatos):
+    profissionais = {profissional_id for profissional_id, _, _ in candidatos}
+    inicio = min(data_hora for _, _, data_hora in candidatos)
+    fim = max(data_hora for _, _, data_hora in candidatos)
+
+    existentes = set(
+        db.query(AgendaDisponivel.profissional_id, AgendaDisponivel.data_hora)
+        .filter(
+            AgendaDisponivel.profissional_id.in_(profissionais),
+            AgendaDisponivel.data_hora >= inicio,
+            AgendaDisponivel.data_hora <= fim,
+        )
+        .all()
+    )
+
+    agora = datetime.now()
+    novos = []
+    for profissional_id, estabelecimento_id, data_hora in candidatos:
+        chave = (profissional_id, data_hora)
+        if chave in existentes:
+            continue
+        existentes.add(chave)
+        novos.append(
+            {
+                "profissional_id": profissional_id,
+                "estabelecimento_id": estabelecimento_id,
+                "data_hora": data_hora,
+                "ocupado": False,
+                "criado_em": agora,
+            }
+        )
+
+    if not novos:
+        return novos
+
+    if db.bind.dialect.name != "postgresql":
+        db.execute(insert(AgendaDisponivel.__table__), novos)
+        return novos
+
+    inseridos = set()
+    for posicao in range(0, len(novos), LOTE_INSERCAO):
+        stmt = (
+            pg_insert(AgendaDisponivel.__table__)
+            .values(novos[posicao : posicao + LOTE_INSERCAO])
+            .on_conflict_do_nothing(index_elements=["profissional_id", "data_hora"])
+            .returning(
+                AgendaDisponivel.__table__.c.profissional_id,
+                AgendaDisponivel.__table__.c.data_hora,
+            )
+        )
+        inseridos.update(tuple(linha) for linha in db.execute(stmt))
+    return [
+        slot
+        for slot in novos
+        if (slot["profissional_id"], slot["data_hora"]) in inseridos
+    ]
+
+
+def inserir_slots(db: Session, candidatos):
+    if not candidatos:
+        return [], 0
+
+    if armazenamento_bitmap():
+        novos = inserir_slots_bitmap(db, candidatos)
+    else:
+        novos = _inserir_linhas(db, candidatos)
+
+    registrar_variacao_ocupacao(
+        db,
+        (
+            (slot["profissional_id"], slot["estabelecimento_id"], slot["data_hora"])
+            for slot in novos
+        ),
+        livres=1,
+    )
+    return novos, len(candidatos) - len(novos)
@@ -0,0 +1,183 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+import jwt
+from fastapi import HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.models.resposta_idempotente import RespostaIdempotente
+from app.utils.security import ALGORITHM, SECRET_KEY
+
+IDEMPOTENCIA_TTL = int(os.getenv("IDEMPOTENCIA_TTL", "86400"))
+IDEMPOTENCIA_RESERVA_TIMEOUT = int(os.getenv("IDEMPOTENCIA_RESERVA_TIMEOUT", "60"))
+IDEMPOTENCIA_TAMANHO_CHAVE = 255
+CABECALHO_IDEMPOTENCIA = "Idempotency-Key"
+CABECALHO_REPETICAO = "Idempotent-Replayed"
+
+
+def idempotente(endpoint):
+    endpoint.idempotente = True
+    return endpoint
+
+
+def _usuario(request: Request):
+    esquema, _, token = request.headers.get("authorization", "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return ""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return ""
+    return f"{payload.get('tipo_usuario')}:{payload.get('id')}"
+
+
+def _impressao(request: Request, corpo: bytes):
+    digest = hashlib.sha256(_usuario(request).encode("utf-8"))
+    digest.update(b"\n")
+    digest.update(corpo)
+    return digest.hexdigest()
+
+
+def obter_chave_idempotencia(request: Request):
+    chave = request.headers.get(CABECALHO_IDEMPOTENCIA)
+    if not chave:
+        return None
+    escopo = f"{request.method} {request.url.path}"
+    namespace = f"{escopo}:{_usuario(request)}:{chave}"
+    return hashlib.sha256(namespace.encode("utf-8")).hexdigest()
+
+
+def _com_sessao(funcao, *args):
+    db = SessionLocal()
+    try:
+        return funcao(db, *args)
+    finally:
+        db.close()
+
+
+def reservar_chave(db: Session, chave: str, escopo: str, impressao: str):
+    agora = datetime.utcnow()
+    db.query(RespostaIdempotente).filter(
+        RespostaIdempotente.chave == chave,
+        RespostaIdempotente.escopo == escopo,
+        or_(
+            RespostaIdempotente.expira_em <= agora,
+            and_(
+                RespostaIdempotente.status_code.is_(None),
+                RespostaIdempotente.criado_em
+                <= agora - timedelta(seconds=IDEMPOTENCIA_RESERVA_TIMEOUT),
+            ),
+        ),
+    ).delete(synchronize_session=False)
+    db.add(
+        RespostaIdempotente(
+            chave=chave,
+            escopo=escopo,
+            impressao=impressao,
+            criado_em=agora,
+            expira_em=agora + timedelta(seconds=IDEMPOTENCIA_TTL),
+        )
+    )
+    try:
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+
+    registro = (
+        db.query(RespostaIdempotente).filter_by(chave=chave, escopo=escopo).first()
+    )
+    if registro is not None and registro.impressao != impressao:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key já utilizada em uma requisição diferente.",
+        )
+    if registro is None or registro.status_code is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Requisição com essa Idempotency-Key ainda em processamento.",
+            headers={"Retry-After": "1"},
+        )
+
+    return Response(
+        content=registro.corpo,
+        status_code=registro.status_code,
+        media_type=registro.tipo_conteudo,
+        headers={CABECALHO_REPETICAO: "true"},
+    )
+
+
+def guardar_resposta(db: Session, chave: str, escopo: str, resposta: Response):
+    db.query(RespostaIdempotente).filter_by(chave=chave, escopo=escopo).update(
+        {
+            "status_code": resposta.status_code,
+            "tipo_conteudo": resposta.headers.get("content-type"),
+            "corpo": resposta.body,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def liberar_chave(db: Session, chave: str, escopo: str):
+    db.query(RespostaIdempotente).filter(
+        RespostaIdempotente.chave == chave,
+        RespostaIdempotente.escopo == escopo,
+        RespostaIdempotente.status_code.is_(None),
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def purgar_respostas_expiradas(db: Session):
+    removidas = (
+        db.query(RespostaIdempotente)
+        .filter(RespostaIdempotente.expira_em <= datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return removidas
+
+
+class RotaIdempotente(APIRoute):
+    def get_route_handler(self):
+        processar = super().get_route_handler()
+        if not getattr(self.endpoint, "idempotente", False):
+            return processar
+
+        async def processar_idempotente(request: Request) -> Response:
+            chave = request.headers.get(CABECALHO_IDEMPOTENCIA)
+            if not chave:
+                return await processar(request)
+            if len(chave) > IDEMPOTENCIA_TAMANHO_CHAVE:
+                raise HTTPException(
+                    status_code=400, detail="Idempotency-Key excede 255 caracteres."
+                )
+
+            escopo = f"{request.method} {request.url.path}"
+            chave = obter_chave_idempotencia(request)
+            impressao = _impressao(request, await request.body())
+            repeticao = await run_in_threadpool(
+                _com_sessao, reservar_chave, chave, escopo, impressao
+            )
+            if repeticao is not None:
+                return repeticao
+
+            try:
+                resposta = await processar(request)
+            except BaseException:
+                await run_in_threadpool(_com_sessao, liberar_chave, chave, escopo)
+                raise
+
+            if getattr(resposta, "body", None) is None:
+                await run_in_threadpool(_com_sessao, liberar_chave, chave, escopo)
+            else:
+                await run_in_threadpool(
+                    _com_sessao, guardar_resposta, chave, escopo, resposta
+                )
+            return resposta
+
+        return processar_idempotente
@@ -2,112 +2,218 @@ import boto3
 from boto3.dynamodb.conditions import Key
 from datetime import datetime
 from collections import defaultdict
+from decimal import Decimal
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+TABELA_SERVICOS = 'servicos_finalizados_plataforma_tcc'
+TABELA_METRICAS = os.getenv(
+    'DYNAMODB_METRICAS_TABLE', 'metricas_estabelecimento_plataforma_tcc'
+)
+DIAS_SEMANA = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+PREFIXO_APLICADO = "APLICADO#"
 
-def obter_faturamento_mensal(estabelecimento_id: int):
-    dynamodb = boto3.resource(
+
+def _recurso_dynamodb():
+    return boto3.resource(
         'dynamodb',
         region_name=os.getenv('AWS_REGION'),
         aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
         aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    )
-    tabela = dynamodb.Table('servicos_finalizados_plataforma_tcc')
-
-    response = tabela.scan()
-    items = response.get('Items', [])
-    items.append(
-        {
-            "estabelecimento_id": "1",
-            "data_inicio": "2025-02-15T10:00:00",
-            "valor": 150.0,
-        }
-    )
-    items.append(
-        {
-            "estabelecimento_id": "1",
-            "data_inicio": "2025-03-10T11:00:00",
-            "valor": 200.0,
-        }
+        endpoint_url=os.getenv('DYNAMODB_ENDPOINT_URL'),
     )
 
-    faturamento_por_mes = defaultdict(float)
 
-    for item in items:
-        if int(item.get('estabelecimento_id', 0)) != estabelecimento_id:
-            continue
+_tabela_metricas = None
 
-        data_inicio = item.get('data_inicio')
-        valor = float(item.get('valor', 0))
 
-        data_obj = datetime.strptime(data_inicio, "%Y-%m-%dT%H:%M:%S")
-        chave = f"{data_obj.year}-{data_obj.month:02d}"
+def obter_tabela_metricas():
+    global _tabela_metricas
+    if _tabela_metricas is None:
+        _tabela_metricas = _recurso_dynamodb().Table(TABELA_METRICAS)
+    return _tabela_metricas
 
-        faturamento_por_mes[chave] += valor
 
-    resultado = [
-        {"mes": k, "faturamento": v} for k, v in sorted(faturamento_por_mes.items())
+def _chaves_rollup(item):
+    data_obj = datetime.fromisoformat(item['data_inicio'])
+    return [
+        (f"MES#{data_obj.year}-{data_obj.month:02d}", None),
+        (f"DIA#{data_obj.weekday()}", DIAS_SEMANA[data_obj.weekday()]),
+        (f"SERVICO#{item['servico_id']}", item.get('servico_nome')),
     ]
 
-    return resultado
-
-
-def obter_agendamentos_por_dia(estabelecimento_id: int):
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=os.getenv('AWS_REGION'),
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    )
-    tabela = dynamodb.Table('servicos_finalizados_plataforma_tcc')
 
-    response = tabela.scan()
-    items = response.get('Items', [])
+def atualizar_rollups(item, tabela=None):
+    tabela = tabela or obter_tabela_metricas()
+    pk = f"ESTABELECIMENTO#{item['estabelecimento_id']}"
+    valor = Decimal(str(item.get('valor', 0)))
 
-    agendamentos_por_dia = defaultdict(int)
+    operacoes = [
+        {
+            "Put": {
+                "TableName": tabela.name,
+                "Item": {"pk": pk, "sk": f"{PREFIXO_APLICADO}{item['id_agendamento']}"},
+                "ConditionExpression": "attribute_not_exists(pk)",
+            }
+        }
+    ]
+    for sk, rotulo in _chaves_rollup(item):
+        expressao = "ADD agendamentos :um, faturamento :valor"
+        valores = {":um": 1, ":valor": valor}
+        if rotulo is not None:
+            expressao += " SET rotulo = :rotulo"
+            valores[":rotulo"] = rotulo
+
+        operacoes.append(
+            {
+                "Update": {
+                    "TableName": tabela.name,
+                    "Key": {"pk": pk, "sk": sk},
+                    "UpdateExpression": expressao,
+                    "ExpressionAttributeValues": valores,
+                }
+            }
+        )
+
+    cliente = tabela.meta.client
+    try:
+        cliente.transact_write_items(TransactItems=operacoes)
+    except cliente.exceptions.TransactionCanceledException as erro:
+        motivos = erro.response.get("CancellationReasons", [])
+        if motivos and motivos[0].get("Code") == "ConditionalCheckFailed":
+            return False
+        raise
+    return True
+
+
+def _consultar_buckets(estabelecimento_id: int, prefixo: str, tabela=None):
+    tabela = tabela or obter_tabela_metricas()
+    parametros = {
+        "KeyConditionExpression": Key("pk").eq(f"ESTABELECIMENTO#{estabelecimento_id}")
+        & Key("sk").begins_with(prefixo)
+    }
+
+    items = []
+    while True:
+        response = tabela.query(**parametros)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        parametros["ExclusiveStartKey"] = response['LastEvaluatedKey']
+
+
+def obter_faturamento_mensal(estabelecimento_id: int, tabela=None):
+    items = _consultar_buckets(estabelecimento_id, "MES#", tabela)
+    return [
+        {"mes": item['sk'][len("MES#") :], "faturamento": float(item['faturamento'])}
+        for item in sorted(items, key=lambda i: i['sk'])
+    ]
 
-    dias_semana = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
 
-    for item in items:
-        if int(item.get('estabelecimento_id', 0)) != estabelecimento_id:
-            continue
+def obter_agendamentos_por_dia(estabelecimento_id: int, tabela=None):
+    items = _consultar_buckets(estabelecimento_id, "DIA#", tabela)
+    return [
+        {"dia": item['rotulo'], "agendamentos": int(item['agendamentos'])}
+        for item in sorted(items, key=lambda i: i['sk'])
+    ]
 
-        horario = item.get('horario')
-        if horario:
-            data_obj = datetime.strptime(horario, "%Y-%m-%dT%H:%M:%S")
-            dia_semana = dias_semana[data_obj.weekday()]
-            agendamentos_por_dia[dia_semana] += 1
 
-    resultado = [{"dia": k, "agendamentos": v} for k, v in agendamentos_por_dia.items()]
-    return resultado
+def obter_agendamentos_por_servico(estabelecimento_id: int, tabela=None):
+    items = _consultar_buckets(estabelecimento_id, "SERVICO#", tabela)
+    return [
+        {"servico": item['rotulo'], "agendamentos": int(item['agendamentos'])}
+        for item in items
+    ]
 
 
-def obter_agendamentos_por_servico(estabelecimento_id: int):
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=os.getenv('AWS_REGION'),
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    )
-    tabela = dynamodb.Table('servicos_finalizados_plataforma_tcc')
+def _varrer_tabela(tabela):
+    parametros = {}
+    while True:
+        response = tabela.scan(**parametros)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        parametros["ExclusiveStartKey"] = response['LastEvaluatedKey']
 
-    response = tabela.scan()
-    items = response.get('Items', [])
 
-    agendamentos_por_servico = defaultdict(int)
+def reconstruir_rollups(tabela_servicos=None, tabela_metricas=None):
+    recurso = None
+    if tabela_servicos is None or tabela_metricas is None:
+        recurso = _recurso_dynamodb()
+    tabela_servicos = tabela_servicos or recurso.Table(TABELA_SERVICOS)
+    tabela_metricas = tabela_metricas or recurso.Table(TABELA_METRICAS)
 
-    for item in items:
-        if int(item.get('estabelecimento_id', 0)) != estabelecimento_id:
+    buckets = defaultdict(
+        lambda: {"agendamentos": 0, "faturamento": Decimal("0"), "rotulo": None}
+    )
+    aplicados = set()
+    total = 0
+    for item in _varrer_tabela(tabela_servicos):
+        if not item.get('data_inicio') or item.get('estabelecimento_id') is None:
             continue
+        pk = f"ESTABELECIMENTO#{int(item['estabelecimento_id'])}"
+        if item.get('id_agendamento') is not None:
+            aplicados.add((pk, f"{PREFIXO_APLICADO}{item['id_agendamento']}"))
+        valor = Decimal(str(item.get('valor', 0)))
+        for sk, rotulo in _chaves_rollup(item):
+            bucket = buckets[(pk, sk)]
+            bucket["agendamentos"] += 1
+            bucket["faturamento"] += valor
+            bucket["rotulo"] = rotulo
+        total += 1
+
+    existentes = {
+        (item['pk'], item['sk']) for item in _varrer_tabela(tabela_metricas)
+    }
+
+    with tabela_metricas.batch_writer() as batch:
+        for (pk, sk), bucket in buckets.items():
+            item = {
+                "pk": pk,
+                "sk": sk,
+                "agendamentos": bucket["agendamentos"],
+                "faturamento": bucket["faturamento"],
+            }
+            if bucket["rotulo"] is not None:
+                item["rotulo"] = bucket["rotulo"]
+            batch.put_item(Item=item)
+
+        for pk, sk in aplicados - existentes:
+            batch.put_item(Item={"pk": pk, "sk": sk})
+
+        for pk, sk in existentes - set(buckets) - aplicados:
+            batch.delete_item(Key={"pk": pk, "sk": sk})
+
+    return {"servicos_processados": total, "buckets": len(buckets)}
+
+
+def criar_tabela_metricas(recurso=None):
+    recurso = recurso or _recurso_dynamodb()
+    cliente = recurso.meta.client
+    try:
+        cliente.describe_table(TableName=TABELA_METRICAS)
+        return False
+    except cliente.exceptions.ResourceNotFoundException:
+        pass
+
+    tabela = recurso.create_table(
+        TableName=TABELA_METRICAS,
+        KeySchema=[
+            {"AttributeName": "pk", "KeyType": "HASH"},
+            {"AttributeName": "sk", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "pk", "AttributeType": "S"},
+            {"AttributeName": "sk", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    tabela.wait_until_exists()
+    return True
 
-        nome_servico = item.get('servico_nome')
-        if nome_servico:
-            agendamentos_por_servico[nome_servico] += 1
 
-    resultado = [
-        {"servico": k, "agendamentos": v} for k, v in agendamentos_por_servico.items()
-    ]
-    return resultado
+if __name__ == "__main__":
+    print({"tabela_criada": criar_tabela_metricas()})
+    print(reconstruir_rollups())
@@ -0,0 +1,62 @@
+from sqlalchemy import bindparam, text
+from app.db.database import engine
+from app.models.agendamento import DDL_PERIODO
+from app.utils.disponibilidade import STATUS_ATIVOS
+
+RESTRICAO_PERIODO = "agendamentos_sem_sobreposicao"
+
+
+def aplicar_periodo(conexao):
+    conexao.execute(
+        text("ALTER TABLE agendamentos ADD COLUMN IF NOT EXISTS horario_fim TIMESTAMP")
+    )
+    preenchidos = conexao.execute(
+        text(
+            """
+            UPDATE agendamentos a
+            SET horario_fim = a.horario + s.tempo * INTERVAL '1 minute'
+            FROM servicos s
+            WHERE s.id = a.servico_id
+            AND a.horario_fim IS NULL
+            """
+        )
+    ).rowcount
+    conexao.execute(
+        text("ALTER TABLE agendamentos ALTER COLUMN horario_fim SET NOT NULL")
+    )
+
+    sobrepostos = conexao.execute(
+        text(
+            """
+            SELECT a.id, b.id
+            FROM agendamentos a
+            JOIN agendamentos b
+            ON b.profissional_id = a.profissional_id
+            AND b.id > a.id
+            AND b.horario < a.horario_fim
+            AND a.horario < b.horario_fim
+            WHERE a.status IN :status
+            AND b.status IN :status
+            """
+        ).bindparams(bindparam("status", expanding=True)),
+        {"status": STATUS_ATIVOS},
+    ).fetchall()
+    if sobrepostos:
+        raise ValueError(
+            "Existem agendamentos ativos sobrepostos, resolva-os antes de criar "
+            f"a restrição: {[tuple(par) for par in sobrepostos[:20]]}"
+        )
+
+    existente = conexao.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :nome"),
+        {"nome": RESTRICAO_PERIODO},
+    ).scalar()
+    for comando in DDL_PERIODO[:2] if existente else DDL_PERIODO:
+        conexao.execute(text(comando))
+
+    return {"horario_fim_preenchidos": preenchidos, "restricao_criada": not existente}
+
+
+if __name__ == "__main__":
+    with engine.begin() as conexao:
+        print(aplicar_periodo(conexao))
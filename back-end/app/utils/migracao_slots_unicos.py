@@ -0,0 +1,52 @@
+from sqlalchemy import text
+from app.db.database import SessionLocal, engine
+from app.utils.ocupacao import reconciliar_ocupacao
+
+RESTRICAO_SLOTS = "uq_agenda_disponivel_profissional_data"
+
+
+def aplicar_slots_unicos(conexao):
+    removidos = conexao.execute(
+        text(
+            """
+            DELETE FROM agenda_disponivel
+            WHERE EXISTS (
+                SELECT 1
+                FROM agenda_disponivel outro
+                WHERE outro.profissional_id = agenda_disponivel.profissional_id
+                AND outro.data_hora = agenda_disponivel.data_hora
+                AND (
+                    COALESCE(outro.ocupado, false)
+                    AND NOT COALESCE(agenda_disponivel.ocupado, false)
+                    OR COALESCE(outro.ocupado, false)
+                    = COALESCE(agenda_disponivel.ocupado, false)
+                    AND outro.id < agenda_disponivel.id
+                )
+            )
+            """
+        )
+    ).rowcount
+
+    existente = conexao.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :nome"),
+        {"nome": RESTRICAO_SLOTS},
+    ).scalar()
+    if not existente:
+        conexao.execute(
+            text(
+                f"ALTER TABLE agenda_disponivel ADD CONSTRAINT {RESTRICAO_SLOTS} "
+                "UNIQUE (profissional_id, data_hora)"
+            )
+        )
+
+    return {"slots_duplicados_removidos": removidos, "restricao_criada": not existente}
+
+
+if __name__ == "__main__":
+    with engine.begin() as conexao:
+        print(aplicar_slots_unicos(conexao))
+    db = SessionLocal()
+    try:
+        print(reconciliar_ocupacao(db))
+    finally:
+        db.close()
@@ -0,0 +1,198 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import Date, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models.agenda_disponivel import AgendaDisponivel
+from app.models.ocupacao_diaria import OcupacaoDiaria
+from app.utils.agenda_bitmap import armazenamento_bitmap, contagens_bitmap
+from app.utils.disponibilidade import duracao_slot_em, duracoes_slot_por_profissional
+
+OCUPACAO_JANELA_RECONCILIACAO = int(os.getenv("OCUPACAO_JANELA_RECONCILIACAO", "30"))
+OCUPACAO_MAX_DIAS = int(os.getenv("OCUPACAO_MAX_DIAS", "366"))
+COLUNAS_OCUPACAO = (
+    "slots_livres",
+    "slots_ocupados",
+    "minutos_livres",
+    "minutos_ocupados",
+)
+
+_inserts = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def _minutos_slot(duracoes, profissional_id, dia):
+    return int(duracao_slot_em(duracoes[profissional_id], dia).total_seconds() // 60)
+
+
+def _gravar(db: Session, linhas, acumular):
+    if not linhas:
+        return
+
+    stmt = _inserts[db.bind.dialect.name](OcupacaoDiaria.__table__)
+    tabela = OcupacaoDiaria.__table__
+    valores = {
+        coluna: tabela.c[coluna] + stmt.excluded[coluna]
+        if acumular
+        else stmt.excluded[coluna]
+        for coluna in COLUNAS_OCUPACAO
+    }
+    valores["estabelecimento_id"] = stmt.excluded.estabelecimento_id
+    valores["atualizado_em"] = stmt.excluded.atualizado_em
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["profissional_id", "data"], set_=valores
+        ),
+        linhas,
+    )
+
+
+def registrar_variacao_ocupacao(db: Session, slots, livres=0, ocupados=0):
+    slots = list(slots)
+    if not slots:
+        return
+
+    duracoes = duracoes_slot_por_profissional(
+        db, {profissional_id for profissional_id, _, _ in slots}
+    )
+    variacoes = defaultdict(lambda: dict.fromkeys(COLUNAS_OCUPACAO, 0))
+    for profissional_id, estabelecimento_id, data_hora in slots:
+        minutos = _minutos_slot(duracoes, profissional_id, data_hora)
+        variacao = variacoes[(profissional_id, estabelecimento_id, data_hora.date())]
+        variacao["slots_livres"] += livres
+        variacao["slots_ocupados"] += ocupados
+        variacao["minutos_livres"] += livres * minutos
+        variacao["minutos_ocupados"] += ocupados * minutos
+
+    agora = datetime.utcnow()
+    _gravar(
+        db,
+        [
+            {
+                "profissional_id": profissional_id,
+                "estabelecimento_id": estabelecimento_id,
+                "data": dia,
+                "atualizado_em": agora,
+                **valores,
+            }
+            for (profissional_id, estabelecimento_id, dia), valores in variacoes.items()
+        ],
+        acumular=True,
+    )
+
+
+def _contagens_linhas(db: Session, data_inicio: date = None, data_fim: date = None):
+    dia = func.date(AgendaDisponivel.data_hora, type_=Date)
+    query = db.query(
+        AgendaDisponivel.profissional_id,
+        func.max(AgendaDisponivel.estabelecimento_id),
+        dia,
+        AgendaDisponivel.ocupado,
+        func.count(),
+    )
+    if data_inicio is not None:
+        query = query.filter(
+            AgendaDisponivel.data_hora >= datetime.combine(data_inicio, time.min)
+        )
+    if data_fim is not None:
+        query = query.filter(
+            AgendaDisponivel.data_hora
+            < datetime.combine(data_fim + timedelta(days=1), time.min)
+        )
+    return query.group_by(
+        AgendaDisponivel.profissional_id, dia, AgendaDisponivel.ocupado
+    ).all()
+
+
+def reconciliar_ocupacao(db: Session, data_inicio: date = None, data_fim: date = None):
+    existentes = db.query(OcupacaoDiaria)
+    if data_inicio is not None:
+        existentes = existentes.filter(OcupacaoDiaria.data >= data_inicio)
+    if data_fim is not None:
+        existentes = existentes.filter(OcupacaoDiaria.data <= data_fim)
+
+    if armazenamento_bitmap():
+        contagens = contagens_bitmap(db, data_inicio, data_fim)
+    else:
+        contagens = _contagens_linhas(db, data_inicio, data_fim)
+
+    duracoes = duracoes_slot_por_profissional(
+        db, {profissional_id for profissional_id, _, _, _, _ in contagens}
+    )
+
+    agora = datetime.utcnow()
+    linhas = {}
+    for profissional_id, estabelecimento_id, data, ocupado, total in contagens:
+        linha = linhas.setdefault(
+            (profissional_id, data),
+            {
+                "profissional_id": profissional_id,
+                "estabelecimento_id": estabelecimento_id,
+                "data": data,
+                "atualizado_em": agora,
+                **dict.fromkeys(COLUNAS_OCUPACAO, 0),
+            },
+        )
+        minutos = total * _minutos_slot(duracoes, profissional_id, data)
+        if ocupado:
+            linha["slots_ocupados"] += total
+            linha["minutos_ocupados"] += minutos
+        else:
+            linha["slots_livres"] += total
+            linha["minutos_livres"] += minutos
+
+    removidos = 0
+    for ocupacao in existentes.all():
+        if (ocupacao.profissional_id, ocupacao.data) not in linhas:
+            db.delete(ocupacao)
+            removidos += 1
+
+    _gravar(db, list(linhas.values()), acumular=False)
+    db.commit()
+
+    return {"dias_recalculados": len(linhas), "dias_removidos": removidos}
+
+
+def consultar_ocupacao(
+    db: Session,
+    estabelecimento_id: int,
+    data_inicio: date,
+    data_fim: date,
+    profissional_id: int = None,
+):
+    query = db.query(OcupacaoDiaria).filter(
+        OcupacaoDiaria.estabelecimento_id == estabelecimento_id,
+        OcupacaoDiaria.data >= data_inicio,
+        OcupacaoDiaria.data <= data_fim,
+    )
+    if profissional_id is not None:
+        query = query.filter(OcupacaoDiaria.profissional_id == profissional_id)
+
+    resultado = []
+    for ocupacao in query.order_by(OcupacaoDiaria.data, OcupacaoDiaria.profissional_id):
+        minutos_totais = ocupacao.minutos_livres + ocupacao.minutos_ocupados
+        resultado.append(
+            {
+                "profissional_id": ocupacao.profissional_id,
+                "data": ocupacao.data.isoformat(),
+                "slots_livres": ocupacao.slots_livres,
+                "slots_ocupados": ocupacao.slots_ocupados,
+                "minutos_livres": ocupacao.minutos_livres,
+                "minutos_ocupados": ocupacao.minutos_ocupados,
+                "taxa_ocupacao": round(ocupacao.minutos_ocupados / minutos_totais, 4)
+                if minutos_totais
+                else 0,
+            }
+        )
+    return resultado
+
+
+if __name__ == "__main__":
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(reconciliar_ocupacao(db))
+    finally:
+        db.close()
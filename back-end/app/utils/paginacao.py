@@ -0,0 +1,94 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import DateTime, bindparam, text, tuple_
+
+PAGINACAO_TAMANHO_PADRAO = int(os.getenv("PAGINACAO_TAMANHO_PADRAO", "50"))
+PAGINACAO_LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "200"))
+CABECALHO_PROXIMO_CURSOR = "X-Next-Cursor"
+
+
+class Paginacao:
+    def __init__(self, cursor: Optional[str], limite: Optional[int]):
+        self.ativa = cursor is not None or limite is not None
+        self.limite = limite or PAGINACAO_TAMANHO_PADRAO
+        self.horario, self.id = decodificar_cursor(cursor) if cursor else (None, None)
+
+
+def paginacao(
+    cursor: Optional[str] = Query(None),
+    limite: Optional[int] = Query(None, ge=1, le=PAGINACAO_LIMITE_MAXIMO),
+):
+    return Paginacao(cursor, limite)
+
+
+def codificar_cursor(horario, id: int):
+    if isinstance(horario, datetime):
+        horario = horario.isoformat()
+    dados = json.dumps([horario, id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(dados).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str):
+    try:
+        dados = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        horario, id = json.loads(dados)
+        return datetime.fromisoformat(horario), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+
+
+def paginar_sql(
+    sql: str,
+    params: dict,
+    pagina: Paginacao,
+    coluna_horario="a.horario",
+    coluna_id="a.id",
+    descendente=True,
+    ordem_sem_paginacao=None,
+):
+    if not pagina.ativa and ordem_sem_paginacao:
+        return text(f"{sql} ORDER BY {ordem_sem_paginacao}"), params
+
+    direcao = "DESC" if descendente else "ASC"
+    if pagina.horario is not None:
+        operador = "<" if descendente else ">"
+        sql += (
+            f" AND ({coluna_horario}, {coluna_id}) {operador} "
+            "(:cursor_horario, :cursor_id)"
+        )
+        params["cursor_horario"] = pagina.horario
+        params["cursor_id"] = pagina.id
+
+    sql += f" ORDER BY {coluna_horario} {direcao}, {coluna_id} {direcao}"
+    if pagina.ativa:
+        sql += " LIMIT :limite_pagina"
+        params["limite_pagina"] = pagina.limite + 1
+
+    consulta = text(sql)
+    if pagina.horario is not None:
+        consulta = consulta.bindparams(bindparam("cursor_horario", type_=DateTime))
+    return consulta, params
+
+
+def paginar_query(query, pagina: Paginacao, coluna_horario, coluna_id):
+    if pagina.horario is not None:
+        query = query.filter(
+            tuple_(coluna_horario, coluna_id) < tuple_(pagina.horario, pagina.id)
+        )
+    query = query.order_by(coluna_horario.desc(), coluna_id.desc())
+    if pagina.ativa:
+        query = query.limit(pagina.limite + 1)
+    return query
+
+
+def fechar_pagina(response: Response, linhas, pagina: Paginacao, chave):
+    if not pagina.ativa or len(linhas) <= pagina.limite:
+        return linhas
+
+    linhas = linhas[: pagina.limite]
+    response.headers[CABECALHO_PROXIMO_CURSOR] = codificar_cursor(*chave(linhas[-1]))
+    return linhas
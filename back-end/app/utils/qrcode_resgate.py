@@ -1,24 +1,142 @@
-from datetime import datetime
-import qrcode
-from io import BytesIO
+import asyncio
 import base64
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from threading import Lock
+import qrcode
 
+QRCODE_CACHE_MAX_BYTES = int(os.getenv("QRCODE_CACHE_MAX_BYTES", "8388608"))
+QRCODE_MAX_WORKERS = int(os.getenv("QRCODE_MAX_WORKERS", "2"))
 
-def gerar_qrcode_base64(dados_dict: dict, return_bytes=False):
-    conteudo = (
+NIVEIS_CORRECAO = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+TIPOS_MIDIA = {"png": "image/png", "svg": "image/svg+xml"}
+
+_executor = ThreadPoolExecutor(
+    max_workers=QRCODE_MAX_WORKERS, thread_name_prefix="qrcode"
+)
+
+
+class CacheQRCode:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes_usados = 0
+        self._itens = OrderedDict()
+        self._lock = Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            conteudo = self._itens.get(chave)
+            if conteudo is not None:
+                self._itens.move_to_end(chave)
+            return conteudo
+
+    def guardar(self, chave, conteudo):
+        if len(conteudo) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self.bytes_usados -= len(anterior)
+            self._itens[chave] = conteudo
+            self.bytes_usados += len(conteudo)
+            while self.bytes_usados > self.max_bytes:
+                _, removido = self._itens.popitem(last=False)
+                self.bytes_usados -= len(removido)
+
+
+_cache = CacheQRCode(QRCODE_CACHE_MAX_BYTES)
+
+
+def conteudo_qrcode(dados_dict: dict):
+    return (
         f"Cliente: {dados_dict['cliente']}\n"
         f"Serviço: {dados_dict['servico']}\n"
         f"Estabelecimento: {dados_dict['estabelecimento']}\n"
         f"Data do Resgate: {dados_dict['data_resgate'].strftime('%d/%m/%Y às %H:%M')}"
     )
 
-    qr = qrcode.make(conteudo)
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    buffer.seek(0)
 
+def chave_qrcode(conteudo: str, formato="png", tamanho_caixa=10, correcao="M"):
+    return hashlib.sha256(
+        f"{formato}|{tamanho_caixa}|{correcao}|{conteudo}".encode("utf-8")
+    ).hexdigest()
+
+
+def _svg_compacto(matriz, tamanho_caixa):
+    lado = len(matriz)
+    trechos = []
+    for y, linha in enumerate(matriz):
+        x = 0
+        while x < lado:
+            if not linha[x]:
+                x += 1
+                continue
+            inicio = x
+            while x < lado and linha[x]:
+                x += 1
+            trechos.append(f"M{inicio},{y}h{x - inicio}v1h-{x - inicio}z")
+
+    pixels = lado * tamanho_caixa
     return (
-        buffer.read()
-        if return_bytes
-        else base64.b64encode(buffer.getvalue()).decode("utf-8")
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {lado} {lado}" shape-rendering="crispEdges">'
+        f'<rect width="{lado}" height="{lado}" fill="#fff"/>'
+        f'<path d="{"".join(trechos)}"/></svg>'
+    ).encode("utf-8")
+
+
+def _codificar(conteudo, formato, tamanho_caixa, correcao):
+    qr = qrcode.QRCode(
+        error_correction=NIVEIS_CORRECAO[correcao], box_size=tamanho_caixa, border=4
     )
+    qr.add_data(conteudo)
+    qr.make(fit=True)
+
+    if formato == "svg":
+        return _svg_compacto(qr.get_matrix(), tamanho_caixa)
+
+    buffer = BytesIO()
+    qr.make_image().save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def gerar_qrcode(conteudo: str, formato="png", tamanho_caixa=10, correcao="M"):
+    if formato not in TIPOS_MIDIA:
+        raise ValueError(f"Formato de QR Code inválido: {formato}")
+    if correcao not in NIVEIS_CORRECAO:
+        raise ValueError(f"Nível de correção inválido: {correcao}")
+
+    chave = chave_qrcode(conteudo, formato, tamanho_caixa, correcao)
+    imagem = _cache.obter(chave)
+    if imagem is None:
+        imagem = _codificar(conteudo, formato, tamanho_caixa, correcao)
+        _cache.guardar(chave, imagem)
+    return chave, imagem
+
+
+async def gerar_qrcode_async(
+    conteudo: str, formato="png", tamanho_caixa=10, correcao="M"
+):
+    chave = chave_qrcode(conteudo, formato, tamanho_caixa, correcao)
+    imagem = _cache.obter(chave)
+    if imagem is not None:
+        return chave, imagem
+
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor,
+        partial(gerar_qrcode, conteudo, formato, tamanho_caixa, correcao),
+    )
+
+
+def gerar_qrcode_base64(dados_dict: dict, return_bytes=False):
+    _, imagem = gerar_qrcode(conteudo_qrcode(dados_dict))
+    return imagem if return_bytes else base64.b64encode(imagem).decode("utf-8")
@@ -1,47 +1,55 @@
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from app.models.agendamento import Agendamento
-from app.models.user import User
-from app.models.funcionarios import Funcionario
 from app.utils.notifications import enviar_email_1_dia, enviar_email_1_hora
 
+JANELA_1_DIA = (timedelta(hours=23, minutes=30), timedelta(days=1))
+JANELA_1_HORA = (timedelta(minutes=50), timedelta(hours=1))
 
-def verificar_e_enviar_notificacoes_agendamentos(db: Session):
-    agora = datetime.now()
 
-    agendamentos = (
-        db.query(Agendamento).filter(Agendamento.status == "confirmado").all()
+def _agendamentos_na_janela(db: Session, agora, janela, coluna_notificado):
+    return (
+        db.query(Agendamento)
+        .options(
+            joinedload(Agendamento.cliente),
+            joinedload(Agendamento.profissional),
+            joinedload(Agendamento.servico),
+        )
+        .filter(
+            Agendamento.status == "confirmado",
+            Agendamento.horario > agora + janela[0],
+            Agendamento.horario <= agora + janela[1],
+            coluna_notificado.isnot(True),
+        )
+        .all()
     )
 
-    for agendamento in agendamentos:
-        tempo_para_agendamento = agendamento.horario - agora
 
-        cliente = db.query(User).filter(User.id == agendamento.cliente_id).first()
-        profissional = (
-            db.query(Funcionario)
-            .filter(Funcionario.id == agendamento.profissional_id)
-            .first()
-        )
+def verificar_e_enviar_notificacoes_agendamentos(db: Session):
+    agora = datetime.now()
+
+    for agendamento in _agendamentos_na_janela(
+        db, agora, JANELA_1_DIA, Agendamento.notificado_1_dia
+    ):
+        cliente = agendamento.cliente
+        profissional = agendamento.profissional
+        if not cliente or not profissional:
+            continue
+
+        enviar_email_1_dia(db, cliente.email, cliente.nome, agendamento)
+        enviar_email_1_dia(db, profissional.email, profissional.nome, agendamento)
+        agendamento.notificado_1_dia = True
 
+    for agendamento in _agendamentos_na_janela(
+        db, agora, JANELA_1_HORA, Agendamento.notificado_1_hora
+    ):
+        cliente = agendamento.cliente
+        profissional = agendamento.profissional
         if not cliente or not profissional:
             continue
 
-        if (
-            timedelta(hours=23, minutes=30)
-            < tempo_para_agendamento
-            <= timedelta(days=1)
-            and not agendamento.notificado_1_dia
-        ):
-            enviar_email_1_dia(cliente.email, cliente.nome, agendamento)
-            enviar_email_1_dia(profissional.email, profissional.nome, agendamento)
-            agendamento.notificado_1_dia = True
-
-        elif (
-            timedelta(minutes=50) < tempo_para_agendamento <= timedelta(hours=1)
-            and not agendamento.notificado_1_hora
-        ):
-            enviar_email_1_hora(cliente.email, cliente.nome, agendamento)
-            enviar_email_1_hora(profissional.email, profissional.nome, agendamento)
-            agendamento.notificado_1_hora = True
+        enviar_email_1_hora(db, cliente.email, cliente.nome, agendamento)
+        enviar_email_1_hora(db, profissional.email, profissional.nome, agendamento)
+        agendamento.notificado_1_hora = True
 
     db.commit()
@@ -0,0 +1,120 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import partial
+from threading import Lock
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.agendamento import Agendamento
+from app.utils.disponibilidade import (
+    agendamento_conflitante,
+    horario_livre,
+    verificar_slots,
+)
+
+RESERVA_MAX_TENTATIVAS = int(os.getenv("RESERVA_MAX_TENTATIVAS", "8"))
+RESERVA_ESPERA_MS = int(os.getenv("RESERVA_ESPERA_MS", "10"))
+RESERVA_LOCKS_LOCAIS = int(os.getenv("RESERVA_LOCKS_LOCAIS", "256"))
+VIOLACAO_EXCLUSAO = "23P01"
+
+_locks_locais = [Lock() for _ in range(RESERVA_LOCKS_LOCAIS)]
+
+
+class AgendaOcupada(Exception):
+    pass
+
+
+def _espera(tentativa: int) -> float:
+    return RESERVA_ESPERA_MS / 1000 * 2**tentativa * random.uniform(0.5, 1.5)
+
+
+def _bloquear_postgres(db: Session, profissional_id: int, dia: date):
+    for tentativa in range(RESERVA_MAX_TENTATIVAS):
+        if tentativa:
+            time.sleep(_espera(tentativa))
+        obtido = db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:profissional_id, :dia)"),
+            {"profissional_id": profissional_id, "dia": dia.toordinal()},
+        ).scalar()
+        if obtido:
+            return
+    raise AgendaOcupada()
+
+
+def _bloquear_local(profissional_id: int, dia: date):
+    lock = _locks_locais[hash((profissional_id, dia.toordinal())) % len(_locks_locais)]
+    for tentativa in range(RESERVA_MAX_TENTATIVAS):
+        if lock.acquire(timeout=_espera(tentativa)):
+            return lock
+    raise AgendaOcupada()
+
+
+@contextmanager
+def bloqueio_agenda(db: Session, profissional_id: int, dia: date):
+    if db.bind.dialect.name == "postgresql":
+        _bloquear_postgres(db, profissional_id, dia)
+        yield
+        return
+
+    lock = _bloquear_local(profissional_id, dia)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def gravar_sem_sobreposicao(db: Session, antes_de_gravar=None) -> bool:
+    try:
+        if antes_de_gravar is not None:
+            db.flush()
+            antes_de_gravar()
+        db.commit()
+    except IntegrityError as erro:
+        db.rollback()
+        if getattr(erro.orig, "pgcode", None) != VIOLACAO_EXCLUSAO:
+            raise
+        return False
+    return True
+
+
+def reservar_agendamento(
+    db: Session,
+    cliente_id: int,
+    profissional_id: int,
+    servico,
+    horario: datetime,
+    duracao_slot: timedelta,
+    estabelecimento_id: int,
+    ao_reservar=None,
+):
+    duracao = timedelta(minutes=servico.tempo)
+    if not horario_livre(db, profissional_id, horario, duracao):
+        return None
+
+    with bloqueio_agenda(db, profissional_id, horario.date()):
+        if not verificar_slots(db, profissional_id, horario, duracao, duracao_slot) or (
+            db.bind.dialect.name != "postgresql"
+            and agendamento_conflitante(db, profissional_id, horario, duracao)
+        ):
+            db.rollback()
+            return None
+
+        agendamento = Agendamento(
+            cliente_id=cliente_id,
+            profissional_id=profissional_id,
+            servico_id=servico.id,
+            horario=horario,
+            horario_fim=horario + duracao,
+            status="pendente",
+            estabelecimento_id=estabelecimento_id,
+        )
+        db.add(agendamento)
+        antes_de_gravar = None
+        if ao_reservar is not None:
+            antes_de_gravar = partial(ao_reservar, db, agendamento)
+        if not gravar_sem_sobreposicao(db, antes_de_gravar):
+            return None
+    return agendamento
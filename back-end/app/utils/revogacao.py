@@ -0,0 +1,77 @@
+import os
+from datetime import datetime, timedelta
+from threading import Lock
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.blacklist import BlacklistToken
+
+RETENCAO_TOKENS_LEGADOS = timedelta(days=1)
+REVOGACAO_INTERVALO_SINCRONIZACAO = int(
+    os.getenv("REVOGACAO_INTERVALO_SINCRONIZACAO", "10")
+)
+
+_revogados = {}
+_lock = Lock()
+
+
+def _registrar(jti: str, expira_em: datetime):
+    with _lock:
+        _revogados[jti] = expira_em
+
+
+def token_revogado(jti: str) -> bool:
+    with _lock:
+        expira_em = _revogados.get(jti)
+        if expira_em is None:
+            return False
+        if expira_em <= datetime.utcnow():
+            del _revogados[jti]
+            return False
+        return True
+
+
+def revogar_token(db: Session, token: str, jti: str, expira_em: datetime):
+    db.add(BlacklistToken(token=token, jti=jti, expira_em=expira_em))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    _registrar(jti, expira_em)
+
+
+def sincronizar_revogacoes(db: Session):
+    agora = datetime.utcnow()
+
+    registros = (
+        db.query(BlacklistToken.jti, BlacklistToken.expira_em)
+        .filter(
+            BlacklistToken.jti.isnot(None),
+            BlacklistToken.expira_em > agora,
+        )
+        .all()
+    )
+
+    with _lock:
+        _revogados.update(registros)
+        for jti in [j for j, expira_em in _revogados.items() if expira_em <= agora]:
+            del _revogados[jti]
+
+
+def purgar_tokens_expirados(db: Session):
+    agora = datetime.utcnow()
+    removidos = (
+        db.query(BlacklistToken)
+        .filter(
+            or_(
+                BlacklistToken.expira_em <= agora,
+                and_(
+                    BlacklistToken.expira_em.is_(None),
+                    BlacklistToken.created_at < agora - RETENCAO_TOKENS_LEGADOS,
+                ),
+            )
+        )
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return removidos
@@ -1,13 +1,94 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from threading import BoundedSemaphore, Lock
 from typing import Optional
+from uuid import uuid4
 import jwt
+from fastapi import HTTPException
 from passlib.context import CryptContext
+from app.db.telemetria import HistogramaEspera
 
 SECRET_KEY = "teste_jwt_123"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+SENHA_MAX_WORKERS = int(os.getenv("SENHA_MAX_WORKERS", "2"))
+SENHA_MAX_FILA = int(os.getenv("SENHA_MAX_FILA", "8"))
+SENHA_RETRY_AFTER = int(os.getenv("SENHA_RETRY_AFTER", "1"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class ExecutorSenhas:
+    def __init__(self, workers=SENHA_MAX_WORKERS, max_fila=SENHA_MAX_FILA):
+        self.workers = workers
+        self.max_fila = max_fila
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="senhas")
+        self._vagas = BoundedSemaphore(workers + max_fila)
+        self._lock = Lock()
+        self.espera = HistogramaEspera()
+        self.pendentes = 0
+        self.em_execucao = 0
+        self.pico_pendentes = 0
+        self.concluidas = 0
+        self.rejeitadas = 0
+
+    def _executar(self, enfileirada_em, funcao, args):
+        self.espera.registrar(time.perf_counter() - enfileirada_em)
+        with self._lock:
+            self.em_execucao += 1
+        try:
+            return funcao(*args)
+        finally:
+            with self._lock:
+                self.em_execucao -= 1
+                self.concluidas += 1
+
+    def executar(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self.rejeitadas += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Servidor ocupado validando senhas. Tente novamente.",
+                headers={"Retry-After": str(SENHA_RETRY_AFTER)},
+            )
+
+        with self._lock:
+            self.pendentes += 1
+            self.pico_pendentes = max(self.pico_pendentes, self.pendentes)
+        try:
+            return self._executor.submit(
+                self._executar, time.perf_counter(), funcao, args
+            ).result()
+        finally:
+            with self._lock:
+                self.pendentes -= 1
+            self._vagas.release()
+
+    def resumo(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_fila": self.max_fila,
+                "em_execucao": self.em_execucao,
+                "na_fila": self.pendentes - self.em_execucao,
+                "pico_pendentes": self.pico_pendentes,
+                "concluidas": self.concluidas,
+                "rejeitadas": self.rejeitadas,
+                "espera_fila": self.espera.resumo(),
+            }
+
+
+executor_senhas = ExecutorSenhas()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -15,14 +96,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     expire = datetime.utcnow() + (
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return executor_senhas.executar(pwd_context.verify, plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password, hashed_password):
+    return executor_senhas.executar(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return executor_senhas.executar(pwd_context.hash, password)
@@ -0,0 +1,64 @@
+import os
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+load_dotenv()
+
+DIRETORIO_TEMPLATES = Path(__file__).resolve().parent.parent / "templates" / "email"
+FRONTEND_LOGIN_URL = os.getenv("FRONTEND_LOGIN_URL")
+
+_ambiente = Environment(
+    loader=FileSystemLoader(DIRETORIO_TEMPLATES),
+    autoescape=select_autoescape(["html"]),
+    undefined=StrictUndefined,
+    auto_reload=False,
+    cache_size=-1,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+_ambiente.globals["frontend_login_url"] = FRONTEND_LOGIN_URL
+
+
+class ModeloEmail:
+    def __init__(self, tipo):
+        self.tipo = tipo
+        self.html = _ambiente.get_template(f"{tipo}.html")
+        self.texto = _ambiente.get_template(f"{tipo}.txt")
+
+    def renderizar(self, contexto: dict, ano=None):
+        contexto = {**contexto, "ano": ano or datetime.now().year}
+        contexto_texto = self.texto.new_context(contexto)
+        return {
+            "assunto": "".join(self.texto.blocks["assunto"](contexto_texto)).strip(),
+            "texto": "".join(self.texto.blocks["texto"](contexto_texto)).strip(),
+            "html": self.html.render(contexto),
+        }
+
+
+def _carregar_modelos():
+    modelos = {}
+    for caminho in sorted(DIRETORIO_TEMPLATES.glob("*.txt")):
+        if caminho.stem == "base":
+            continue
+        modelos[caminho.stem] = ModeloEmail(caminho.stem)
+    return modelos
+
+
+_modelos = _carregar_modelos()
+
+
+def existe_modelo(tipo):
+    return tipo in _modelos
+
+
+def obter_modelo(tipo):
+    if tipo not in _modelos:
+        raise ValueError(f"Modelo de e-mail desconhecido: {tipo}")
+    return _modelos[tipo]
+
+
+def renderizar_email(tipo, **contexto):
+    return obter_modelo(tipo).renderizar(contexto)
+
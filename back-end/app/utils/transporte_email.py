@@ -0,0 +1,119 @@
+import boto3
+import os
+from datetime import datetime
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+from threading import Lock
+from uuid import uuid4
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMAIL_FROM = os.getenv("EMAIL_FROM")
+EMAIL_TRANSPORTE = os.getenv("EMAIL_TRANSPORTE", "ses")
+EMAIL_ARQUIVO_DIR = os.getenv("EMAIL_ARQUIVO_DIR", "emails_enviados")
+
+
+def montar_mime(destinatario_email, assunto, texto, html, imagens=None):
+    msg = MIMEMultipart("related")
+    msg["Subject"] = assunto
+    msg["From"] = EMAIL_FROM
+    msg["To"] = destinatario_email
+
+    msg_alt = MIMEMultipart("alternative")
+    msg_alt.attach(MIMEText(texto, "plain"))
+    msg_alt.attach(MIMEText(html, "html"))
+    msg.attach(msg_alt)
+
+    for content_id, conteudo in (imagens or {}).items():
+        imagem = MIMEImage(conteudo, _subtype="png")
+        imagem.add_header("Content-ID", f"<{content_id}>")
+        msg.attach(imagem)
+
+    return msg
+
+
+class TransporteSES:
+    def __init__(self):
+        self.ses = boto3.client(
+            'ses',
+            region_name=os.getenv("AWS_REGION"),
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        )
+
+    def enviar(self, destinatario_email, assunto, texto, html, imagens=None):
+        if imagens:
+            msg = montar_mime(destinatario_email, assunto, texto, html, imagens)
+            self.ses.send_raw_email(
+                Source=EMAIL_FROM,
+                Destinations=[destinatario_email],
+                RawMessage={"Data": msg.as_string()},
+            )
+            return
+
+        self.ses.send_email(
+            Source=EMAIL_FROM,
+            Destination={'ToAddresses': [destinatario_email]},
+            Message={
+                'Subject': {'Data': assunto},
+                'Body': {'Html': {'Data': html}, 'Text': {'Data': texto}},
+            },
+        )
+
+
+class TransporteMemoria:
+    def __init__(self):
+        self.enviados = []
+        self._lock = Lock()
+
+    def enviar(self, destinatario_email, assunto, texto, html, imagens=None):
+        with self._lock:
+            self.enviados.append(
+                {
+                    "destinatario": destinatario_email,
+                    "assunto": assunto,
+                    "texto": texto,
+                    "html": html,
+                    "imagens": list((imagens or {}).keys()),
+                }
+            )
+
+
+class TransporteArquivo:
+    def __init__(self, diretorio=EMAIL_ARQUIVO_DIR):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    def enviar(self, destinatario_email, assunto, texto, html, imagens=None):
+        msg = montar_mime(destinatario_email, assunto, texto, html, imagens)
+        nome = f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid4().hex[:8]}.eml"
+        (self.diretorio / nome).write_text(msg.as_string(), encoding="utf-8")
+
+
+TRANSPORTES = {
+    "ses": TransporteSES,
+    "memoria": TransporteMemoria,
+    "arquivo": TransporteArquivo,
+}
+
+_transporte = None
+
+
+def obter_transporte():
+    global _transporte
+    if _transporte is None:
+        if EMAIL_TRANSPORTE not in TRANSPORTES:
+            raise ValueError(
+                f"Transporte de e-mail desconhecido: {EMAIL_TRANSPORTE}. "
+                f"Use um de: {', '.join(TRANSPORTES)}"
+            )
+        _transporte = TRANSPORTES[EMAIL_TRANSPORTE]()
+    return _transporte
+
+
+def definir_transporte(transporte):
+    global _transporte
+    _transporte = transporte
@@ -0,0 +1,17 @@
+from apscheduler.schedulers.blocking import BlockingScheduler
+from app.utils.agendador import lideranca, registrar_jobs_unicos
+
+
+def main():
+    scheduler = BlockingScheduler()
+    registrar_jobs_unicos(scheduler)
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        lideranca.renunciar()
+
+
+if __name__ == "__main__":
+    main()